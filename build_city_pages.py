@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Static site compiler for the city pages.
+Loads every data/<city>.json once, compiles cities/city-template.html once and
+writes a fully pre-rendered cities/<city>.html for every city in parallel, so
+visitors no longer wait for city-template.js to fetch and render the JSON.
+
+Usage: python3 build_city_pages.py [--workers N] [--out DIR] [city ...]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from html import escape
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from responsive_images import load_responsive_manifest, apply_responsive_markup, background_url
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(WEBSITE_DIR, "data")
+TEMPLATE_FILE = os.path.join(WEBSITE_DIR, "cities", "city-template.html")
+OUTPUT_DIR = os.path.join(WEBSITE_DIR, "cities")
+
+# Same order as availableCities in cities/city-template.js
+CITY_ORDER = [
+    'beijing', 'shanghai', 'guangzhou', 'shenzhen', 'chengdu', 'hangzhou', 'wuhan',
+    'xian', 'nanjing', 'chongqing', 'tianjin', 'suzhou', 'qingdao', 'harbin',
+    'hongkong', 'kunming', 'xiamen', 'dali', 'datong', 'guilin', 'guiyang', 'jinan',
+    'kaifeng', 'kashi', 'linyi', 'taiyuan', 'urumqi', 'wuxi'
+]
+
+# Template elements filled at build time: (slot name, pattern whose group 2 is replaced)
+SLOTS = [
+    ('title', r'(<title id="city-title">)(.*?)(</title>)'),
+    ('breadcrumb', r'(<li class="breadcrumb-item active" id="breadcrumb-city-name">)(.*?)(</li>)'),
+    ('hero_style', r'(<section id="city-hero" class="city-hero")()(>)'),
+    ('hero_title', r'(<h1 id="city-name">)(.*?)(</h1>)'),
+    ('hero_subtitle', r'(<p id="city-subtitle" class="lead">)(.*?)(</p>)'),
+    ('content', r'(<div id="city-content">)(.*?)(</div>\s*<!-- Previous/Next City Navigation -->)'),
+    ('prev_next', r'(<div id="prev-next-nav" class="city-prev-next">)(.*?)(</div>\s*</div>\s*<!-- Sticky Navigation -->)'),
+    ('nav_name', r'(<span id="nav-city-name">)(.*?)(</span>)'),
+    ('city_links', r'(<div id="city-links" class="city-links">)(.*?)(</div>\s*</div>\s*</div>\s*</section>)'),
+    ('body', r'(<body)()(>)'),
+]
+
+def load_cities(data_dir=DATA_DIR):
+    """Load every city JSON once, in navigation order"""
+    cities = {}
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # Skip cities.json, cuisine_data.json, travel_news.json
+        if isinstance(data, dict) and 'gallery' in data and 'overview' in data:
+            cities[filename[:-5]] = data
+
+    # data/cuisine_data.json is the source for signature dishes, street food and restaurants
+    cuisine_data = load_cuisine_data(data_dir)
+    for city_id, city in cities.items():
+        if city_id in cuisine_data:
+            city['cuisine'] = {**city.get('cuisine', {}), **cuisine_data[city_id]}
+
+    ordered = [city_id for city_id in CITY_ORDER if city_id in cities]
+    ordered += sorted(city_id for city_id in cities if city_id not in CITY_ORDER)
+    return {city_id: cities[city_id] for city_id in ordered}
+
+def load_cuisine_data(data_dir=DATA_DIR):
+    try:
+        with open(os.path.join(data_dir, "cuisine_data.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def compile_template(template_path=TEMPLATE_FILE):
+    """
+    Split the template once into static chunks and named slots.
+    Rendering a page is then a single join instead of a chain of replace() calls.
+    """
+    with open(template_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    matches = []
+    for name, pattern in SLOTS:
+        match = re.search(pattern, html, flags=re.DOTALL)
+        if not match:
+            raise ValueError(f"Template slot '{name}' not found in {template_path}")
+        matches.append((match.start(2), match.end(2), name))
+
+    parts = []
+    position = 0
+    for start, end, name in sorted(matches):
+        parts.append(html[position:start])
+        parts.append(name)
+        position = end
+    parts.append(html[position:])
+
+    # Even indexes are static text, odd indexes are slot names
+    return parts
+
+def render_template(parts, values):
+    return ''.join(part if i % 2 == 0 else values[part] for i, part in enumerate(parts))
+
+def placeholder_attrs(placeholder):
+    """Intrinsic size plus a dominant-color/LQIP background shown until the photo loads"""
+    if not placeholder:
+        return ''
+    return (f' width="{placeholder["width"]}" height="{placeholder["height"]}"'
+            f''' style="background: {placeholder['color']} url('{placeholder['lqip']}') center / cover;"''')
+
+def hero_placeholder_style(placeholder):
+    if not placeholder:
+        return ''
+    return f"; --hero-placeholder: url('{placeholder['lqip']}'); --hero-color: {placeholder['color']}"
+
+def render_content(city):
+    """Python port of renderCityContent() in cities/city-template.js; data values are text, so they are escaped"""
+    cuisine = city['cuisine']
+    name = escape(city['name'])
+    food_icon = cuisine.get('food_icon', '')
+    food_sprite = cuisine.get('food_icon_sprite')
+    if food_sprite:
+        food_icon_html = (f'<span class="food-icon" role="img" aria-label="{name} food" '
+                          f'style="background-position: {food_sprite["position"]};"></span>')
+    else:
+        food_icon_html = (
+            f'<img src="{food_icon}" alt="{name} food" style="width: 24px; height: 24px; border-radius: 50%; object-fit: cover; margin-right: 8px; vertical-align: middle;">'
+            if food_icon else '<i class="fas fa-star me-2"></i>'
+        )
+
+    def paragraphs(items):
+        return ''.join(f'<p>{escape(item)}</p>' for item in items)
+
+    def named(items):
+        return ''.join(f'<p><strong>{escape(item["name"])}:</strong> {escape(item["description"])}</p>' for item in items)
+
+    sections = [f'''
+        <section id="overview" class="city-section">
+            <h2><i class="fas fa-info-circle me-3"></i>Overview</h2>
+            <p>{escape(city['overview'])}</p>
+        </section>
+        <section id="highlights" class="city-section">
+            <h2><i class="fas fa-star me-3"></i>Must-See Highlights</h2>
+            <div class="city-highlight">
+                <h3><i class="fas fa-landmark me-2"></i>Top Attractions</h3>
+                <p>{escape(city['highlights']['attractions'])}</p>
+            </div>
+            <div class="city-highlight">
+                <h3><i class="fas fa-calendar-alt me-2"></i>Best Time to Visit</h3>
+                <p>{escape(city['highlights']['bestTime'])}</p>
+            </div>
+        </section>
+        <section id="cuisine" class="city-section">
+            <h2><i class="fas fa-utensils me-3"></i>Local Cuisine</h2>''']
+
+    if cuisine.get('signature_dishes'):
+        sections.append(f'''
+            <div class="city-highlight">
+                <h3>{food_icon_html}Signature Dishes</h3>
+                {named(cuisine['signature_dishes'])}
+            </div>''')
+    if cuisine.get('street_food'):
+        sections.append(f'''
+            <div class="city-highlight">
+                <h3><i class="fas fa-fire me-2"></i>Street Food</h3>
+                <p>{escape(', '.join(cuisine['street_food']))}</p>
+            </div>''')
+    if cuisine.get('famous_restaurants'):
+        sections.append(f'''
+            <div class="city-highlight">
+                <h3><i class="fas fa-store me-2"></i>Famous Restaurants</h3>
+                <p>{escape(', '.join(cuisine['famous_restaurants']))}</p>
+            </div>''')
+
+    itinerary = ''.join(f'''
+                <div class="city-highlight">
+                    <h3><i class="fas fa-sun me-2"></i>{escape(day['day'])}</h3>
+                    {paragraphs(day['activities'])}
+                </div>''' for day in city['itinerary'])
+
+    gallery = ''.join(
+        f'\n                    <img src="{image}" alt="{name} view {index}" class="gallery-img" loading="lazy"'
+        f'{placeholder_attrs(city.get("placeholders", {}).get(image))}>'
+        for index, image in enumerate(city['gallery'], 1)
+    )
+
+    patents = ''.join(f'''
+                            <tr>
+                                <td>{escape(patent['number'])}</td>
+                                <td>{escape(patent['title'])}</td>
+                                <td>{escape(patent['assignee'])}</td>
+                            </tr>''' for patent in city.get('patents', []))
+
+    sections.append(f'''
+            <div class="city-highlight">
+                <h3><i class="fas fa-pepper-hot me-2"></i>Must-Try Dishes</h3>
+                {named(cuisine['dishes'])}
+            </div>
+            <div class="city-highlight">
+                <h3><i class="fas fa-map-marker-alt me-2"></i>Best Food Streets</h3>
+                {named(cuisine['foodStreets'])}
+            </div>
+        </section>
+        <section id="transport" class="city-section">
+            <h2><i class="fas fa-subway me-3"></i>Transportation</h2>
+            <div class="city-highlight">
+                <h3><i class="fas fa-plane me-2"></i>Getting There</h3>
+                {paragraphs(city['transportation']['gettingThere'])}
+            </div>
+            <div class="city-highlight">
+                <h3><i class="fas fa-bus me-2"></i>Getting Around</h3>
+                {paragraphs(city['transportation']['gettingAround'])}
+            </div>
+        </section>
+        <section id="itinerary" class="city-section">
+            <h2><i class="fas fa-calendar-alt me-3"></i>Suggested Itinerary</h2>{itinerary}
+        </section>
+        <section id="gallery" class="city-section">
+            <h2><i class="fas fa-camera-retro me-3"></i>Gallery</h2>
+            <div class="city-gallery">{gallery}
+            </div>
+        </section>
+        <section id="patent-data" class="city-section">
+            <h2><i class="fas fa-file-alt me-3"></i>Patent Data</h2>
+            <div class="patent-table">
+                <table class="table table-bordered">
+                    <thead>
+                        <tr>
+                            <th>Patent Number</th>
+                            <th>Title</th>
+                            <th>Current Assignee</th>
+                        </tr>
+                    </thead>
+                    <tbody>{patents}
+                    </tbody>
+                </table>
+            </div>
+        </section>
+    ''')
+    return ''.join(sections)
+
+def render_prev_next(city_ids, index, cities):
+    links = []
+    if index > 0:
+        prev_id = city_ids[index - 1]
+        links.append(f'<a href="{prev_id}.html" id="prev-city" class="city-prev"><i class="fas fa-arrow-left"></i><span>{escape(cities[prev_id]["name"])}</span></a>')
+    else:
+        links.append('<a href="#" id="prev-city" class="city-prev" style="visibility: hidden;"></a>')
+    if index < len(city_ids) - 1:
+        next_id = city_ids[index + 1]
+        links.append(f'<a href="{next_id}.html" id="next-city" class="city-next"><span>{escape(cities[next_id]["name"])}</span><i class="fas fa-arrow-right"></i></a>')
+    else:
+        links.append('<a href="#" id="next-city" class="city-next" style="visibility: hidden;"></a>')
+    return '\n                        ' + '\n                        '.join(links) + '\n                    '
+
+def render_city_links(cities):
+    return ''.join(f'<a href="{city_id}.html" class="city-link">{escape(city["name"])}</a>' for city_id, city in cities.items())
+
+def render_page(parts, cities, city_id, image_manifest=None):
+    """Render one complete city page from the compiled template"""
+    city = cities[city_id]
+    city_ids = list(cities)
+    hero_image = background_url(city['heroImage'], image_manifest) if image_manifest else city['heroImage']
+    hero_placeholder = hero_placeholder_style(city.get('placeholders', {}).get(city['heroImage']))
+
+    html = render_template(parts, {
+        'title': escape(city['title']),
+        'breadcrumb': escape(city['name']),
+        'hero_style': f''' style="--hero-image: url('{hero_image}'){hero_placeholder}"''',
+        'hero_title': escape(city['heroTitle']),
+        'hero_subtitle': escape(city['heroSubtitle']),
+        'content': render_content(city),
+        'prev_next': render_prev_next(city_ids, city_ids.index(city_id), cities),
+        'nav_name': f"Explore {escape(city['name'])}",
+        'city_links': render_city_links(cities),
+        # city-template.js only wires up navigation on pre-rendered pages
+        'body': ' data-prerendered="true"',
+    })
+
+    if image_manifest:
+        html = apply_responsive_markup(html, image_manifest)
+    return html
+
+# Worker state, set once per process by init_worker()
+_template_parts = None
+_cities = None
+_image_manifest = None
+
+def init_worker(parts, cities, image_manifest):
+    global _template_parts, _cities, _image_manifest
+    _template_parts, _cities, _image_manifest = parts, cities, image_manifest
+
+def build_page(city_id, output_dir):
+    """Render and write one page (runs inside a pool worker)"""
+    started = time.perf_counter()
+    html = render_page(_template_parts, _cities, city_id, _image_manifest)
+    output_path = os.path.join(output_dir, f"{city_id}.html")
+
+    # Leave the file (and its mtime) alone when nothing changed
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            changed = f.read() != html
+    except FileNotFoundError:
+        changed = True
+
+    if changed:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    return city_id, output_path, changed, len(html.encode('utf-8')), time.perf_counter() - started
+
+def build(city_ids=None, workers=None, output_dir=OUTPUT_DIR):
+    """Pre-render the requested cities (all by default); returns one result tuple per page"""
+    parts = compile_template()
+    cities = load_cities()
+    image_manifest = load_responsive_manifest()
+    city_ids = city_ids or list(cities)
+
+    unknown = [city_id for city_id in city_ids if city_id not in cities]
+    if unknown:
+        raise ValueError(f"No data/<city>.json for: {', '.join(unknown)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(parts, cities, image_manifest)) as pool:
+        futures = [pool.submit(build_page, city_id, output_dir) for city_id in city_ids]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render all city pages from data/*.json")
+    parser.add_argument('cities', nargs='*', help="city ids to build (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--out', default=OUTPUT_DIR, help="output directory (default: cities/)")
+    args = parser.parse_args()
+
+    print("🏗️  BUILDING CITY PAGES")
+    print("=" * 50)
+    started = time.perf_counter()
+
+    try:
+        results = build(args.cities, args.workers, args.out)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for city_id, output_path, changed, size, elapsed in sorted(results):
+        status = "✅ Built" if changed else "✓ Unchanged"
+        print(f"{status}: {os.path.relpath(output_path, WEBSITE_DIR)} ({size:,} bytes, {elapsed * 1000:.1f} ms)")
+
+    written = sum(1 for result in results if result[2])
+    print(f"\n📊 {len(results)} pages, {written} written in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
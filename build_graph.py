@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Build graph for incremental site rebuilds.
+Each target declares the files (and computed values) it depends on. The
+content hash of every input is recorded after a successful build, so the next
+run regenerates only the targets whose inputs actually changed.
+"""
+
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from optimization_manifest import file_sha256
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(WEBSITE_DIR, "build_state.json")
+
+class Target:
+    def __init__(self, name, inputs, build, key=None, values=None, outputs=None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.build = build
+        self.key = key if key is not None else name
+        self.values = values or {}
+        self.outputs = outputs if outputs is not None else [name]
+
+class BuildGraph:
+    def __init__(self, state_file=STATE_FILE, website_dir=WEBSITE_DIR):
+        self.state_file = state_file
+        self.website_dir = website_dir
+        self.targets = {}
+        self._hashes = {}
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"targets": {}}
+
+    def save_state(self):
+        temp_path = self.state_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.state_file)
+
+    def add_target(self, name, inputs, build, key=None, values=None, outputs=None):
+        """
+        Register a target.
+
+        inputs: file paths relative to the website directory
+        build: callable receiving a list of keys; targets sharing the same
+            callable are built together in one call. It may return a dict of
+            key → seconds to report per-target timings.
+        values: computed dependencies (e.g. the list of city names) hashed
+            alongside the files
+        """
+        self.targets[name] = Target(name, inputs, build, key, values, outputs)
+
+    def file_hash(self, path):
+        """Content hash of an input, computed once per run however many targets share it"""
+        if path not in self._hashes:
+            full_path = os.path.join(self.website_dir, path)
+            self._hashes[path] = file_sha256(full_path) if os.path.exists(full_path) else None
+        return self._hashes[path]
+
+    def fingerprint(self, target):
+        inputs = {path: self.file_hash(path) for path in target.inputs}
+        for name, value in target.values.items():
+            inputs[f"value:{name}"] = hashlib.sha256(
+                json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        return inputs
+
+    def changed_inputs(self, target):
+        """Inputs whose hash differs from the last successful build (all of them if never built)"""
+        recorded = self.state["targets"].get(target.name, {}).get("inputs")
+        current = self.fingerprint(target)
+        if recorded is None:
+            return sorted(current)
+        changed = [name for name, digest in current.items() if recorded.get(name) != digest]
+        changed += [name for name in recorded if name not in current]
+        missing = [path for path in target.outputs if not os.path.exists(os.path.join(self.website_dir, path))]
+        return sorted(set(changed + [f"missing:{path}" for path in missing]))
+
+    def stale_targets(self, force=False):
+        return [target for target in self.targets.values() if force or self.changed_inputs(target)]
+
+    def build(self, force=False):
+        """Rebuild stale targets, grouped by build callable. Returns [(name, seconds, changed inputs)]"""
+        stale = self.stale_targets(force)
+        reasons = {target.name: self.changed_inputs(target) for target in stale}
+
+        groups = []
+        for target in stale:
+            for build, members in groups:
+                if build is target.build:
+                    members.append(target)
+                    break
+            else:
+                groups.append((target.build, [target]))
+
+        report = []
+        for build, members in groups:
+            started = time.perf_counter()
+            timings = build([target.key for target in members]) or {}
+            elapsed = time.perf_counter() - started
+
+            # Builds may rewrite their own inputs (e.g. index.html), so hash again afterwards
+            for target in members:
+                for path in target.inputs + target.outputs:
+                    self._hashes.pop(path, None)
+            for target in members:
+                self.state["targets"][target.name] = {
+                    "inputs": self.fingerprint(target),
+                    "built_at": datetime.now().isoformat(),
+                    "seconds": round(timings.get(target.key, elapsed / len(members)), 4)
+                }
+                report.append((target.name, self.state["targets"][target.name]["seconds"], reasons[target.name]))
+            self.save_state()
+
+        return report
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Incremental site build.
+Registers every generated output in a build graph together with the inputs it
+depends on (data/<city>.json, data/cuisine_data.json, data/travel_news.json,
+the city template and the responsive image manifest) and regenerates only the
+outputs whose inputs changed since the last build.
+
+Usage: python3 build_site.py [--force] [--dry-run]
+"""
+
+import os
+import re
+import json
+import argparse
+from html import escape
+from datetime import date
+from urllib.parse import quote
+from build_graph import BuildGraph
+import build_city_pages
+from responsive_images import load_responsive_manifest, apply_responsive_markup
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+SITE_URL = "https://fli-rpx.github.io/travel-website/"
+TEMPLATE = "cities/city-template.html"
+IMAGE_MANIFEST = "images/responsive/manifest.json"
+NEWS_FILE = "data/travel_news.json"
+
+def build_cities(city_ids):
+    """Pre-render the stale city pages in one parallel batch"""
+    results = build_city_pages.build(city_ids)
+    return {city_id: seconds for city_id, _, _, _, seconds in results}
+
+def render_news_cards(news_items):
+    """Same markup as loadTravelNews() in index.html, with the news text escaped"""
+    return ''.join(f'''
+                <div class="news-card">
+                    <div class="news-date">{escape(str(item['date']))}</div>
+                    <h3 class="news-title">{escape(item['title'])}</h3>
+                    <p class="news-excerpt">{escape(item['excerpt'])}</p>
+                    <a href="news-detail.html?id={quote(str(item['id']), safe='')}" class="news-link">Read more →</a>
+                </div>''' for item in news_items) + '\n            '
+
+def build_news(_keys):
+    """Pre-render the first three news cards from data/travel_news.json into index.html"""
+    with open(os.path.join(WEBSITE_DIR, NEWS_FILE), 'r', encoding='utf-8') as f:
+        news = json.load(f)["news"][:3]
+    index_path = os.path.join(WEBSITE_DIR, "index.html")
+    with open(index_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    html = re.sub(
+        r'(<div id="news-grid" class="news-grid"[^>]*>)(.*?)(</div>\s*</div>\s*</section>)',
+        lambda m: '<div id="news-grid" class="news-grid" data-prerendered="true">' + render_news_cards(news) + m.group(3),
+        html, count=1, flags=re.DOTALL
+    )
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+def build_index_images(_keys):
+    """Point the index.html city cards at the resized image derivatives"""
+    manifest = load_responsive_manifest()
+    index_path = os.path.join(WEBSITE_DIR, "index.html")
+    with open(index_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    updated = apply_responsive_markup(html, manifest)
+    if updated != html:
+        with open(index_path, 'w', encoding='utf-8') as f:
+            f.write(updated)
+
+def sitemap_priority(position):
+    """Highest priority for the first cities in navigation order, as in the hand-written sitemap"""
+    if position < 2:
+        return "0.9"
+    if position < 10:
+        return "0.8"
+    if position < 17:
+        return "0.7"
+    return "0.6"
+
+def build_sitemap(_keys):
+    """
+    Regenerate sitemap.xml with one entry per city. The entries use the
+    city-template.html?city= URLs the index cards link to: the deploy serves
+    those for every city, while cities/<id>.html exists only where a page is
+    committed (a missing one would get the homepage via the /* redirect).
+    """
+    today = date.today().isoformat()
+    entries = [f'''  <!-- Homepage -->
+  <url>
+    <loc>{SITE_URL}</loc>
+    <lastmod>{today}</lastmod>
+    <changefreq>weekly</changefreq>
+    <priority>1.0</priority>
+  </url>
+
+  <!-- City Pages -->''']
+    for position, city_id in enumerate(build_city_pages.load_cities()):
+        entries.append(f'''  <url>
+    <loc>{SITE_URL}cities/city-template.html?city={quote(city_id)}</loc>
+    <lastmod>{today}</lastmod>
+    <changefreq>monthly</changefreq>
+    <priority>{sitemap_priority(position)}</priority>
+  </url>''')
+
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+           + '\n'.join(entries) + '\n</urlset>\n')
+    with open(os.path.join(WEBSITE_DIR, "sitemap.xml"), 'w', encoding='utf-8') as f:
+        f.write(xml)
+
+def create_graph():
+    """Declare every output and the inputs it depends on"""
+    graph = BuildGraph()
+    cities = build_city_pages.load_cities()
+    cuisine_data = build_city_pages.load_cuisine_data()
+
+    # Every page lists all cities in its navigation, so names and order are a
+    # dependency of each page, but other cities' content is not
+    navigation = [(city_id, city['name']) for city_id, city in cities.items()]
+
+    for city_id in cities:
+        graph.add_target(
+            f"cities/{city_id}.html",
+            inputs=[f"data/{city_id}.json", TEMPLATE, IMAGE_MANIFEST, "build_city_pages.py"],
+            values={"navigation": navigation, "cuisine": cuisine_data.get(city_id)},
+            build=build_cities,
+            key=city_id
+        )
+
+    graph.add_target("index.html#news", inputs=[NEWS_FILE], build=build_news, outputs=["index.html"])
+    graph.add_target("index.html#images", inputs=[IMAGE_MANIFEST], build=build_index_images, outputs=["index.html"])
+    graph.add_target("sitemap.xml", inputs=[], values={"cities": list(cities)}, build=build_sitemap)
+    return graph
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the generated site files")
+    parser.add_argument('--force', action='store_true', help="rebuild every target")
+    parser.add_argument('--dry-run', action='store_true', help="only list the targets that would be rebuilt")
+    args = parser.parse_args()
+
+    print("🏗️  INCREMENTAL SITE BUILD")
+    print("=" * 50)
+    graph = create_graph()
+
+    if args.dry_run:
+        stale = graph.stale_targets(args.force)
+        for target in stale:
+            print(f"🔸 {target.name}: {', '.join(graph.changed_inputs(target)[:3])}")
+        print(f"\n📊 {len(stale)}/{len(graph.targets)} targets out of date")
+        return
+
+    report = graph.build(force=args.force)
+    if not report:
+        print(f"✅ All {len(graph.targets)} targets up to date")
+        return
+
+    for name, seconds, changed in report:
+        reason = ', '.join(changed[:3]) + (f" (+{len(changed) - 3})" if len(changed) > 3 else "")
+        print(f"✅ {name}: {seconds * 1000:.1f} ms ← {reason}")
+    total = sum(seconds for _, seconds, _ in report)
+    print(f"\n📊 Rebuilt {len(report)}/{len(graph.targets)} targets in {total:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,69 @@
+"""
+Queue image optimization tasks for every gallery image in data/*.json.
+
+Each task has a normalized key (task_type, target_path) with a unique index
+on it, and all tasks of a run go in with one batched
+INSERT ... ON CONFLICT DO NOTHING, so re-running only adds images that are new.
+Rows queued before the key existed are backfilled from their idea text when
+the task store opens; --compact collapses the duplicates they left behind
+(needed once before the unique index can be created).
+
+Usage: python3 check_optimizations.py [--compact] [--backend auto|postgres|sqlite] [--sqlite PATH]
+"""
 
 import os
 import json
-import psycopg2
-from psycopg2 import sql
-
-def get_db_connection():
-    return psycopg2.connect(
-        dbname="travel_website",
-        user="fudongli",
-        password="",
-        host="localhost",
-        port="5432",
-        options="-c search_path=travel"
-    )
-
-def check_and_insert_optimization_tasks():
-    conn = get_db_connection()
-    cur = conn.cursor()
+import argparse
+from task_store import get_store, normalize_path, IMAGE_TASK, TASK_KEY_INDEX, BACKEND, SQLITE_PATH
 
-    data_dir = os.path.join(os.path.dirname(__file__), 'data')
-    for filename in os.listdir(data_dir):
+def collect_optimization_tasks(data_dir):
+    """[(idea, task_type, target_path, city)] for every unoptimized gallery image, one per target"""
+    tasks = {}
+    for filename in sorted(os.listdir(data_dir)):
         if filename.endswith('.json'):
             file_path = os.path.join(data_dir, filename)
             with open(file_path, 'r') as f:
                 try:
                     city_data = json.load(f)
-                    if 'gallery' in city_data:
-                        for image in city_data['gallery']:
-                            if '_optimized.jpg' not in image:
-                                task_description = f"Optimize image {image} for city {city_data.get('name', 'Unknown')}"
-                                cur.execute(
-                                    sql.SQL("INSERT INTO travel_development_ideas (idea, is_fixed) VALUES (%s, %s)"),
-                                    (task_description, False)
-                                )
-                                conn.commit()
                 except json.JSONDecodeError:
                     print(f"Error decoding JSON from {filename}")
+                    continue
+            if 'gallery' in city_data:
+                for image in city_data['gallery']:
+                    if '_optimized.jpg' not in image:
+                        target_path = normalize_path(image)
+                        city = city_data.get('name', 'Unknown')
+                        task_description = f"Optimize image {image} for city {city}"
+                        tasks.setdefault(target_path, (task_description, IMAGE_TASK, target_path, city))
+    return list(tasks.values())
+
+def check_and_insert_optimization_tasks(store):
+    if not store.task_keys:
+        print("Duplicate optimization tasks block the unique index; run with --compact first")
+        return
+
+    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    tasks = collect_optimization_tasks(data_dir)
+    inserted = store.enqueue(tasks)
+    print(f"Queued {inserted} new optimization tasks ({len(tasks) - inserted} already known)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue image optimization tasks for gallery images")
+    parser.add_argument('--compact', action='store_true',
+                        help="collapse duplicate tasks left by earlier runs, then create the unique index")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND)
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite database file (default: travel.db)")
+    args = parser.parse_args()
+
+    store = get_store(args.backend, args.sqlite)
+    if args.compact:
+        print(f"Removed {store.compact_duplicates()} duplicate tasks")
+        store.task_keys = store.ensure_schema()
+        if store.task_keys:
+            print(f"Unique index {TASK_KEY_INDEX} is in place")
+        return
 
-    cur.close()
-    conn.close()
+    check_and_insert_optimization_tasks(store)
 
 if __name__ == "__main__":
-    check_and_insert_optimization_tasks()
+    main()
@@ -1,67 +1,58 @@
 
-import psycopg2
-import schedule
-import time
+import argparse
 from datetime import datetime
+from task_store import get_store, BACKEND, SQLITE_PATH
 
-def check_for_tasks():
+def check_for_tasks(store, after_id=0):
     """
-    Connects to the travel_website database and checks for tasks
-    in the travel.travel_development_ideas table where is_fixed is false.
+    Checks the task store (travel_website on Postgres, or travel.db) for
+    tasks in the travel_development_ideas table where is_fixed is false.
+    Only tasks newer than after_id are listed; returns the highest id seen.
     """
     try:
-        # Establish a connection to the database
-        conn = psycopg2.connect(
-            dbname="travel_website",
-            user="fudongli",
-            host="localhost"
-        )
-        cur = conn.cursor()
-
-        # Execute the query to find tasks that are not fixed
-        cur.execute("SELECT id, idea, created_at FROM travel.travel_development_ideas WHERE is_fixed = false ORDER BY id;")
-        
-        # Fetch all the results
-        tasks = cur.fetchall()
+        # Find tasks that are not fixed
+        tasks = store.pending(after_id=after_id)
 
         # Get the current time for logging
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Check if there are any tasks
         if tasks:
-            print(f"[{current_time}] Found {len(tasks)} pending tasks:")
+            print(f"[{current_time}] Found {len(tasks)} {'new ' if after_id else ''}pending tasks:")
             for task in tasks:
-                print(f"  - Task ID: {task[0]}, Idea: {task[1]}, Created At: {task[2]}")
-        else:
-            print(f"[{current_time}] No pending tasks found.")
+                print(f"  - Task ID: {task['id']}, Idea: {task['idea']}, Created At: {task['created_at']}")
+            return max(after_id, tasks[-1]['id'])
+        print(f"[{current_time}] No {'new ' if after_id else ''}pending tasks found.")
 
-    except psycopg2.OperationalError as e:
-        print(f"Error connecting to the database: {e}")
     except Exception as e:
         print(f"An error occurred: {e}")
-    finally:
-        # Close the cursor and connection
-        if 'cur' in locals() and cur:
-            cur.close()
-        if 'conn' in locals() and conn:
-            conn.close()
+    return after_id
 
-def job():
-    """
-    This function is the job that will be scheduled to run every hour.
-    """
-    print("--- Running hourly task check ---")
-    check_for_tasks()
+def main():
+    parser = argparse.ArgumentParser(description="List pending tasks, then wait for new ones")
+    parser.add_argument('--once', action='store_true', help="list pending tasks and exit")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND)
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite database file (default: travel.db)")
+    args = parser.parse_args()
 
-# Schedule the job to run every hour
-schedule.every().hour.do(job)
+    store = get_store(args.backend, args.sqlite)
+    # Listen before the first check so a task inserted in between still wakes us
+    listener = None if args.once else store.listen()
+
+    print("--- Running task check ---")
+    last_id = check_for_tasks(store)
+    if args.once:
+        return
+
+    print(f"Waiting for new tasks ({store.backend} notifications)...")
+    try:
+        while True:
+            if listener.wait():
+                last_id = check_for_tasks(store, last_id)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
 
 if __name__ == "__main__":
-    print("Starting the task scheduler...")
-    # Run the job once immediately
-    job()
-    
-    # Keep the script running to execute the scheduled job
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    main()
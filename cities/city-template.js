@@ -53,6 +53,30 @@ const foodIcons = {
     'wuxi': 'https://kimi-web-img.moonshot.cn/img/cdn-akamai.lkk.com/43126db2f94f41e1ac0a5afb3b2fcc5d04521171.jpg'
 };
 
+// Intrinsic size and a dominant-color/LQIP background from image_placeholders.py, shown until the photo loads
+function placeholderAttrs(city, image) {
+    const placeholder = city.placeholders?.[image];
+    if (!placeholder) {
+        return '';
+    }
+    return ` width="${placeholder.width}" height="${placeholder.height}" style="background: ${placeholder.color} url('${placeholder.lqip}') center / cover;"`;
+}
+
+// Build <picture> markup from the srcsets responsive_images.py stores in the city JSON
+function responsiveImageHtml(city, image, alt) {
+    const variants = city.responsive?.[image];
+    const placeholder = placeholderAttrs(city, image);
+    if (!variants) {
+        return `<img src="${image}" alt="${alt}" class="gallery-img" loading="lazy"${placeholder}>`;
+    }
+
+    const sources = ['avif', 'webp']
+        .filter(format => variants[format])
+        .map(format => `<source type="image/${format}" srcset="${variants[format]}" sizes="${variants.sizes}">`)
+        .join('');
+    return `<picture>${sources}<img src="${variants.src}" srcset="${variants.jpeg}" sizes="${variants.sizes}" alt="${alt}" class="gallery-img" loading="lazy"${placeholder}></picture>`;
+}
+
 // Render city content
 function renderCityContent(cityData, cityId) {
     const city = cityData; // City data is at root level in individual JSON files
@@ -70,11 +94,21 @@ function renderCityContent(cityData, cityId) {
     
     // Set hero background image
     const heroSection = document.getElementById('city-hero');
-    heroSection.style.setProperty('--hero-image', `url('${city.heroImage}')`);
+    const heroImage = city.responsive?.[city.heroImage]?.background || city.heroImage;
+    heroSection.style.setProperty('--hero-image', `url('${heroImage}')`);
+    const heroPlaceholder = city.placeholders?.[city.heroImage];
+    if (heroPlaceholder) {
+        heroSection.style.setProperty('--hero-placeholder', `url('${heroPlaceholder.lqip}')`);
+        heroSection.style.setProperty('--hero-color', heroPlaceholder.color);
+    }
 
     // Get food icon for this city - use from JSON if available, otherwise fallback to mapping
+    // A cell of the food icon sprite (food_icon_sprite.py) saves a request per icon
     const foodIcon = city.cuisine?.food_icon || foodIcons[cityId] || '';
-    const foodIconHtml = foodIcon ? `<img src="${foodIcon}" alt="${city.name} food" style="width: 24px; height: 24px; border-radius: 50%; object-fit: cover; margin-right: 8px; vertical-align: middle;">` : '<i class="fas fa-star me-2"></i>';
+    const foodSprite = city.cuisine?.food_icon_sprite;
+    const foodIconHtml = foodSprite
+        ? `<span class="food-icon" role="img" aria-label="${city.name} food" style="background-position: ${foodSprite.position};"></span>`
+        : foodIcon ? `<img src="${foodIcon}" alt="${city.name} food" style="width: 24px; height: 24px; border-radius: 50%; object-fit: cover; margin-right: 8px; vertical-align: middle;">` : '<i class="fas fa-star me-2"></i>';
 
     // Generate content HTML
     const contentHTML = `
@@ -163,7 +197,7 @@ function renderCityContent(cityData, cityId) {
             <h2><i class="fas fa-camera-retro me-3"></i>Gallery</h2>
             <div class="city-gallery">
                 ${city.gallery.map((image, index) => `
-                    <img src="${image}" alt="${city.name} view ${index + 1}" class="gallery-img" loading="lazy">
+                    ${responsiveImageHtml(city, image, `${city.name} view ${index + 1}`)}
                 `).join('')}
             </div>
         </section>
@@ -319,6 +353,12 @@ function initializeNavigation() {
 
 // Main initialization function
 async function initializeCityPage() {
+    // Pages written by build_city_pages.py already contain the rendered content
+    if (document.body.dataset.prerendered) {
+        initializeNavigation();
+        return;
+    }
+
     const cityId = getCityId();
     const cityData = await loadCityData(cityId);
     
@@ -10,9 +10,9 @@ Clawdbot-Integrated Website Monitor
 import os
 import json
 import re
-import subprocess
 import sys
 from datetime import datetime
+from script_runner import run_script
 
 # Telegram configuration
 TELEGRAM_CHAT_ID = "8080442123"
@@ -99,12 +99,7 @@ def check_all_and_alert():
             
             # Try to fix
             try:
-                result = subprocess.run(
-                    [sys.executable, "search_city_images.py"],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
+                result = run_script("search_city_images.py", timeout=60)
                 if result.returncode == 0:
                     images_fixes.append("Ran image search")
             except Exception as e:
@@ -143,12 +138,7 @@ def check_all_and_alert():
                 
                 # Try to fix
                 try:
-                    result = subprocess.run(
-                        [sys.executable, "create_missing_city_pages.py"],
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
+                    result = run_script("create_missing_city_pages.py")
                     if result.returncode == 0:
                         pages_fixes.append("Created missing pages")
                 except Exception as e:
@@ -183,12 +173,7 @@ def check_all_and_alert():
         if nav_issues:
             # Try to fix
             try:
-                result = subprocess.run(
-                    [sys.executable, "fix_all_issues.py"],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                result = run_script("fix_all_issues.py")
                 if result.returncode == 0:
                     nav_fixes.append("Fixed navigation links")
             except Exception as e:
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Unused-CSS elimination and critical-CSS extraction.
+style.css and every inline <style> block are parsed into rules and each
+selector is matched against the classes, ids and tags the pages actually use
+(plus every word in the pages' scripts, so classes added from JavaScript are
+kept). Rules no page can match are dropped. For each page the rules matching
+the elements in the first screen are extracted as critical CSS; the publish
+step inlines them and loads the full stylesheet asynchronously.
+
+Usage: python3 css_optimizer.py
+"""
+
+import os
+import re
+import hashlib
+from html.parser import HTMLParser
+from site_index import PageParser, CSS_URL, get_site_index
+from page_weight import resolve_local, is_remote
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Start tags in <body> treated as the first screen
+FOLD_ELEMENTS = 80
+# Above this the critical CSS would no longer fit the first round trip; keep the blocking link
+CRITICAL_MAX_BYTES = 14 * 1024
+GROUPING_RULES = ('@media', '@supports', '@layer', '@document', '@container')
+
+COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+PSEUDO_FUNCTION = re.compile(r':{1,2}[\w-]+\((?:[^()]|\([^()]*\))*\)')
+PSEUDO = re.compile(r':{1,2}[\w-]+')
+ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+CLASS_OR_ID = re.compile(r'([.#])(-?[_a-zA-Z][\w-]*)')
+NAME = re.compile(r'[a-zA-Z][\w-]*')
+WORD = re.compile(r'[A-Za-z_][\w-]*')
+ANIMATION = re.compile(r'animation(?:-name)?\s*:\s*([^;}]+)')
+SCRIPT_BODY = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.DOTALL | re.IGNORECASE)
+STYLE_BLOCK = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.DOTALL | re.IGNORECASE)
+STYLESHEET_LINK = re.compile(r'<link\b[^>]*\brel\s*=\s*["\']?stylesheet["\']?[^>]*>', re.IGNORECASE)
+HREF = re.compile(r'\bhref\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+MEDIA = re.compile(r'\bmedia\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+class Rule:
+    """A style rule (prelude + declarations) or an at-rule; grouping at-rules hold child rules"""
+
+    def __init__(self, prelude, body=None, children=None):
+        self.prelude = prelude
+        self.body = body
+        self.children = children
+
+    @property
+    def selectors(self):
+        """The selector list split at top-level commas (not those inside :is()/:not())"""
+        selectors, depth, start = [], 0, 0
+        for i, c in enumerate(self.prelude):
+            if c in '([':
+                depth += 1
+            elif c in ')]':
+                depth -= 1
+            elif c == ',' and depth == 0:
+                selectors.append(self.prelude[start:i])
+                start = i + 1
+        selectors.append(self.prelude[start:])
+        return [selector.strip() for selector in selectors if selector.strip()]
+
+    def css(self):
+        if self.children is not None:
+            return f"{self.prelude}{{{''.join(child.css() for child in self.children)}}}"
+        if self.body is None:
+            return f"{self.prelude};"
+        return f"{self.prelude}{{{self.body}}}"
+
+def _find(css, i, stops):
+    """Index of the next stop character outside strings, or -1"""
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i += 1
+            while i < len(css) and css[i] != c:
+                i += 2 if css[i] == '\\' else 1
+        elif c in stops:
+            return i
+        i += 1
+    return -1
+
+def _matching_brace(css, i):
+    depth = 1
+    while depth:
+        i = _find(css, i + 1, '{}')
+        if i == -1:
+            return len(css)
+        depth += 1 if css[i] == '{' else -1
+    return i
+
+def _parse_block(css, i):
+    nodes = []
+    while i < len(css):
+        j = _find(css, i, '{};')
+        if j == -1:
+            break
+        prelude = ' '.join(css[i:j].split())
+        if css[j] == '}':
+            return nodes, j + 1
+        if css[j] == ';':
+            if prelude:
+                nodes.append(Rule(prelude))
+            i = j + 1
+        elif prelude.lower().startswith(GROUPING_RULES):
+            children, i = _parse_block(css, j + 1)
+            nodes.append(Rule(prelude, children=children))
+        else:
+            end = _matching_brace(css, j)
+            nodes.append(Rule(prelude, body=css[j + 1:end].strip()))
+            i = end + 1
+    return nodes, i
+
+def parse_css(css):
+    """Rules of a stylesheet, comments removed"""
+    css = COMMENT.sub(lambda m: m.group(1) or '', css)
+    return _parse_block(css, 0)[0]
+
+def serialize(rules):
+    return ''.join(rule.css() for rule in rules)
+
+def selector_requirements(selector):
+    """(classes, ids, tags) an element must carry somewhere on the page for the selector to match"""
+    simple = ATTRIBUTE.sub('', PSEUDO_FUNCTION.sub('', selector))
+    simple = PSEUDO.sub('', simple)
+    classes, ids = set(), set()
+    for kind, name in CLASS_OR_ID.findall(simple):
+        (classes if kind == '.' else ids).add(name)
+    tags = {name.lower() for name in NAME.findall(CLASS_OR_ID.sub(' ', simple))}
+    return classes, ids, tags
+
+class CssUsage:
+    """Classes, ids and tags present on one or more pages, plus the words in their scripts"""
+
+    def __init__(self):
+        self.classes = set()
+        self.ids = set()
+        self.tags = set()
+        self.words = set()
+
+    def add_html(self, html, scripts=()):
+        parser = PageParser()
+        parser.feed(html)
+        parser.close()
+        self.classes.update(parser.classes)
+        self.ids.update(parser.ids)
+        self.tags.update(parser.tags)
+        for body in SCRIPT_BODY.findall(html):
+            self.add_script(body)
+        for script in scripts:
+            self.add_script(script)
+
+    def add_script(self, text):
+        self.words.update(WORD.findall(text))
+
+    def update(self, other):
+        self.classes |= other.classes
+        self.ids |= other.ids
+        self.tags |= other.tags
+        self.words |= other.words
+
+    def matches(self, selector):
+        classes, ids, tags = selector_requirements(selector)
+        return (all(name in self.classes or name in self.words for name in classes)
+                and all(name in self.ids or name in self.words for name in ids)
+                and all(name in self.tags or name in self.words for name in tags))
+
+    def digest(self):
+        names = [sorted(self.classes), sorted(self.ids), sorted(self.tags), sorted(self.words)]
+        return hashlib.sha256(repr(names).encode('utf-8')).hexdigest()[:16]
+
+class FoldParser(HTMLParser):
+    """Classes, ids and tags of the first FOLD_ELEMENTS start tags in <body>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.usage = CssUsage()
+        self.usage.tags.update(('html', 'body'))
+        self.in_body = False
+        self.seen = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_body = True
+        if not self.in_body or self.seen >= FOLD_ELEMENTS:
+            return
+        self.seen += 1
+        attrs = dict(attrs)
+        self.usage.tags.add(tag)
+        self.usage.classes.update((attrs.get('class') or '').split())
+        if attrs.get('id'):
+            self.usage.ids.add(attrs['id'])
+
+def _keyframes_name(rule):
+    parts = rule.prelude.split(None, 1)
+    return parts[1].strip() if rule.body is not None and parts[0].lower().endswith('keyframes') and len(parts) > 1 else None
+
+def _filter(rules, keep):
+    """Rules with each selector list reduced to the selectors keep() accepts"""
+    result = []
+    for rule in rules:
+        if rule.children is not None:
+            children = _filter(rule.children, keep)
+            if children:
+                result.append(Rule(rule.prelude, children=children))
+        elif rule.prelude.startswith('@') or rule.body is None:
+            result.append(rule)
+        else:
+            selectors = [selector for selector in rule.selectors if keep(selector)]
+            if selectors and rule.body:
+                result.append(Rule(','.join(selectors), body=rule.body))
+    return result
+
+def _drop_unused_keyframes(rules):
+    used = set()
+    def collect(rules):
+        for rule in rules:
+            if rule.children is not None:
+                collect(rule.children)
+            elif rule.body and _keyframes_name(rule) is None:
+                for value in ANIMATION.findall(rule.body):
+                    used.update(WORD.findall(value))
+    collect(rules)
+
+    def drop(rules):
+        kept = []
+        for rule in rules:
+            name = _keyframes_name(rule)
+            if name is not None and name not in used:
+                continue
+            if rule.children is not None:
+                rule = Rule(rule.prelude, children=drop(rule.children))
+            kept.append(rule)
+        return kept
+    return drop(rules)
+
+def prune(rules, usage):
+    """Drop the selectors no page can match, then empty groups and unreferenced @keyframes"""
+    return _drop_unused_keyframes(_filter(rules, usage.matches))
+
+def critical(rules, fold):
+    """Rules needed to render the first screen (plus @font-face and what they animate)"""
+    def keep(rules):
+        result = []
+        for rule in rules:
+            if rule.children is not None:
+                children = keep(rule.children)
+                if children:
+                    result.append(Rule(rule.prelude, children=children))
+            elif rule.prelude.lower().startswith(('@font-face', '@charset')) or _keyframes_name(rule):
+                result.append(rule)
+            elif not rule.prelude.startswith('@') and rule.body:
+                selectors = [selector for selector in rule.selectors if fold.matches(selector)]
+                if selectors:
+                    result.append(Rule(','.join(selectors), body=rule.body))
+        return result
+    return _drop_unused_keyframes(keep(rules))
+
+def stylesheet_usage(website_dir=WEBSITE_DIR):
+    """Usage per local stylesheet, merged across the pages that link it"""
+    usages = {}
+    for path, page in get_site_index(website_dir).pages.items():
+        usage = None
+        for href in page.stylesheets:
+            rel_path = resolve_local(path, href)
+            if rel_path and os.path.isfile(os.path.join(website_dir, rel_path)):
+                usage = usage or page_usage(page.content, path, website_dir)
+                usages.setdefault(rel_path, CssUsage()).update(usage)
+    return usages
+
+def page_usage(html, page_path, website_dir=WEBSITE_DIR):
+    """Usage of a single page, including the local scripts it loads"""
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    scripts = []
+    for src in parser.scripts:
+        rel_path = resolve_local(page_path, src)
+        if rel_path and os.path.isfile(os.path.join(website_dir, rel_path)):
+            with open(os.path.join(website_dir, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+                scripts.append(f.read())
+    usage = CssUsage()
+    usage.add_html(html, scripts)
+    return usage
+
+def fold_usage(html):
+    parser = FoldParser()
+    parser.feed(html)
+    parser.close()
+    return parser.usage
+
+def prune_stylesheet(css, usage):
+    return serialize(prune(parse_css(css), usage))
+
+def rebase_urls(css, stylesheet_path, page_path):
+    """Rewrite relative url()s of a stylesheet so they resolve the same when inlined into the page"""
+    def rebase(match):
+        url = match.group(1).strip()
+        if is_remote(url) or url.startswith(('/', 'data:', '#')):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(os.path.dirname(stylesheet_path), url))
+        return f"url('{os.path.relpath(target, os.path.dirname(page_path) or '.')}')"
+    return CSS_URL.sub(rebase, css)
+
+def optimize_page(html, page_path, load_stylesheet, website_dir=WEBSITE_DIR):
+    """
+    Prune the page's inline <style> blocks against its own markup and
+    scripts, and replace each render-blocking local stylesheet link with its
+    critical rules inline plus an asynchronous load of the full file.
+    load_stylesheet(rel_path) returns the (pruned) stylesheet text or None.
+    """
+    usage = page_usage(html, page_path, website_dir)
+    html = STYLE_BLOCK.sub(lambda m: m.group(1) + prune_stylesheet(m.group(2), usage) + m.group(3), html)
+    fold = fold_usage(html)
+
+    def inline_critical(match):
+        tag = match.group(0)
+        href = HREF.search(tag)
+        media = MEDIA.search(tag)
+        if not href or (media and media.group(1) not in ('all', 'screen')):
+            return tag
+        rel_path = resolve_local(page_path, href.group(1))
+        css = load_stylesheet(rel_path) if rel_path else None
+        if css is None:
+            return tag
+        inline = rebase_urls(serialize(critical(parse_css(css), fold)), rel_path, page_path)
+        if not inline or len(inline.encode('utf-8')) > CRITICAL_MAX_BYTES:
+            return tag
+        url = href.group(1)
+        return (f'<style>{inline}</style>\n'
+                f'<link rel="preload" href="{url}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+                f'<noscript><link rel="stylesheet" href="{url}"></noscript>')
+
+    return STYLESHEET_LINK.sub(inline_critical, html)
+
+def main():
+    print("🎨 CSS USAGE")
+    print("=" * 50)
+    index = get_site_index()
+    usage = stylesheet_usage()["style.css"]
+
+    with open(os.path.join(WEBSITE_DIR, "style.css"), 'r', encoding='utf-8') as f:
+        stylesheet = f.read()
+    rules = parse_css(stylesheet)
+    pruned = prune(rules, usage)
+    print(f"style.css: {len(serialize(rules)) / 1024:.1f} KB of rules → "
+          f"{len(serialize(pruned)) / 1024:.1f} KB used by the site")
+
+    for path, page in sorted(index.pages.items()):
+        if not any(resolve_local(path, href) == "style.css" for href in page.stylesheets):
+            continue
+        inline = ''.join(body for _, body, _ in STYLE_BLOCK.findall(page.content))
+        kept = prune_stylesheet(inline, page_usage(page.content, path))
+        first_screen = serialize(critical(pruned, fold_usage(page.content)))
+        print(f"📄 {path}: inline {len(inline) / 1024:.1f} KB → {len(kept) / 1024:.1f} KB, "
+              f"critical {len(first_screen) / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
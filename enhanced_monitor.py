@@ -9,12 +9,12 @@ Runs every 10 minutes via cron job.
 
 import os
 import json
-import re
 import time
-import subprocess
-import sys
 from datetime import datetime
 from collections import defaultdict
+from site_index import get_site_index
+from script_runner import run_script
+from link_checker import LinkChecker, collect_urls
 
 class EnhancedWebsiteMonitor:
     def __init__(self):
@@ -23,6 +23,7 @@ class EnhancedWebsiteMonitor:
         self.log_file = "enhanced_monitor.log"
         self.issues_found = 0
         self.improvements_made = 0
+        self.site_index = None
         
         # All 12 cities that should exist
         self.all_cities = [
@@ -162,44 +163,25 @@ class EnhancedWebsiteMonitor:
         self.log("-" * 40)
         
         issues = []
+        index = self.get_index()
         
         # Check main page
-        main_page = os.path.join(self.website_dir, "index.html")
-        if os.path.exists(main_page):
-            with open(main_page, 'r', encoding='utf-8') as f:
-                main_content = f.read()
-            
-            # Extract links from main page
-            main_links = re.findall(r'href="([^"]+)"', main_content)
-            main_city_links = [link for link in main_links if 'cities/' in link]
-            
+        if index.main_page:
+            main_city_links = [link for link in index.main_page.links if 'cities/' in link]
             self.log(f"Main page has {len(main_city_links)} city links")
         
         # Check city pages
-        cities_dir = os.path.join(self.website_dir, "cities")
-        city_files = [f for f in os.listdir(cities_dir) if f.endswith('.html') and f != 'template.html']
-        
-        for city_file in city_files[:3]:  # Check first 3
-            file_path = os.path.join(cities_dir, city_file)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                city_content = f.read()
-            
-            # Check back to home link
-            home_links = re.findall(r'href="([^"]*index\\.html[^"]*)"', city_content)
+        for page in index.city_pages():
+            home_links = page.home_links()
             
             # Should have at least one link back to home
-            if not any('index.html' in link for link in home_links):
-                issues.append(f"{city_file}: No link back to home page")
+            if not home_links:
+                issues.append(f"{page.name}: No link back to home page")
             
             # Check link consistency
-            inconsistent_links = []
-            for link in home_links:
-                if not link.startswith('/travel-website/') and 'index.html' in link:
-                    inconsistent_links.append(link)
-            
+            inconsistent_links = [link for link in home_links if not link.startswith('/travel-website/')]
             if inconsistent_links:
-                issues.append(f"{city_file}: Inconsistent home links: {', '.join(inconsistent_links[:2])}")
+                issues.append(f"{page.name}: Inconsistent home links: {', '.join(inconsistent_links[:2])}")
         
         if issues:
             self.log(f"⚠️  Found {len(issues)} navigation issues:")
@@ -223,47 +205,27 @@ class EnhancedWebsiteMonitor:
         color_usage = defaultdict(set)
         layout_elements = defaultdict(set)
         
+        index = self.get_index()
+        
         # Check main page first
-        main_page = os.path.join(self.website_dir, "index.html")
-        if os.path.exists(main_page):
-            with open(main_page, 'r', encoding='utf-8') as f:
-                main_content = f.read()
-            
-            # Extract colors from main page
-            main_colors = self.extract_colors(main_content)
-            main_layout = self.extract_layout_elements(main_content)
-            
-            self.log(f"📄 Main page: {len(main_colors)} colors, {len(main_layout)} layout elements")
+        if index.main_page:
+            main_layout = index.main_page.layout_elements()
+            self.log(f"📄 Main page: {len(index.main_page.colors)} colors, {len(main_layout)} layout elements")
         
         # Check all city pages
-        cities_dir = os.path.join(self.website_dir, "cities")
-        city_files = [f for f in os.listdir(cities_dir) if f.endswith('.html') and f != 'template.html']
-        
-        for city_file in city_files[:6]:  # Check first 6 to save time
-            file_path = os.path.join(cities_dir, city_file)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        for page in index.city_pages():
+            for color in page.colors:
+                color_usage[color].add(page.name)
             
-            # Check colors
-            colors = self.extract_colors(content)
-            for color in colors:
-                color_usage[color].add(city_file)
-            
-            # Check layout elements
-            layout = self.extract_layout_elements(content)
-            for element in layout:
-                layout_elements[element].add(city_file)
+            for element in page.layout_elements():
+                layout_elements[element].add(page.name)
             
             # Check for required elements
             required_elements = ['city-hero', 'city-content', 'gallery']
-            missing_elements = []
-            for element in required_elements:
-                if element not in content.lower():
-                    missing_elements.append(element)
+            missing_elements = [element for element in required_elements if element not in page.lower]
             
             if missing_elements:
-                issues.append(f"{city_file}: Missing {', '.join(missing_elements)}")
+                issues.append(f"{page.name}: Missing {', '.join(missing_elements)}")
         
         # Analyze consistency
         self.log("\n🎨 COLOR CONSISTENCY ANALYSIS:")
@@ -303,56 +265,45 @@ class EnhancedWebsiteMonitor:
         self.log("✅ Layout and colors are consistent across pages!")
         return True
     
-    def extract_colors(self, content):
-        """Extract CSS colors from HTML/CSS content."""
-        colors = set()
-        
-        # Look for hex colors - check for 6-digit first, then 3-digit
-        hex_pattern = r'#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})'
-        hex_matches = re.findall(hex_pattern, content)
-        for match in hex_matches:
-            if len(match) == 3:
-                colors.add(f"#{match[0]}{match[0]}{match[1]}{match[1]}{match[2]}{match[2]}".lower())
-            else:
-                colors.add(f"#{match}".lower())
+    def check_external_links(self):
+        """Check 5: Do remote images, food icons and CDN files still resolve?"""
+        self.log("\n🔗 CHECK 5: EXTERNAL LINKS")
+        self.log("-" * 40)
         
-        # Look for CSS variables
-        var_pattern = r'var\(--([^)]+)\)'
-        var_matches = re.findall(var_pattern, content)
-        colors.update(var_matches)
+        urls = collect_urls(self.website_dir)
+        checker = LinkChecker()
+        try:
+            results = checker.check(urls)
+        finally:
+            checker.close()
         
-        # Look for RGB/RGBA
-        rgb_pattern = r'rgb\([^)]+\)|rgba\([^)]+\)'
-        rgb_matches = re.findall(rgb_pattern, content)
-        colors.update(rgb_matches)
+        if results and all(result["status"] is None for result in results.values()):
+            self.log("⚠️  No remote host answered, network may be down - skipping", "WARNING")
+            return True
         
-        return colors
+        self.log(f"Checked {len(results)} URLs: {checker.stats['cache_hits']} cached, "
+                 f"{checker.stats['requests']} requests on {checker.stats['connections']} connections")
+        
+        broken = [result for result in results.values() if not result["ok"]]
+        if broken:
+            self.log(f"⚠️  Found {len(broken)} broken remote URLs:")
+            for result in broken[:3]:
+                reason = result.get("error") or f"HTTP {result['status']}"
+                self.log(f"   • {result['url']} ({reason}) in {', '.join(sorted(urls[result['url']])[:2])}")
+            if len(broken) > 3:
+                self.log(f"   ... and {len(broken)-3} more")
+            
+            self.issues_found += len(broken)
+            return False
+        
+        self.log("✅ All remote links resolve!")
+        return True
     
-    def extract_layout_elements(self, content):
-        """Extract layout elements from HTML."""
-        elements = set()
-        
-        # Look for CSS classes
-        class_pattern = r'class="([^"]+)"'
-        class_matches = re.findall(class_pattern, content)
-        for match in class_matches:
-            classes = match.split()
-            elements.update(classes)
-        
-        # Look for IDs
-        id_pattern = r'id="([^"]+)"'
-        id_matches = re.findall(id_pattern, content)
-        elements.update(id_matches)
-        
-        # Look for specific layout elements
-        layout_keywords = ['container', 'row', 'col', 'hero', 'section', 'card', 
-                          'navbar', 'footer', 'header', 'main', 'aside', 'article']
-        
-        for keyword in layout_keywords:
-            if keyword in content.lower():
-                elements.add(keyword)
-        
-        return elements
+    def get_index(self):
+        """Site index shared by all checks of this run."""
+        if self.site_index is None:
+            self.site_index = get_site_index(self.website_dir)
+        return self.site_index
     
     def run_improvements(self):
         """Run improvements based on detected issues."""
@@ -369,13 +320,7 @@ class EnhancedWebsiteMonitor:
             if len(html_files) < len(self.all_cities):
                 self.log(f"Creating missing city pages ({len(html_files)}/{len(self.all_cities)} found)...")
                 try:
-                    result = subprocess.run(
-                        [sys.executable, "create_missing_city_pages.py"],
-                        cwd=self.website_dir,
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
+                    result = run_script("create_missing_city_pages.py", cwd=self.website_dir)
                     
                     if result.returncode == 0:
                         improvements.append("Created missing city pages")
@@ -386,13 +331,7 @@ class EnhancedWebsiteMonitor:
         # Fix image consistency
         self.log("Checking image consistency...")
         try:
-            result = subprocess.run(
-                [sys.executable, "fix_city_page_images.py"],
-                cwd=self.website_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = run_script("fix_city_page_images.py", cwd=self.website_dir)
             
             if result.returncode == 0:
                 if "Updated" in result.stdout:
@@ -417,6 +356,7 @@ class EnhancedWebsiteMonitor:
             ("Layout & Color Consistency", self.check_layout_color_consistency),
             ("Navigation Links", self.check_navigation_links),
             ("News Section", self.check_news_section),
+            ("External Links", self.check_external_links),
         ]
         
         results = {}
@@ -478,15 +418,14 @@ class EnhancedWebsiteMonitor:
         """Check if news section exists and has content."""
         self.log("📰 Checking news section...")
         
-        index_path = os.path.join(self.website_dir, "index.html")
+        main_page = self.get_index().main_page
         
-        if not os.path.exists(index_path):
+        if main_page is None:
             self.log("❌ index.html not found", "ERROR")
             return False
         
         try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = main_page.content
             
             # Check for news section
             has_news_section = "Latest Travel News" in content
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Duplicate and near-duplicate photo finder for travel website
+Computes a 64-bit dHash and pHash for every image in images/user_photos. The
+decoded thumbnails are stacked into one NumPy batch and both hashes are
+computed for all photos at once. Near-duplicates are found with a BK-tree
+over the pHash (Hamming distance), so each photo is compared with a handful
+of candidates instead of every other photo. A dHash check confirms each
+match. Every cluster is reported with the data/*.json files and pages that
+reference its photos, so duplicates can be merged without breaking a gallery.
+
+Hashes are cached in the image optimization manifest by content hash.
+
+Usage: python3 find_duplicate_images.py [--threshold N] [--workers N] [--json FILE]
+"""
+
+import os
+import json
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+from optimization_manifest import OptimizationManifest
+from responsive_images import find_sources, split_reference
+from site_index import get_site_index
+from page_weight import resolve_local
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(WEBSITE_DIR, "data")
+
+HASH_SIZE = 8
+# pHash is taken from the low frequencies of a 32x32 DCT
+PHASH_SIZE = 32
+# Hamming distances (out of 64 bits) still considered the same photo
+PHASH_THRESHOLD = 10
+DHASH_THRESHOLD = 12
+SETTINGS = {'hash_size': HASH_SIZE, 'phash_size': PHASH_SIZE, 'version': 1}
+
+def load_thumbnails(source_path):
+    """Grayscale thumbnails for dHash (9x8) and pHash (32x32) of one image (runs inside a pool worker)"""
+    try:
+        with Image.open(os.path.join(WEBSITE_DIR, source_path)) as img:
+            img.draft('L', (PHASH_SIZE * 2, PHASH_SIZE * 2))
+            gray = img.convert('L')
+            dhash = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.float32)
+            phash = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float32)
+        return source_path, dhash, phash, None
+    except Exception as e:
+        return source_path, None, None, str(e)
+
+def dct_matrix(size):
+    """Orthonormal DCT-II basis, so the 2-D DCT of X is D @ X @ D.T"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+def pack_bits(bits):
+    """(N, 64) booleans → N Python ints"""
+    packed = np.packbits(bits.reshape(len(bits), -1), axis=1)
+    return [int.from_bytes(row.tobytes(), 'big') for row in packed]
+
+def batch_hashes(dhash_thumbs, phash_thumbs):
+    """dHash and pHash of a whole batch: arrays of shape (N, 8, 9) and (N, 32, 32)"""
+    dhash_bits = dhash_thumbs[:, :, 1:] > dhash_thumbs[:, :, :-1]
+
+    dct = dct_matrix(PHASH_SIZE)
+    coefficients = np.einsum('ij,njk,lk->nil', dct, phash_thumbs, dct)[:, :HASH_SIZE, :HASH_SIZE]
+    flat = coefficients.reshape(len(coefficients), -1)
+    # The DC term says nothing about structure; leave it out of the median
+    medians = np.median(flat[:, 1:], axis=1, keepdims=True)
+    phash_bits = flat > medians
+
+    return pack_bits(dhash_bits), pack_bits(phash_bits)
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """Metric tree over Hamming distance: a radius query only visits children within range"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, item, {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, item, {})
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, item)] of every entry within radius"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.append((distance, item))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+def compute_hashes(sources, workers=1, force=False):
+    """{source path: {'sha256', 'dhash', 'phash', 'bytes'}} for every readable image"""
+    cache = OptimizationManifest()
+    hashes, todo = {}, []
+    for path in sources:
+        entry = None if force else cache.lookup(os.path.join(WEBSITE_DIR, path), SETTINGS, stage="perceptual_hash")
+        if entry and 'dhash' in entry:
+            hashes[path] = {'sha256': entry['sha256'], 'dhash': int(entry['dhash'], 16),
+                            'phash': int(entry['phash'], 16), 'bytes': entry['size']}
+        else:
+            todo.append(path)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            loaded = list(pool.map(load_thumbnails, todo, chunksize=8))
+        for path, _, _, error in loaded:
+            if error:
+                print(f"   ❌ {path}: {error}")
+        loaded = [item for item in loaded if item[3] is None]
+        if loaded:
+            dhashes, phashes = batch_hashes(np.stack([item[1] for item in loaded]),
+                                            np.stack([item[2] for item in loaded]))
+            for (path, _, _, _), dhash, phash in zip(loaded, dhashes, phashes):
+                entry = cache.record(os.path.join(WEBSITE_DIR, path), SETTINGS, stage="perceptual_hash",
+                                     dhash=f"{dhash:016x}", phash=f"{phash:016x}")
+                hashes[path] = {'sha256': entry['sha256'], 'dhash': dhash, 'phash': phash, 'bytes': entry['size']}
+        cache.save()
+
+    print(f"📊 {len(hashes)} images hashed ({len(todo)} decoded, {len(hashes) - len(todo)} from cache)")
+    return hashes
+
+def find_clusters(hashes, phash_threshold=PHASH_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+    """Groups of two or more images that are identical or look the same, largest first"""
+    parent = {path: path for path in hashes}
+
+    def find(path):
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    tree = BKTree()
+    for path in sorted(hashes):
+        value = hashes[path]
+        for _, other in tree.search(value['phash'], phash_threshold):
+            if value['sha256'] == hashes[other]['sha256'] or hamming(value['dhash'], hashes[other]['dhash']) <= dhash_threshold:
+                parent[find(path)] = find(other)
+        tree.add(value['phash'], path)
+
+    clusters = defaultdict(list)
+    for path in hashes:
+        clusters[find(path)].append(path)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1),
+                  key=lambda members: (-len(members), members))
+
+def find_references(website_dir=WEBSITE_DIR):
+    """{source image path: set of data/*.json files and pages referencing it}"""
+    references = defaultdict(set)
+    for filename in sorted(os.listdir(DATA_DIR)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(DATA_DIR, filename), 'r', encoding='utf-8') as f:
+            city_data = json.load(f)
+        if not isinstance(city_data, dict):
+            continue
+        for url in [city_data.get('heroImage')] + list(city_data.get('gallery', [])):
+            if isinstance(url, str) and not url.startswith(('http://', 'https://', 'data:')):
+                references[split_reference(url)[1]].add(f"data/{filename}")
+
+    for path, page in get_site_index(website_dir).pages.items():
+        for url in page.images + page.srcset_candidates:
+            rel_path = resolve_local(path, url)
+            if rel_path:
+                references[rel_path].add(path)
+    return references
+
+def describe(clusters, hashes, references):
+    """Cluster report: which file to keep (most referenced, then largest) and what the rest cost"""
+    report = []
+    for members in clusters:
+        keep = max(members, key=lambda path: (len(references.get(path, ())), hashes[path]['bytes']))
+        report.append({
+            'keep': keep,
+            'duplicates': [path for path in members if path != keep],
+            'identical': len({hashes[path]['sha256'] for path in members}) == 1,
+            'reclaimable_bytes': sum(hashes[path]['bytes'] for path in members if path != keep),
+            'references': {path: sorted(references.get(path, ())) for path in members}
+        })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate photos in images/user_photos")
+    parser.add_argument('--threshold', type=int, default=PHASH_THRESHOLD,
+                        help=f"max pHash Hamming distance out of 64 bits (default: {PHASH_THRESHOLD})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="decoder processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="ignore cached hashes")
+    parser.add_argument('--json', metavar='FILE', help="also write the report as JSON")
+    args = parser.parse_args()
+
+    print("🔍 DUPLICATE PHOTOS")
+    print("=" * 50)
+    hashes = compute_hashes(find_sources(), args.workers, args.force)
+    report = describe(find_clusters(hashes, args.threshold), hashes, find_references())
+
+    for cluster in report:
+        kind = "identical" if cluster['identical'] else "near-duplicates"
+        print(f"\n🖼️  {kind}: keep {cluster['keep']} (saves {cluster['reclaimable_bytes'] / 1024:.0f} KB)")
+        for path in [cluster['keep']] + cluster['duplicates']:
+            used_by = ', '.join(cluster['references'][path]) or "not referenced"
+            print(f"   {'✅' if path == cluster['keep'] else '♻️ '} {path} ← {used_by}")
+
+    total = sum(cluster['reclaimable_bytes'] for cluster in report)
+    print(f"\n📊 {len(report)} clusters, {sum(len(c['duplicates']) for c in report)} redundant files, "
+          f"{total / 1024 / 1024:.1f} MB reclaimable")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📁 Report: {args.json}")
+
+if __name__ == "__main__":
+    main()
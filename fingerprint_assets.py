@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Content-hashed asset names.
+Stylesheets, scripts, data JSON and images referenced from the site's HTML,
+CSS, JS and JSON get a copy named after their content hash
+(style.css → style.1a2b3c4d.css) and every literal reference is rewritten to
+the hashed name. A file's hash covers the hashes of the assets it references
+itself, so a changed image also renames the stylesheet that uses it. The
+original names stay published for references built at runtime
+(e.g. fetch(`../data/${cityId}.json`)).
+
+publish_site.py applies the plan to _site/ and writes asset-manifest.json
+and the cache headers (_site/_headers) next to it: immutable for the hashed
+paths, a short TTL for the HTML pages. netlify.toml is never rewritten, so
+the build does not change its own config after Netlify has read it.
+
+Usage: python3 fingerprint_assets.py
+"""
+
+import os
+import re
+import json
+import hashlib
+from page_weight import resolve_local
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = "asset-manifest.json"
+# Netlify reads cache rules from this file in the publish directory
+HEADERS_NAME = "_headers"
+
+ASSET_EXTENSIONS = {'.css', '.js', '.json', '.jpg', '.jpeg', '.png', '.webp', '.avif', '.gif', '.svg'}
+# Files whose content can reference other assets
+TEXT_EXTENSIONS = {'.html', '.css', '.js', '.json'}
+HASH_LENGTH = 8
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+HTML_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+ASSET_REF = re.compile(r'(?<![\w.@-])((?:\.\.?/|/)?(?:[\w.-]+/)*[\w.-]+\.(?:css|js|json|jpe?g|png|webp|avif|gif|svg))(?![\w-])',
+                       re.IGNORECASE)
+
+def hashed_name(rel_path, digest):
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{extension}"
+
+def resolve_reference(ref, from_path, candidates):
+    """The asset a reference points to, relative to the referencing file or else the site root"""
+    rel_path = resolve_local(from_path, ref)
+    if rel_path in candidates:
+        return rel_path
+    rel_path = os.path.normpath(re.sub(r'^(\.\./|\./)+', '', ref.lstrip('/')))
+    return rel_path if rel_path in candidates else None
+
+def find_references(text, from_path, candidates):
+    """[(start, end, asset path)] of every literal reference to a candidate asset"""
+    references = []
+    for match in ASSET_REF.finditer(text):
+        rel_path = resolve_reference(match.group(1), from_path, candidates)
+        if rel_path and rel_path != from_path:
+            references.append((match.start(1), match.end(1), rel_path))
+    return references
+
+def rewrite_references(text, from_path, assets):
+    """Point every reference to a fingerprinted asset at its hashed name, keeping the path as written"""
+    parts, last = [], 0
+    for start, end, rel_path in find_references(text, from_path, assets):
+        ref = text[start:end]
+        parts.append(text[last:start])
+        parts.append(ref[:ref.rfind('/') + 1] + os.path.basename(assets[rel_path]))
+        last = end
+    parts.append(text[last:])
+    return ''.join(parts)
+
+def read_text(rel_path, website_dir, overrides):
+    if rel_path in overrides:
+        return overrides[rel_path]
+    with open(os.path.join(website_dir, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+def plan(files, website_dir=WEBSITE_DIR, overrides=None, salt=''):
+    """
+    Map each referenced asset among `files` to its hashed path.
+
+    overrides: rel path → text to hash instead of the file on disk (e.g. the
+        pruned stylesheet that will actually be published)
+    salt: anything else that changes the published bytes (minifier version)
+    """
+    overrides = overrides or {}
+    candidates = {path for path in files if os.path.splitext(path)[1].lower() in ASSET_EXTENSIONS}
+    texts = [path for path in files if os.path.splitext(path)[1].lower() in TEXT_EXTENSIONS]
+
+    references = {}
+    for path in texts:
+        references[path] = {rel_path for _, _, rel_path in
+                            find_references(read_text(path, website_dir, overrides), path, candidates)}
+    referenced = set().union(*references.values()) if references else set()
+
+    digests = {}
+    def digest(rel_path, visiting=()):
+        if rel_path not in digests:
+            content = hashlib.sha256(salt.encode('utf-8'))
+            if rel_path in overrides:
+                content.update(overrides[rel_path].encode('utf-8'))
+            else:
+                with open(os.path.join(website_dir, rel_path), 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        content.update(chunk)
+            for dependency in sorted(references.get(rel_path, ())):
+                if dependency in referenced and dependency not in visiting:
+                    content.update(digest(dependency, visiting + (rel_path,)).encode('utf-8'))
+            digests[rel_path] = content.hexdigest()
+        return digests[rel_path]
+
+    return {rel_path: hashed_name(rel_path, digest(rel_path)) for rel_path in sorted(referenced)}
+
+def write_manifest(assets, output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(assets, f, indent=2, sort_keys=True)
+    return path
+
+def headers_file(assets, html_files):
+    """Netlify _headers rules: immutable for the hashed paths, a short TTL for the pages"""
+    lines = []
+    for rel_path in sorted(assets.values()):
+        lines += [f"/{rel_path}", f"  Cache-Control: {IMMUTABLE}"]
+    for page in ["/"] + [f"/{rel_path}" for rel_path in sorted(html_files)]:
+        lines += [page, f"  Cache-Control: {HTML_CACHE_CONTROL}"]
+    return '\n'.join(lines) + '\n'
+
+def write_headers(assets, html_files, output_dir):
+    """Write _headers into the publish directory, next to the files it describes"""
+    path = os.path.join(output_dir, HEADERS_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(headers_file(assets, html_files))
+    return path
+
+def main():
+    from publish_site import collect_files
+    print("🔖 ASSET FINGERPRINTS")
+    print("=" * 50)
+    assets = plan(collect_files())
+    for rel_path, hashed in assets.items():
+        print(f"  {rel_path} → {os.path.basename(hashed)}")
+    print(f"\n📊 {len(assets)} referenced assets (run publish_site.py to apply)")
+
+if __name__ == "__main__":
+    main()
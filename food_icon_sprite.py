@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Food icon sprite atlas for the city pages
+Every city's cuisine section showed its own food icon, a separate image
+request for a picture rendered at 24x24. This build step crops and
+downsamples all icons to 24px and 48px (2x) cells and packs them into one
+atlas: images/sprites/food-icons.webp and food-icons-2x.webp, with a PNG
+fallback for browsers without image-set(). The .food-icon rule is
+regenerated in style.css, and each data/<city>.json records the icon's atlas
+key and background offset in cuisine.food_icon_sprite, which
+cities/city-template.js and build_city_pages.py render instead of the <img>.
+
+Icons are read from the local mirror (run mirror_remote_assets.py first for
+the remote ones).
+
+Usage: python3 food_icon_sprite.py [--dry-run]
+"""
+
+import os
+import io
+import re
+import json
+import math
+import argparse
+from PIL import Image, ImageOps
+from responsive_images import split_reference
+from mirror_remote_assets import MAP_NAME
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(WEBSITE_DIR, "data")
+TEMPLATE_JS = os.path.join(WEBSITE_DIR, "cities", "city-template.js")
+STYLESHEET = os.path.join(WEBSITE_DIR, "style.css")
+SPRITE_DIR = "images/sprites"
+SPRITE_NAME = "food-icons"
+
+ICON_SIZE = 24
+SCALES = (1, 2)
+WEBP_QUALITY = 85
+CSS_BEGIN = "/* BEGIN food icon sprite (generated by food_icon_sprite.py) */"
+CSS_END = "/* END food icon sprite */"
+
+FOOD_ICONS_JS = re.compile(r"const foodIcons = \{(.*?)\};", re.DOTALL)
+JS_ENTRY = re.compile(r"'([\w-]+)'\s*:\s*'([^']+)'")
+
+def template_icons(template_js=TEMPLATE_JS):
+    """{city id: icon URL} from the foodIcons fallback map in city-template.js"""
+    with open(template_js, 'r', encoding='utf-8') as f:
+        match = FOOD_ICONS_JS.search(f.read())
+    return dict(JS_ENTRY.findall(match.group(1))) if match else {}
+
+def load_mirror_map(website_dir=WEBSITE_DIR):
+    try:
+        with open(os.path.join(website_dir, MAP_NAME), 'r', encoding='utf-8') as f:
+            return {url: entry["path"] for url, entry in json.load(f).get("assets", {}).items() if entry.get("path")}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def local_icon(url, mirror, website_dir=WEBSITE_DIR):
+    """Site path of an icon URL: its mirrored copy if remote, else the file it points to"""
+    if url.startswith(('http://', 'https://')):
+        path = mirror.get(url)
+    elif url.startswith('data:'):
+        path = None
+    else:
+        path = split_reference(url)[1]
+    return path if path and os.path.exists(os.path.join(website_dir, path)) else None
+
+def city_icons(website_dir=WEBSITE_DIR):
+    """{city id: (icon URL, local path or None)}, the data file's food_icon winning over city-template.js"""
+    fallback = template_icons()
+    mirror = load_mirror_map(website_dir)
+    icons = {}
+    for filename in sorted(os.listdir(DATA_DIR)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(DATA_DIR, filename), 'r', encoding='utf-8') as f:
+            city_data = json.load(f)
+        if not isinstance(city_data, dict) or 'cuisine' not in city_data:
+            continue
+        city_id = filename[:-len('.json')]
+        url = city_data['cuisine'].get('food_icon') or fallback.get(city_id)
+        if url:
+            icons[city_id] = (url, local_icon(url, mirror, website_dir))
+    return icons
+
+def pack(paths):
+    """
+    Lay the distinct icons out on a near-square grid.
+    Returns ({path: (x, y)} in 1x pixels, columns, rows)
+    """
+    columns = max(1, math.ceil(math.sqrt(len(paths))))
+    rows = max(1, math.ceil(len(paths) / columns))
+    cells = {path: ((i % columns) * ICON_SIZE, (i // columns) * ICON_SIZE) for i, path in enumerate(paths)}
+    return cells, columns, rows
+
+def render_atlas(cells, columns, rows, scale, website_dir=WEBSITE_DIR):
+    size = ICON_SIZE * scale
+    atlas = Image.new('RGBA', (columns * size, rows * size), (0, 0, 0, 0))
+    for path, (x, y) in cells.items():
+        with Image.open(os.path.join(website_dir, path)) as img:
+            img.draft('RGB', (size * 2, size * 2))
+            # Same crop the old <img> got from object-fit: cover
+            icon = ImageOps.fit(ImageOps.exif_transpose(img).convert('RGBA'), (size, size), Image.LANCZOS)
+        atlas.paste(icon, (x * scale, y * scale))
+    return atlas
+
+def atlas_path(scale, extension):
+    return f"{SPRITE_DIR}/{SPRITE_NAME}{'' if scale == 1 else f'-{scale}x'}{extension}"
+
+def write_if_changed(path, content):
+    """Write bytes unless the file already holds them, so unchanged atlases keep their mtime"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(content)
+    return True
+
+def write_atlases(cells, columns, rows, website_dir=WEBSITE_DIR):
+    """Encode the WebP atlases and the 2x PNG fallback. Returns {site path: bytes}"""
+    os.makedirs(os.path.join(website_dir, SPRITE_DIR), exist_ok=True)
+    outputs = {}
+    for scale in SCALES:
+        atlas = render_atlas(cells, columns, rows, scale, website_dir)
+        encodings = [('.webp', {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 6})]
+        if scale == max(SCALES):
+            encodings.append(('.png', {'format': 'PNG', 'optimize': True}))
+        for extension, params in encodings:
+            buffer = io.BytesIO()
+            atlas.save(buffer, **params)
+            rel_path = atlas_path(scale, extension)
+            write_if_changed(os.path.join(website_dir, rel_path), buffer.getvalue())
+            outputs[rel_path] = len(buffer.getvalue())
+    return outputs
+
+def sprite_css(columns, rows):
+    """The .food-icon rule; style.css sits at the site root, so paths are relative to it"""
+    webp = ', '.join(f"url('{atlas_path(scale, '.webp')}') {scale}x" for scale in SCALES)
+    return '\n'.join([
+        CSS_BEGIN,
+        ".food-icon {",
+        "    display: inline-block;",
+        f"    width: {ICON_SIZE}px;",
+        f"    height: {ICON_SIZE}px;",
+        "    border-radius: 50%;",
+        "    margin-right: 8px;",
+        "    vertical-align: middle;",
+        f"    background-image: url('{atlas_path(max(SCALES), '.png')}');",
+        f"    background-image: -webkit-image-set({webp});",
+        f"    background-image: image-set({webp});",
+        f"    background-size: {columns * ICON_SIZE}px {rows * ICON_SIZE}px;",
+        "    background-repeat: no-repeat;",
+        "}",
+        CSS_END
+    ])
+
+def update_stylesheet(css_block, stylesheet=STYLESHEET):
+    """Replace the generated block in style.css. Returns True if it changed"""
+    with open(stylesheet, 'r', encoding='utf-8') as f:
+        css = f.read()
+    if CSS_BEGIN in css and CSS_END in css:
+        updated = css[:css.index(CSS_BEGIN)] + css_block + css[css.index(CSS_END) + len(CSS_END):]
+    else:
+        updated = css.rstrip('\n') + '\n\n' + css_block + '\n'
+    if updated == css:
+        return False
+    with open(stylesheet, 'w', encoding='utf-8') as f:
+        f.write(updated)
+    return True
+
+def update_city_data(sprites):
+    """Store {key, position} in cuisine.food_icon_sprite of each data/<city>.json (removed when it has no cell)"""
+    for filename in sorted(os.listdir(DATA_DIR)):
+        file_path = os.path.join(DATA_DIR, filename)
+        if not filename.endswith('.json'):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            city_data = json.load(f)
+        if not isinstance(city_data, dict) or 'cuisine' not in city_data:
+            continue
+
+        cuisine = city_data['cuisine']
+        sprite = sprites.get(filename[:-len('.json')])
+        if cuisine.get('food_icon_sprite') == sprite:
+            continue
+        if sprite:
+            cuisine['food_icon_sprite'] = sprite
+        else:
+            cuisine.pop('food_icon_sprite', None)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(city_data, f, indent=2, ensure_ascii=False)
+        print(f"   ✅ Updated {filename}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the city food icons into one sprite atlas")
+    parser.add_argument('--dry-run', action='store_true', help="report which icons would be packed")
+    args = parser.parse_args()
+
+    print("🍜 FOOD ICON SPRITE")
+    print("=" * 50)
+    icons = city_icons()
+    missing = sorted(city_id for city_id, (_, path) in icons.items() if not path)
+    for city_id in missing:
+        print(f"   ⚠️  {city_id}: no local copy of {icons[city_id][0]} (run mirror_remote_assets.py)")
+
+    paths = sorted({path for _, path in icons.values() if path})
+    print(f"📊 {len(icons)} cities with a food icon, {len(paths)} distinct local icons")
+    if args.dry_run or not paths:
+        return
+
+    cells, columns, rows = pack(paths)
+    for rel_path, size in write_atlases(cells, columns, rows).items():
+        print(f"   ✅ {rel_path}: {size:,} bytes")
+
+    sprites = {}
+    for city_id, (_, path) in icons.items():
+        if path:
+            x, y = cells[path]
+            sprites[city_id] = {'key': os.path.splitext(os.path.basename(path))[0], 'position': f"{-x}px {-y}px"}
+
+    if update_stylesheet(sprite_css(columns, rows)):
+        print("   ✅ Updated .food-icon in style.css")
+    update_city_data(sprites)
+    print(f"📁 {len(sprites)} icons in one {columns}x{rows} atlas instead of {len(paths)} requests")
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ This script creates individual city pages with introductions and proper images.
 
 import os
 import json
+from responsive_images import load_responsive_manifest, apply_responsive_markup
 
 # City data with descriptions and image placeholders
 CITIES = {
@@ -81,7 +82,7 @@ CITIES = {
     }
 }
 
-def generate_city_page(city_data):
+def generate_city_page(city_data, image_manifest=None):
     """Generate HTML for a city page from template."""
     
     # Read the template
@@ -138,6 +139,10 @@ def generate_city_page(city_data):
     
     html = html.replace('TIP_1</li>\n                            <li>TIP_2</li>\n                            <li>TIP_3</li>\n                            <li>TIP_4</li>', tips)
     
+    # Serve local photos as resized srcset/<picture> derivatives
+    if image_manifest:
+        html = apply_responsive_markup(html, image_manifest)
+    
     return html
 
 def main():
@@ -148,10 +153,13 @@ def main():
     
     print("Generating city pages...")
     
+    # Responsive image manifest from responsive_images.py (empty if not built)
+    image_manifest = load_responsive_manifest()
+    
     # Generate pages for each city
     for city_id, city_data in CITIES.items():
         filename = f"cities/{city_id}.html"
-        html_content = generate_city_page(city_data)
+        html_content = generate_city_page(city_data, image_manifest)
         
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
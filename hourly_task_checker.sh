@@ -3,15 +3,20 @@
 # Navigate to the project directory
 cd /Users/fudongli/travel-website
 
+# The queue lives in Postgres; never fall back to travel.db, which
+# git reset --hard would wipe
+export TASK_STORE=postgres
+
 while true; do
-    echo "$(date): Running task check..."
+    echo "$(date): Starting task listener..."
     
     # Activate the virtual environment and run the Python script
+    # check_tasks.py lists pending tasks, then wakes on every new insert
     source .venv/bin/activate
     python3 check_tasks.py
     deactivate
     
-    # Wait for 1 hour (3600 seconds) before running again
-    echo "$(date): Sleeping for 1 hour..."
-    sleep 3600
-done
\ No newline at end of file
+    # Only reached if the listener exits (e.g. the database went away)
+    echo "$(date): Task listener stopped, restarting in 10 seconds..."
+    sleep 10
+done
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Image placeholders for travel website
+For every image in images/user_photos computes the intrinsic dimensions, a
+dominant color, a tiny blurred JPEG (LQIP, as a data URI) and a blurhash.
+Results are kept in the image optimization manifest keyed by content hash, so
+only new or changed photos are decoded again. With --update-data they are
+stored per heroImage/gallery URL in data/<city>.json, where
+build_city_pages.py and cities/city-template.js use them to reserve the image
+box and paint a placeholder before the photo arrives.
+
+Usage: python3 image_placeholders.py [--workers N] [--force] [--update-data]
+"""
+
+import os
+import io
+import json
+import math
+import base64
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+from optimization_manifest import OptimizationManifest
+from responsive_images import find_sources, split_reference
+from normalize_images import orientation, apply_orientation, to_srgb
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LQIP_WIDTH = 16
+LQIP_QUALITY = 40
+# Blurhash components across and down; 4x3 suits landscape photos
+BLURHASH_COMPONENTS = (4, 3)
+SETTINGS = {'lqip_width': LQIP_WIDTH, 'lqip_quality': LQIP_QUALITY,
+            'blurhash': list(BLURHASH_COMPONENTS), 'version': 2}
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def encode83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+def srgb_to_linear(value):
+    value /= 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+def linear_to_srgb(value):
+    value = min(1.0, max(0.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+def blurhash(img, components=BLURHASH_COMPONENTS):
+    """Blurhash of a (small) RGB image"""
+    x_components, y_components = components
+    width, height = img.size
+    linear = [srgb_to_linear(value) for value in range(256)]
+    data = img.tobytes()
+    pixels = [(linear[data[k]], linear[data[k + 1]], linear[data[k + 2]]) for k in range(0, len(data), 3)]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised = max(0, min(82, int(max(abs(c) for factor in ac for c in factor) * 166 - 0.5)))
+        max_value = (quantised + 1) / 166
+        result += encode83(quantised, 1)
+    else:
+        max_value = 1
+        result += encode83(0, 1)
+
+    result += encode83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, int(sign_pow(c / max_value, 0.5) * 9 + 9.5))) for c in factor)
+        result += encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+def dominant_color(img):
+    """Most common color of a small thumbnail after reducing it to a few colors"""
+    palette_image = img.quantize(colors=5)
+    palette = palette_image.getpalette()
+    _, index = max(palette_image.getcolors())
+    return '#{:02x}{:02x}{:02x}'.format(*palette[index * 3:index * 3 + 3])
+
+def compute_placeholder(source_path):
+    """Dimensions, dominant color, LQIP data URI and blurhash of one image (runs inside a pool worker)"""
+    try:
+        with Image.open(os.path.join(WEBSITE_DIR, source_path)) as source:
+            # Dimensions and pixels as displayed: upright and in sRGB
+            value = orientation(source)
+            width, height = source.size[::-1] if value in (5, 6, 7, 8) else source.size
+            # Let the JPEG decoder scale down while decoding; the placeholders are tiny
+            source.draft('RGB', (64, 64))
+            img, _ = to_srgb(apply_orientation(source, value))
+            img = img.convert('RGB')
+            small = img.copy()
+            small.thumbnail((64, 64))
+
+        lqip = small.resize((LQIP_WIDTH, max(1, round(LQIP_WIDTH * height / width))), Image.LANCZOS)
+        buffer = io.BytesIO()
+        lqip.save(buffer, 'JPEG', quality=LQIP_QUALITY, optimize=True)
+
+        hash_image = small.copy()
+        hash_image.thumbnail((32, 32))
+        return source_path, {
+            'width': width,
+            'height': height,
+            'color': dominant_color(small),
+            'lqip': 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+            'blurhash': blurhash(hash_image)
+        }, None
+
+    except Exception as e:
+        return source_path, None, str(e)
+
+def run_jobs(sources, workers=1):
+    if workers <= 1:
+        for path in sources:
+            yield compute_placeholder(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(compute_placeholder, path) for path in sources]
+        for future in as_completed(futures):
+            yield future.result()
+
+def build(workers=1, force=False):
+    """Placeholders for every source image, computing only the new or changed ones"""
+    cache = OptimizationManifest()
+    placeholders = {}
+    todo = []
+    for path in find_sources():
+        entry = None if force else cache.lookup(os.path.join(WEBSITE_DIR, path), SETTINGS, stage="placeholder")
+        if entry and 'placeholder' in entry:
+            placeholders[path] = entry['placeholder']
+        else:
+            todo.append(path)
+
+    print(f"📊 {len(placeholders) + len(todo)} source images, {len(todo)} need placeholders")
+
+    failed = 0
+    for source_path, placeholder, error in run_jobs(todo, workers):
+        if error:
+            print(f"   ❌ {source_path}: {error}")
+            failed += 1
+            continue
+        placeholders[source_path] = placeholder
+        cache.record(os.path.join(WEBSITE_DIR, source_path), SETTINGS, stage="placeholder", placeholder=placeholder)
+        print(f"   ✅ {source_path}: {placeholder['width']}x{placeholder['height']} {placeholder['color']} "
+              f"{placeholder['blurhash']} (LQIP {len(placeholder['lqip'])} bytes)")
+
+    cache.save()
+    print(f"📁 {len(placeholders)} placeholders in the image manifest, {failed} failed")
+    return placeholders
+
+def update_city_data(placeholders):
+    """Store the placeholders of heroImage and gallery in each data/<city>.json"""
+    data_dir = os.path.join(WEBSITE_DIR, "data")
+    for filename in sorted(os.listdir(data_dir)):
+        file_path = os.path.join(data_dir, filename)
+        if not filename.endswith('.json'):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            city_data = json.load(f)
+        if 'gallery' not in city_data:
+            continue
+
+        city_placeholders = {}
+        for url in [city_data.get('heroImage')] + city_data['gallery']:
+            if url and not url.startswith(('http://', 'https://', 'data:')):
+                placeholder = placeholders.get(split_reference(url)[1])
+                if placeholder:
+                    city_placeholders[url] = placeholder
+
+        if city_data.get('placeholders') == city_placeholders:
+            continue
+        city_data['placeholders'] = city_placeholders
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(city_data, f, indent=2, ensure_ascii=False)
+        print(f"   ✅ Updated {filename} ({len(city_placeholders)} images)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate image dimensions, dominant colors, LQIPs and blurhashes")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument('--force', action='store_true', help="recompute all placeholders")
+    parser.add_argument('--update-data', action='store_true', help="write placeholders into data/<city>.json")
+    args = parser.parse_args()
+
+    print("🌫️  IMAGE PLACEHOLDERS")
+    print("=" * 50)
+    placeholders = build(workers=args.workers, force=args.force)
+
+    if args.update_data:
+        print("\n📝 Updating city data...")
+        update_city_data(placeholders)
+
+if __name__ == "__main__":
+    main()
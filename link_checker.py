@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+External link and image URL checker.
+Collects every remote URL the site references (pages, city-template.js, data
+JSON and the scripts that write image URLs into pages) and verifies they
+still resolve.
+
+Requests are scheduled on asyncio with a global and a per-host concurrency
+limit. They run on keep-alive http.client connections pooled per host, one
+TLS handshake per connection rather than per URL. HEAD is tried first and
+GET (for a single byte) only when a server refuses HEAD. Results are cached
+in link_check_cache.json with a TTL; once that expires the recorded
+ETag/Last-Modified make the re-check a conditional request.
+
+Usage: python3 link_checker.py [--fresh] [--concurrency N] [--per-host N] [--enqueue]
+"""
+
+import os
+import re
+import ssl
+import glob
+import json
+import time
+import asyncio
+import argparse
+import threading
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, urljoin
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from site_index import get_site_index
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(WEBSITE_DIR, "link_check_cache.json")
+
+# Files outside the HTML pages that put remote URLs on the site
+URL_SOURCES = ["cities/*.js", "data/*.json", "fix_city_page_images.py", "update_city_cards.py", "add_food_icons.py"]
+URL_PATTERN = re.compile(r'https?://[^\s"\'<>()\\`{}$]+')
+
+# Statuses some servers return for HEAD while GET works
+HEAD_REFUSED = {400, 403, 405, 501}
+RETRYABLE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+USER_AGENT = "travel-website-link-checker/1.0"
+
+def response_size(method, headers):
+    """Full size of the resource from a HEAD or ranged GET response, if the server says"""
+    content_range = headers.get("Content-Range") or ''
+    if method == "GET" and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+    length = headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+def collect_urls(website_dir=WEBSITE_DIR):
+    """Map every remote URL to the files that reference it"""
+    urls = defaultdict(set)
+
+    for path, page in get_site_index(website_dir).pages.items():
+        for url in page.links + page.images + page.srcset_candidates + page.scripts + page.stylesheets:
+            if url.startswith(('http://', 'https://')) and not any(c in url for c in '{}$'):
+                urls[url].add(path)
+
+    for pattern in URL_SOURCES:
+        for file_path in glob.glob(os.path.join(website_dir, pattern)):
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+            for url in URL_PATTERN.findall(content):
+                urls[url.rstrip('.,;:')].add(os.path.relpath(file_path, website_dir))
+
+    return urls
+
+class LinkChecker:
+    def __init__(self, cache_file=CACHE_FILE, concurrency=16, per_host=4, timeout=10,
+                 ttl=24 * 3600, failure_ttl=3600, max_redirects=5):
+        self.cache_file = cache_file
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_redirects = max_redirects
+        self.cache = self.load_cache()
+        self.pools = defaultdict(list)
+        self.pool_lock = threading.Lock()
+        self.ssl_context = ssl.create_default_context()
+        self.stats = {"requests": 0, "connections": 0, "cache_hits": 0, "not_modified": 0}
+
+    def load_cache(self):
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        temp_path = self.cache_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.cache_file)
+
+    def connect(self, scheme, netloc):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def request(self, method, url, headers, sink=None):
+        """
+        One request on a pooled keep-alive connection. Returns (status, headers).
+        sink(status, headers) may return a binary file to stream the body into.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        headers = {"User-Agent": USER_AGENT, **headers}
+
+        for attempt in range(2):
+            with self.pool_lock:
+                conn = self.pools[key].pop() if self.pools[key] else None
+                reused = conn is not None
+                self.stats["requests"] += 1
+                self.stats["connections"] += not reused
+            conn = conn or self.connect(*key)
+            output = None
+            try:
+                conn.request(method, target, headers=headers)
+                response = conn.getresponse()
+                output = sink(response.status, response.headers) if sink else None
+                if output:
+                    with output:
+                        for chunk in iter(lambda: response.read(64 * 1024), b''):
+                            output.write(chunk)
+                    # read() just stops when the server closes the connection early
+                    if response.length:
+                        raise http.client.IncompleteRead(b'', response.length)
+                else:
+                    response.read()
+            except RETRYABLE_ERRORS:
+                conn.close()
+                # The server dropped an idle pooled connection; retry on a fresh one
+                if reused and attempt == 0 and not output:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                with self.pool_lock:
+                    self.pools[key].append(conn)
+            return response.status, response.headers
+
+    def cached(self, url):
+        entry = self.cache.get(url)
+        if not entry:
+            return None
+        ttl = self.ttl if entry.get("ok") else self.failure_ttl
+        if time.time() - entry.get("checked_at", 0) < ttl:
+            return entry
+        return None
+
+    def check_url(self, url):
+        """Resolve a URL, following redirects. Returns the result entry (also stored in the cache)"""
+        entry = self.cached(url)
+        if entry:
+            with self.pool_lock:
+                self.stats["cache_hits"] += 1
+            return dict(entry, from_cache=True)
+
+        previous = self.cache.get(url, {})
+        conditional = {}
+        # Entries cached before sizes were recorded have no "bytes"; a 304 would never fill it in
+        revalidate = previous.get("ok") and "bytes" in previous
+        if revalidate and previous.get("etag"):
+            conditional["If-None-Match"] = previous["etag"]
+        if revalidate and previous.get("last_modified"):
+            conditional["If-Modified-Since"] = previous["last_modified"]
+
+        started = time.perf_counter()
+        result = {"url": url, "checked_at": time.time()}
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                method = "HEAD"
+                status, headers = self.request(method, current, conditional)
+                if status in HEAD_REFUSED:
+                    method = "GET"
+                    status, headers = self.request(method, current, dict(conditional, Range="bytes=0-0"))
+
+                if status in (301, 302, 303, 307, 308) and headers.get("Location"):
+                    current = urljoin(current, headers["Location"])
+                    conditional = {}
+                    continue
+                break
+            else:
+                raise RuntimeError(f"more than {self.max_redirects} redirects")
+
+            if status == 304:
+                with self.pool_lock:
+                    self.stats["not_modified"] += 1
+                status = previous["status"]
+                size = previous.get("bytes")
+                headers = {"ETag": previous.get("etag"), "Last-Modified": previous.get("last_modified")}
+            else:
+                size = response_size(method, headers) if status < 300 else None
+
+            result.update({
+                "status": status,
+                "ok": status < 400,
+                "method": method,
+                "final_url": current,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "bytes": size
+            })
+        except Exception as e:
+            result.update({"status": None, "ok": False, "error": f"{e.__class__.__name__}: {e}"})
+
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        self.cache[url] = result
+        return dict(result, from_cache=False)
+
+    async def map_urls(self, func, urls):
+        """{url: func(url)} run on worker threads; at most `concurrency` in flight and `per_host` per host"""
+        loop = asyncio.get_running_loop()
+        overall = asyncio.Semaphore(self.concurrency)
+        hosts = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="link-check") as executor:
+            async def run(url):
+                async with overall, hosts[urlsplit(url).netloc]:
+                    results[url] = await loop.run_in_executor(executor, func, url)
+
+            await asyncio.gather(*(run(url) for url in dict.fromkeys(urls)))
+        return results
+
+    async def check_all(self, urls):
+        """Check URLs concurrently"""
+        results = await self.map_urls(self.check_url, urls)
+        self.save_cache()
+        return results
+
+    def check(self, urls):
+        return asyncio.run(self.check_all(urls))
+
+    def close(self):
+        with self.pool_lock:
+            for connections in self.pools.values():
+                for conn in connections:
+                    conn.close()
+            self.pools.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the site's remote links and images resolve")
+    parser.add_argument('--fresh', action='store_true', help="ignore cached results")
+    parser.add_argument('--concurrency', type=int, default=16, help="requests in flight (default: 16)")
+    parser.add_argument('--per-host', type=int, default=4, help="requests in flight per host (default: 4)")
+    parser.add_argument('--timeout', type=float, default=10, help="seconds per request (default: 10)")
+    parser.add_argument('--enqueue', action='store_true',
+                        help="queue a fix_link task for every page with a broken link (see task_worker.py)")
+    args = parser.parse_args()
+
+    print("🔗 EXTERNAL LINK CHECK")
+    print("=" * 50)
+    urls = collect_urls()
+    print(f"Found {len(urls)} remote URLs on {len({urlsplit(url).netloc for url in urls})} hosts")
+
+    checker = LinkChecker(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout)
+    if args.fresh:
+        checker.cache = {}
+    started = time.perf_counter()
+    results = checker.check(urls)
+    checker.close()
+
+    broken = [result for result in results.values() if not result["ok"]]
+    for result in broken:
+        reason = result.get("error") or f"HTTP {result['status']}"
+        print(f"❌ {result['url']} ({reason})")
+        print(f"   referenced in {', '.join(sorted(urls[result['url']])[:3])}")
+
+    print(f"\n📊 {len(results) - len(broken)}/{len(results)} OK in {time.perf_counter() - started:.2f}s "
+          f"({checker.stats['requests']} requests on {checker.stats['connections']} connections, "
+          f"{checker.stats['cache_hits']} cached, {checker.stats['not_modified']} not modified)")
+    print(f"Checked at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    if args.enqueue:
+        from task_store import get_store
+        from task_worker import queue_tasks
+        pages = sorted({path for result in broken for path in urls[result['url']] if path.endswith('.html')})
+        added = queue_tasks(get_store(), "fix_link", pages)
+        print(f"📥 Queued fix_link for {added} of {len(pages)} pages with broken links")
+
+if __name__ == "__main__":
+    main()
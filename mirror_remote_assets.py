@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Local mirror for remote images
+The food icons (kimi-web-img.moonshot.cn proxies in cities/city-template.js
+and data/*.json) and the Unsplash photos on the pages are hotlinked, so every
+visitor pays DNS and TLS round-trips to extra origins. This tool downloads
+them concurrently on the link checker's pooled connections, optimizes them
+with the image pipeline into images/mirror/ and rewrites the references in
+the published HTML, data/*.json and cities/*.js to the local copies.
+
+Downloads land in .mirror_cache/ first; an interrupted one is resumed with a
+Range request on the next run. Later runs revalidate every URL with its
+ETag/Last-Modified, so an unchanged image costs a 304 and nothing else.
+The URL → local path map is kept in remote_asset_map.json.
+
+Usage: python3 mirror_remote_assets.py [--dry-run] [--no-rewrite] [--host HOST] [--concurrency N] [--per-host N]
+"""
+
+import os
+import re
+import html
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+import posixpath
+import threading
+from urllib.parse import urlsplit, urljoin
+from collections import defaultdict
+from PIL import Image, ImageOps
+from link_checker import LinkChecker, URL_PATTERN
+from optimize_image import jpeg_settings, optimize_jpeg
+from optimization_manifest import OptimizationManifest, MANIFEST_FILE, file_sha256
+from normalize_images import to_srgb
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIRROR_DIR = "images/mirror"
+CACHE_DIR = ".mirror_cache"
+MAP_NAME = "remote_asset_map.json"
+
+MIRROR_HOSTS = {"images.unsplash.com", "kimi-web-img.moonshot.cn"}
+# Files whose remote URLs are rewritten
+REWRITE_EXTENSIONS = {'.html', '.json', '.js'}
+# Relative URLs in data JSON and city-template.js resolve from the cities/*.html page using them
+RESOLVE_FROM = {"data": "cities", "cities": "cities"}
+
+MAX_WIDTH = 1600
+JPEG_QUALITY = 85
+
+def local_name(url):
+    """File name (without extension) for a mirrored URL: readable stem plus a hash of the full URL"""
+    stem = os.path.splitext(urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1])[0]
+    stem = re.sub(r'[^\w-]+', '-', stem).strip('-')[:48] or 'image'
+    return f"{stem}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+def resolve_dir(rel_path):
+    """Directory the relative URLs in a file resolve from"""
+    directory = posixpath.dirname(rel_path)
+    if rel_path.endswith('.html'):
+        return directory
+    return RESOLVE_FROM.get(directory, directory)
+
+def remote_references(text, rel_path, hosts):
+    """[(start, end, url)] of every literal URL on a mirrored host"""
+    references = []
+    for match in URL_PATTERN.finditer(text):
+        literal = match.group(0).rstrip('.,;:')
+        end = match.start() + len(literal)
+        # URLs completed at runtime (`${...}`) cannot be mirrored
+        if text[end:end + 1] in ('$', '{'):
+            continue
+        url = html.unescape(literal) if rel_path.endswith('.html') else literal
+        if urlsplit(url).netloc in hosts:
+            references.append((match.start(), end, url))
+    return references
+
+def collect_files(website_dir=WEBSITE_DIR):
+    from publish_site import collect_files as published_files
+    return [path.replace(os.sep, '/') for path in published_files(website_dir)
+            if os.path.splitext(path)[1] in REWRITE_EXTENSIONS]
+
+def read_text(website_dir, rel_path):
+    with open(os.path.join(website_dir, rel_path), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def find_remote_urls(files, website_dir=WEBSITE_DIR, hosts=MIRROR_HOSTS):
+    """{url: set of files referencing it}"""
+    urls = defaultdict(set)
+    for rel_path in files:
+        for _, _, url in remote_references(read_text(website_dir, rel_path), rel_path, hosts):
+            urls[url].add(rel_path)
+    return urls
+
+def rewrite_text(text, rel_path, mapping):
+    """Point every mirrored URL at its local copy, relative to where the file's URLs resolve from"""
+    parts, last = [], 0
+    base = resolve_dir(rel_path) or '.'
+    for start, end, url in remote_references(text, rel_path, {urlsplit(url).netloc for url in mapping}):
+        if url in mapping:
+            parts.append(text[last:start])
+            parts.append(posixpath.relpath(mapping[url], base))
+            last = end
+    parts.append(text[last:])
+    return ''.join(parts)
+
+def rewrite_files(files, mapping, website_dir=WEBSITE_DIR):
+    """Rewrite references in place. Returns the files that changed"""
+    changed = []
+    for rel_path in files:
+        text = read_text(website_dir, rel_path)
+        updated = rewrite_text(text, rel_path, mapping)
+        if updated != text:
+            with open(os.path.join(website_dir, rel_path), 'w', encoding='utf-8') as f:
+                f.write(updated)
+            changed.append(rel_path)
+    return changed
+
+class RemoteMirror:
+    def __init__(self, website_dir=WEBSITE_DIR, concurrency=8, per_host=4, timeout=30, max_redirects=5):
+        self.website_dir = website_dir
+        self.cache_dir = os.path.join(website_dir, CACHE_DIR)
+        self.map_file = os.path.join(website_dir, MAP_NAME)
+        self.max_redirects = max_redirects
+        self.http = LinkChecker(cache_file=None, concurrency=concurrency, per_host=per_host, timeout=timeout)
+        self.manifest = OptimizationManifest(os.path.join(website_dir, os.path.basename(MANIFEST_FILE)))
+        self.entries = self.load_map()
+        self.lock = threading.Lock()
+        self.stats = {"downloaded": 0, "resumed": 0, "not_modified": 0, "failed": 0, "bytes": 0}
+
+    def load_map(self):
+        try:
+            with open(self.map_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("assets", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_map(self):
+        temp_path = self.map_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"assets": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.map_file)
+
+    def mapping(self):
+        """{url: local site path} of every mirrored asset"""
+        return {url: entry["path"] for url, entry in self.entries.items() if entry.get("path")}
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def fetch(self, url):
+        """
+        Download or revalidate one URL into the cache (runs on a worker thread).
+        Returns (outcome, raw file path, response headers), outcome being
+        'downloaded', 'not_modified' or 'failed: ...'.
+        """
+        entry = self.entries.get(url, {})
+        raw_path = os.path.join(self.cache_dir, local_name(url))
+        part_path = raw_path + '.part'
+        mirrored = entry.get("path") and os.path.exists(os.path.join(self.website_dir, entry["path"]))
+
+        headers = {}
+        if mirrored and os.path.exists(raw_path):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and entry.get("partial"):
+            # Resume only if the remote file is still the one the partial download came from
+            headers.update({"Range": f"bytes={offset}-", "If-Range": entry["partial"]})
+
+        def sink(status, response_headers):
+            if status == 206 and not (response_headers.get("Content-Range") or '').startswith(f"bytes {offset}-"):
+                raise RuntimeError(f"unexpected Content-Range {response_headers.get('Content-Range')}")
+            if status not in (200, 206):
+                return None
+            validator = response_headers.get("ETag") or response_headers.get("Last-Modified")
+            with self.lock:
+                self.entries.setdefault(url, {})["partial"] = validator
+            self.count("resumed" if status == 206 else "downloaded")
+            return open(part_path, 'ab' if status == 206 else 'wb')
+
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                status, response_headers = self.http.request("GET", current, headers, sink=sink)
+                if status in (301, 302, 303, 307, 308) and response_headers.get("Location"):
+                    current = urljoin(current, response_headers["Location"])
+                    continue
+                break
+            else:
+                raise RuntimeError(f"more than {self.max_redirects} redirects")
+        except Exception as e:
+            self.count("failed")
+            return f"failed: {e.__class__.__name__}: {e}", None, None
+
+        if status == 304:
+            self.count("not_modified")
+            return "not_modified", raw_path, response_headers
+        if status not in (200, 206):
+            self.count("failed")
+            return f"failed: HTTP {status}", None, None
+
+        os.replace(part_path, raw_path)
+        self.count("bytes", os.path.getsize(raw_path))
+        return "downloaded", raw_path, response_headers
+
+    def store(self, url, raw_path):
+        """Optimize a downloaded image into images/mirror/. Returns its site path"""
+        os.makedirs(os.path.join(self.website_dir, MIRROR_DIR), exist_ok=True)
+        with Image.open(raw_path) as img:
+            transparent = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+            rel_path = f"{MIRROR_DIR}/{local_name(url)}{'.png' if transparent else '.jpg'}"
+            target = os.path.join(self.website_dir, rel_path)
+            if img.format == 'JPEG' and img.width <= MAX_WIDTH:
+                shutil.copyfile(raw_path, target)
+            else:
+                img, _ = to_srgb(ImageOps.exif_transpose(img))
+                img = img.convert('RGBA' if transparent else 'RGB')
+                if img.width > MAX_WIDTH:
+                    img = img.resize((MAX_WIDTH, max(1, round(img.height * MAX_WIDTH / img.width))), Image.LANCZOS)
+                if transparent:
+                    img.save(target, 'PNG', optimize=True)
+                else:
+                    img.save(target, **jpeg_settings(JPEG_QUALITY))
+
+        if not transparent:
+            optimize_jpeg(target, JPEG_QUALITY, manifest=self.manifest)
+        return rel_path
+
+    def mirror(self, urls):
+        """Fetch every URL concurrently, then optimize the new or changed downloads"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        results = asyncio.run(self.http.map_urls(self.fetch, sorted(urls)))
+        self.http.close()
+
+        failures = {}
+        for url, (outcome, raw_path, headers) in sorted(results.items()):
+            entry = self.entries.setdefault(url, {})
+            if outcome.startswith("failed"):
+                failures[url] = outcome[len("failed: "):]
+                continue
+            if outcome == "not_modified":
+                entry["checked_at"] = time.time()
+                continue
+
+            sha256 = file_sha256(raw_path)
+            previous = entry.get("path")
+            if sha256 != entry.get("sha256") or not previous or not os.path.exists(os.path.join(self.website_dir, previous)):
+                try:
+                    entry["path"] = self.store(url, raw_path)
+                except Exception as e:
+                    failures[url] = f"{e.__class__.__name__}: {e}"
+                    continue
+                if previous and previous != entry["path"] and os.path.exists(os.path.join(self.website_dir, previous)):
+                    os.remove(os.path.join(self.website_dir, previous))
+
+            entry.update({
+                "sha256": sha256,
+                "bytes": os.path.getsize(raw_path),
+                "optimized_bytes": os.path.getsize(os.path.join(self.website_dir, entry["path"])),
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "checked_at": time.time()
+            })
+            entry.pop("partial", None)
+
+        # Drop placeholders of URLs that never completed a download
+        for url in [url for url, entry in self.entries.items() if not entry.get("path") and not entry.get("partial")]:
+            del self.entries[url]
+        self.save_map()
+        self.manifest.save()
+        return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror hotlinked remote images locally and rewrite references")
+    parser.add_argument('--dry-run', action='store_true', help="only list the remote URLs")
+    parser.add_argument('--no-rewrite', action='store_true', help="download but leave references unchanged")
+    parser.add_argument('--host', action='append', default=[], help="mirror another host too (repeatable)")
+    parser.add_argument('--concurrency', type=int, default=8, help="downloads in flight (default: 8)")
+    parser.add_argument('--per-host', type=int, default=4, help="downloads in flight per host (default: 4)")
+    parser.add_argument('--timeout', type=float, default=30, help="seconds per request (default: 30)")
+    args = parser.parse_args()
+
+    print("🪞 REMOTE ASSET MIRROR")
+    print("=" * 50)
+    files = collect_files()
+    urls = find_remote_urls(files, hosts=MIRROR_HOSTS | set(args.host))
+    print(f"Found {len(urls)} remote images in {len(set().union(*urls.values())) if urls else 0} files")
+    if args.dry_run:
+        for url in sorted(urls):
+            print(f"  {url}\n     ← {', '.join(sorted(urls[url])[:3])}")
+        return
+
+    mirror = RemoteMirror(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout)
+    started = time.perf_counter()
+    failures = mirror.mirror(urls)
+    for url, reason in failures.items():
+        print(f"❌ {url} ({reason})")
+
+    stats = mirror.stats
+    print(f"\n📊 {len(urls) - len(failures)}/{len(urls)} mirrored in {time.perf_counter() - started:.2f}s: "
+          f"{stats['downloaded']} downloaded, {stats['resumed']} resumed, {stats['not_modified']} not modified "
+          f"({stats['bytes'] / 1024:.0f} KB fetched)")
+
+    if not args.no_rewrite:
+        changed = rewrite_files(files, mirror.mapping())
+        for rel_path in changed:
+            print(f"   ✅ Rewrote {rel_path}")
+        print(f"📝 {len(changed)} files now reference local copies")
+    print(f"📁 Map: {MAP_NAME}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Unified website checks.
+website_monitor.py, enhanced_monitor.py, telegram_monitor.py,
+simple_telegram_monitor.py, final_telegram_monitor.py and
+clawdbot_integrated_monitor.py each carry their own copy of the images /
+pages / navigation / layout checks. Here every check is written once and
+registered with the files it reads (inputs), a relative cost and how often it
+should run. One runner executes the checks concurrently on a thread pool over
+a shared snapshot of the site, applies the fix-up scripts they ask for (each
+at most once per pass) and hands the results to every sink: the status JSON,
+the log and the Telegram trigger file.
+
+Usage: python3 monitor_checks.py [--list] [--no-fix] [check ...]
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import subprocess
+from fnmatch import fnmatch
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from site_index import get_site_index
+from script_runner import run_script
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(WEBSITE_DIR, "monitor_config.json")
+STATUS_FILE = os.path.join(WEBSITE_DIR, "monitor_status.json")
+LOG_FILE = os.path.join(WEBSITE_DIR, "monitor.log")
+TELEGRAM_CHAT_ID = "8080442123"
+
+ALL_CITIES = ["Beijing", "Shanghai", "Chengdu", "Harbin", "Chongqing",
+              "Wuxi", "Qingdao", "Xiamen", "Nanjing", "Shenzhen",
+              "Guangzhou", "Hongkong"]
+
+EXPECTED_COLORS = {
+    "primary": "#2563eb",
+    "secondary": "#1e40af",
+    "accent": "#f59e0b",
+    "light": "#f8fafc",
+    "dark": "#1e293b"
+}
+
+class Check:
+    def __init__(self, name, title, func, inputs, cost=1, every=10, fix=None, config_key=None):
+        self.name = name
+        self.title = title
+        self.func = func
+        self.inputs = inputs
+        self.cost = cost
+        self.every = every
+        self.fix = fix
+        self.config_key = config_key
+
+    def reads(self, path):
+        return any(fnmatch(path, pattern) for pattern in self.inputs)
+
+class CheckResult:
+    def __init__(self, check, passed, issues, seconds, error=None, details=None):
+        self.name = check.name
+        self.title = check.title
+        self.passed = passed
+        self.issues = issues
+        self.seconds = seconds
+        self.error = error
+        self.details = details
+        self.fixes = []
+
+    def to_dict(self):
+        result = {
+            "title": self.title,
+            "passed": self.passed,
+            "issues": self.issues,
+            "fixes": self.fixes,
+            "seconds": round(self.seconds, 3),
+            "error": self.error
+        }
+        if self.details is not None:
+            result["details"] = self.details
+        return result
+
+REGISTRY = {}
+
+def register(name, title, inputs, cost=1, every=10, fix=None, config_key=None):
+    """
+    Register a check function taking a SiteSnapshot and returning a list of
+    issues (empty when it passes), or (issues, details) to also record
+    measurements in the status JSON.
+
+    inputs: glob patterns of the files the check reads, relative to the site
+    cost: rough relative runtime, the most expensive checks start first
+    every: minutes between scheduled runs
+    fix: fix-up script to run in-process when the check fails
+    config_key: entry of "checks" in monitor_config.json that can switch it off
+    """
+    def decorator(func):
+        REGISTRY[name] = Check(name, title, func, inputs, cost, every, fix, config_key)
+        return func
+    return decorator
+
+def checks_reading(paths):
+    """Checks whose inputs include any of the changed paths, in registry order"""
+    return [name for name, check in REGISTRY.items() if any(check.reads(path) for path in paths)]
+
+class SiteSnapshot:
+    """Everything the checks read, loaded once per pass and shared between threads"""
+
+    def __init__(self, website_dir=WEBSITE_DIR):
+        self.website_dir = website_dir
+        self.index = get_site_index(website_dir)
+        self._json = {}
+        self._lock = threading.Lock()
+
+    def path(self, *parts):
+        return os.path.join(self.website_dir, *parts)
+
+    def json(self, rel_path):
+        with self._lock:
+            if rel_path not in self._json:
+                try:
+                    with open(self.path(rel_path), 'r', encoding='utf-8') as f:
+                        self._json[rel_path] = json.load(f)
+                except FileNotFoundError:
+                    self._json[rel_path] = None
+            return self._json[rel_path]
+
+@register("images_readiness", "Images Readiness", ["baidu_image_replacements.json"], fix="search_city_images.py")
+def check_images_readiness(snapshot):
+    image_status = snapshot.json("baidu_image_replacements.json")
+    if image_status is None:
+        return ["Image status file not found"]
+    cities = image_status.get("cities", {})
+    missing = [city for city in ALL_CITIES
+               if cities.get(city, {}).get("baidu_replacement", "REPLACE_WITH_BAIDU_IMAGE_URL") == "REPLACE_WITH_BAIDU_IMAGE_URL"]
+    return [f"{city}: needs images" for city in missing]
+
+@register("pages_readiness", "Pages Readiness", ["cities/*.html"], fix="create_missing_city_pages.py")
+def check_pages_readiness(snapshot):
+    return [f"{city}: page missing" for city in ALL_CITIES
+            if snapshot.index.page(os.path.join("cities", f"{city.lower()}.html")) is None]
+
+@register("navigation_links", "Navigation Links", ["cities/*.html"], fix="fix_all_issues.py")
+def check_navigation_links(snapshot):
+    issues = []
+    for page in snapshot.index.city_pages():
+        home_links = page.home_links()
+        if not home_links:
+            issues.append(f"{page.name}: No link back to home page")
+        inconsistent = [link for link in home_links if not link.startswith('/travel-website/')]
+        if inconsistent:
+            issues.append(f"{page.name}: Inconsistent home links: {', '.join(inconsistent[:2])}")
+    return issues
+
+@register("layout_color", "Layout & Color Consistency", ["cities/*.html", "index.html"], cost=2, fix="fix_all_issues.py")
+def check_layout_color(snapshot):
+    issues = []
+    city_pages = snapshot.index.city_pages()
+    for page in city_pages:
+        missing = [name for name, value in EXPECTED_COLORS.items() if value not in page.colors]
+        if missing:
+            issues.append(f"{page.name}: Missing colors {', '.join(missing)}")
+        missing = [element for element in ['city-hero', 'city-content', 'gallery'] if element not in page.lower]
+        if missing:
+            issues.append(f"{page.name}: Missing {', '.join(missing)}")
+    if city_pages and not set.intersection(*(page.layout_elements() for page in city_pages)):
+        issues.append("No common layout elements")
+    return issues
+
+@register("news_section", "News Section", ["index.html"])
+def check_news_section(snapshot):
+    main_page = snapshot.index.main_page
+    if main_page is None:
+        return ["index.html not found"]
+    if "Latest Travel News" not in main_page.content:
+        return ["News section not found"]
+    news_cards = main_page.content.count("news-card")
+    if news_cards < 3:
+        return [f"Only {news_cards} news cards found (expected 3+)"]
+    return []
+
+@register("main_page", "Main Page", ["index.html"])
+def check_main_page(snapshot):
+    main_page = snapshot.index.main_page
+    if main_page is None:
+        return ["Main page not found"]
+    issues = []
+    if not main_page.images:
+        issues.append("No image references found")
+    city_count = main_page.content.count('city-name')
+    if city_count != len(ALL_CITIES):
+        issues.append(f"Expected {len(ALL_CITIES)} city cards, found {city_count}")
+    if 'bootstrap' not in main_page.lower:
+        issues.append("Bootstrap CSS might be missing")
+    return issues
+
+@register("city_pages", "City Pages", ["cities/*.html"], fix="fix_city_page_images.py")
+def check_city_pages(snapshot):
+    issues = []
+    for page in snapshot.index.city_pages():
+        if '--hero-image:' not in page.content:
+            issues.append(f"{page.name}: No hero image CSS variable")
+        if '<img' not in page.content:
+            issues.append(f"{page.name}: No gallery images found")
+        if not any('index.html' in link for link in page.home_links()):
+            issues.append(f"{page.name}: Missing back to home link")
+    return issues
+
+@register("image_scripts", "Image Scripts", ["*.py"], every=60)
+def check_image_scripts(snapshot):
+    scripts = ["update_city_images_v2.py", "update_city_page_images.py", "fix_city_page_images.py"]
+    return [f"{script} missing" for script in scripts if not os.path.exists(snapshot.path(script))]
+
+@register("build_freshness", "Generated Pages Up To Date",
+          ["data/*.json", "cities/city-template.*", "images/responsive/manifest.json", "build_city_pages.py"], cost=2)
+def check_build_freshness(snapshot):
+    from build_site import create_graph
+    graph = create_graph()
+    return [f"{target.name} out of date: {', '.join(graph.changed_inputs(target)[:3])}"
+            for target in graph.stale_targets()]
+
+@register("external_links", "External Links",
+          ["index.html", "cities/*", "data/*.json", "fix_city_page_images.py", "update_city_cards.py", "add_food_icons.py"],
+          cost=10, every=60, config_key="links")
+def check_external_links(snapshot):
+    from link_checker import LinkChecker, collect_urls
+    urls = collect_urls(snapshot.website_dir)
+    checker = LinkChecker()
+    try:
+        results = checker.check(urls)
+    finally:
+        checker.close()
+    if results and all(result["status"] is None for result in results.values()):
+        # No host answered at all: the network is down, not the links
+        return []
+    return [f"{result['url']} ({result.get('error') or 'HTTP ' + str(result['status'])}) in "
+            f"{', '.join(sorted(urls[result['url']])[:2])}"
+            for result in results.values() if not result["ok"]]
+
+@register("performance", "Page Weight & Budgets", ["*.html", "cities/*.html", "blog/*.html", "*.css", "images/*"],
+          cost=5, every=60, config_key="performance")
+def check_performance(snapshot):
+    from link_checker import LinkChecker
+    from page_weight import PageWeightAnalyzer
+    checker = LinkChecker()
+    try:
+        reports = PageWeightAnalyzer(snapshot.website_dir, checker=checker).analyze(snapshot.index)
+    finally:
+        checker.close()
+    issues = [f"{path}: {name} {over['value']:,} > {over['budget']:,}"
+              for path, report in reports.items() for name, over in report["over_budget"].items()]
+    details = {path: {
+        "total_bytes": report["total_bytes"],
+        "weights": report["weights"],
+        "render_blocking": [item["url"] for item in report["render_blocking"]],
+        "largest_above_the_fold": report["above_the_fold_images"][:1],
+        "over_budget": report["over_budget"]
+    } for path, report in reports.items()}
+    return issues, details
+
+class StatusSink:
+    def __init__(self, status_file=STATUS_FILE):
+        self.status_file = status_file
+
+    def emit(self, results):
+        try:
+            with open(self.status_file, 'r', encoding='utf-8') as f:
+                status = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            status = {"checks": {}}
+        for result in results:
+            status["checks"][result.name] = dict(result.to_dict(), last_run=datetime.now().isoformat())
+        status["last_check"] = datetime.now().isoformat()
+        status["all_passed"] = all(check["passed"] for check in status["checks"].values())
+
+        temp_path = self.status_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f, indent=2)
+        os.replace(temp_path, self.status_file)
+
+class LogSink:
+    def __init__(self, log_file=LOG_FILE):
+        self.log_file = log_file
+
+    def log(self, message, level="INFO"):
+        """Log messages with timestamp."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_entry = f"[{timestamp}] [{level}] {message}"
+        print(log_entry)
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(log_entry + "\n")
+
+    def emit(self, results):
+        for result in results:
+            if result.passed:
+                self.log(f"✅ {result.title}: PASSED ({result.seconds * 1000:.0f} ms)")
+                continue
+            self.log(f"❌ {result.title}: FAILED ({result.seconds * 1000:.0f} ms)", "ERROR")
+            for issue in result.issues[:3]:
+                self.log(f"   • {issue}")
+            if len(result.issues) > 3:
+                self.log(f"   ... and {len(result.issues)-3} more issues")
+            for fix in result.fixes:
+                self.log(f"   🔧 {fix}")
+        passed = sum(1 for result in results if result.passed)
+        self.log(f"📊 Checks passed: {passed}/{len(results)}")
+
+class TelegramTriggerSink:
+    """Writes the files Clawdbot picks up to send a Telegram message"""
+
+    def __init__(self, only_failures=True):
+        self.only_failures = only_failures
+
+    def emit(self, results):
+        failed = [result for result in results if not result.passed]
+        if self.only_failures and not failed:
+            return
+        passed = len(results) - len(failed)
+        message = f"""
+📊 **WEBSITE MONITOR SUMMARY**
+**Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Checks Passed:** {passed}/{len(results)}
+**Overall Status:** {'✅ ALL GOOD' if not failed else '❌ NEEDS ATTENTION'}
+"""
+        for result in failed:
+            message += f"\n❌ **{result.title}**: {len(result.issues)} issues\n"
+            for issue in result.issues[:2]:
+                message += f"• {issue}\n"
+            for fix in result.fixes:
+                message += f"🔧 {fix}\n"
+
+        timestamp = datetime.now().isoformat()
+        with open(os.path.join(WEBSITE_DIR, "latest_telegram_alert.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"TO:{TELEGRAM_CHAT_ID}\nCHANNEL:telegram\nMESSAGE:{message}\nTIMESTAMP:{timestamp}\n")
+        with open(os.path.join(WEBSITE_DIR, "send_telegram_trigger.json"), 'w', encoding='utf-8') as f:
+            json.dump({"action": "send", "to": TELEGRAM_CHAT_ID, "channel": "telegram",
+                       "message": message, "timestamp": timestamp}, f, indent=2)
+
+def default_sinks():
+    return [StatusSink(), LogSink(), TelegramTriggerSink()]
+
+def load_config():
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+class CheckRunner:
+    def __init__(self, sinks=None, workers=4, auto_fix=None, website_dir=WEBSITE_DIR):
+        config = load_config()
+        self.sinks = sinks if sinks is not None else default_sinks()
+        self.workers = workers
+        self.auto_fix = config.get("monitor", {}).get("auto_fix", True) if auto_fix is None else auto_fix
+        self.switches = config.get("checks", {})
+        self.website_dir = website_dir
+        self.last_run = {}
+
+    def enabled(self, name):
+        check = REGISTRY[name]
+        return check.config_key is None or self.switches.get(check.config_key, True)
+
+    def due(self, now=None):
+        """Enabled checks whose interval has elapsed since they last ran"""
+        now = now if now is not None else time.time()
+        return [name for name, check in REGISTRY.items()
+                if self.enabled(name) and now - self.last_run.get(name, 0) >= check.every * 60]
+
+    def run_check(self, check, snapshot):
+        started = time.perf_counter()
+        try:
+            issues, details = check.func(snapshot), None
+            if isinstance(issues, tuple):
+                issues, details = issues
+            return CheckResult(check, not issues, issues, time.perf_counter() - started, details=details)
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            return CheckResult(check, False, [error], time.perf_counter() - started, error)
+
+    def apply_fixes(self, results):
+        """Run each requested fix-up script once, however many checks asked for it"""
+        requested = {}
+        for result in results:
+            fix = REGISTRY[result.name].fix
+            if fix and not result.passed and not result.error:
+                requested.setdefault(fix, []).append(result)
+        for script, asking in requested.items():
+            if not os.path.exists(os.path.join(self.website_dir, script)):
+                continue
+            try:
+                outcome = run_script(script, cwd=self.website_dir)
+                status = "" if outcome.returncode == 0 else " (failed)"
+            except subprocess.TimeoutExpired as e:
+                status = f" (timed out after {e.timeout}s)"
+            for result in asking:
+                result.fixes.append(f"Ran {script}{status}")
+
+    def run(self, names=None):
+        """One pass over the given checks (default: all enabled), then fixes, then every sink"""
+        names = list(names) if names is not None else [name for name in REGISTRY if self.enabled(name)]
+        checks = sorted((REGISTRY[name] for name in names), key=lambda check: -check.cost)
+        snapshot = SiteSnapshot(self.website_dir)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="check") as executor:
+            results = list(executor.map(lambda check: self.run_check(check, snapshot), checks))
+        results.sort(key=lambda result: names.index(result.name))
+
+        now = time.time()
+        for name in names:
+            self.last_run[name] = now
+        if self.auto_fix:
+            self.apply_fixes(results)
+        for sink in self.sinks:
+            sink.emit(results)
+        return results
+
+    def run_due(self):
+        names = self.due()
+        return self.run(names) if names else []
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the website checks in one pass")
+    parser.add_argument('checks', nargs='*', help="checks to run (default: all)")
+    parser.add_argument('--list', action='store_true', help="list the registered checks")
+    parser.add_argument('--no-fix', action='store_true', help="only report, do not run fix-up scripts")
+    parser.add_argument('--workers', type=int, default=4, help="checks run in parallel (default: 4)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, check in REGISTRY.items():
+            print(f"🔹 {name}: {check.title} (cost {check.cost}, every {check.every} min) ← {', '.join(check.inputs)}")
+        return
+
+    unknown = [name for name in args.checks if name not in REGISTRY]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    print("🔍 WEBSITE CHECKS")
+    print("=" * 50)
+    started = time.perf_counter()
+    runner = CheckRunner(workers=args.workers, auto_fix=False if args.no_fix else None)
+    results = runner.run(args.checks or None)
+    print(f"\n⏱️  {len(results)} checks in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Resident website monitor daemon.
+Replaces the per-monitor cron entries: one long-running process schedules
+jobs on an asyncio loop and runs them in-process. The default job, "checks",
+runs the registered checks of monitor_checks.py whose interval has elapsed;
+the legacy monitors (enhanced_monitor, website_monitor, telegram_monitor,
+clawdbot_integrated_monitor) can still be scheduled by name. Warm state (the
+parsed site index, imported fix-up scripts) survives between ticks, and every
+run is timed into monitor_daemon_status.json.
+
+With --watch the fixed interval is replaced by filesystem events: a change
+under cities/, data/, images/ or to index.html runs only the checks whose
+declared inputs include the touched files.
+
+Usage: python3 monitor_daemon.py [--once | --watch] [--status] [job ...]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import traceback
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from site_watcher import SiteWatcher
+from monitor_checks import checks_reading
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(WEBSITE_DIR, "monitor_config.json")
+STATUS_FILE = os.path.join(WEBSITE_DIR, "monitor_daemon_status.json")
+LOG_FILE = os.path.join(WEBSITE_DIR, "monitor_daemon.log")
+
+def run_enhanced_monitor():
+    from enhanced_monitor import EnhancedWebsiteMonitor
+    return EnhancedWebsiteMonitor().run_complete_check()
+
+def run_website_monitor():
+    from website_monitor import WebsiteMonitor
+    return WebsiteMonitor().run_check()
+
+def run_telegram_monitor():
+    from telegram_monitor import TelegramMonitor
+    return TelegramMonitor().run_complete_check()
+
+def run_clawdbot_monitor():
+    from clawdbot_integrated_monitor import check_all_and_alert
+    return check_all_and_alert()
+
+_runners = {}
+
+def check_runner(mode="scheduled"):
+    """One warm CheckRunner per mode; watch-triggered passes only report, so fixes cannot retrigger them"""
+    if mode not in _runners:
+        from monitor_checks import CheckRunner
+        _runners[mode] = CheckRunner(auto_fix=False) if mode == "watch" else CheckRunner()
+    return _runners[mode]
+
+def run_due_checks():
+    """The registered checks whose own interval has elapsed, in one concurrent pass"""
+    results = check_runner().run_due()
+    return all(result.passed for result in results)
+
+JOBS = {
+    "checks": run_due_checks,
+    "enhanced_monitor": run_enhanced_monitor,
+    "website_monitor": run_website_monitor,
+    "telegram_monitor": run_telegram_monitor,
+    "clawdbot_integrated_monitor": run_clawdbot_monitor,
+}
+
+def load_config():
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+class MonitorDaemon:
+    def __init__(self, job_names=None, config=None):
+        config = config if config is not None else load_config()
+        default_interval = config.get("monitor", {}).get("check_interval_minutes", 10)
+        intervals = config.get("daemon", {}).get("jobs", {"checks": 1})
+
+        names = job_names or list(intervals)
+        unknown = [name for name in names if name not in JOBS]
+        if unknown:
+            raise ValueError(f"Unknown jobs: {', '.join(unknown)}")
+
+        self.intervals = {name: intervals.get(name, default_interval) for name in names}
+        self.status = {
+            "pid": os.getpid(),
+            "started_at": datetime.now().isoformat(),
+            "jobs": {name: {"interval_minutes": minutes, "runs": 0, "failures": 0}
+                     for name, minutes in self.intervals.items()}
+        }
+        # Jobs share the working directory, stdout and the files they fix, so
+        # they run one at a time off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="monitor-job")
+        self.stopping = None
+
+    def log(self, message, level="INFO"):
+        """Log messages with timestamp."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_entry = f"[{timestamp}] [{level}] {message}"
+        print(log_entry, flush=True)
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(log_entry + "\n")
+
+    def save_status(self):
+        self.status["updated_at"] = datetime.now().isoformat()
+        temp_path = STATUS_FILE + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status, f, indent=2)
+        os.replace(temp_path, STATUS_FILE)
+
+    def run_job(self, name):
+        """Run one job in the worker thread and record its timing"""
+        job_status = self.status["jobs"][name]
+        job_status["last_started"] = datetime.now().isoformat()
+        started = time.perf_counter()
+        try:
+            result = JOBS[name]()
+            job_status["last_result"] = bool(result)
+            job_status.pop("last_error", None)
+        except Exception as e:
+            job_status["last_result"] = False
+            job_status["last_error"] = f"{e.__class__.__name__}: {e}"
+            job_status["failures"] += 1
+            self.log(f"❌ {name} crashed:\n{traceback.format_exc()}", "ERROR")
+        seconds = time.perf_counter() - started
+
+        job_status["runs"] += 1
+        job_status["last_seconds"] = round(seconds, 3)
+        job_status["max_seconds"] = round(max(seconds, job_status.get("max_seconds", 0)), 3)
+        total = job_status.get("total_seconds", 0) + seconds
+        job_status["total_seconds"] = round(total, 3)
+        job_status["avg_seconds"] = round(total / job_status["runs"], 3)
+        return seconds
+
+    async def run_once(self, name):
+        loop = asyncio.get_running_loop()
+        seconds = await loop.run_in_executor(self.executor, self.run_job, name)
+        result = "✅" if self.status["jobs"][name]["last_result"] else "⚠️ "
+        self.log(f"{result} {name} finished in {seconds:.2f}s")
+        self.save_status()
+
+    async def schedule(self, name):
+        """Run a job now and then every interval, skipping ticks missed while busy"""
+        interval = self.intervals[name] * 60
+        next_run = time.monotonic()
+        while not self.stopping.is_set():
+            await self.run_once(name)
+            now = time.monotonic()
+            while next_run <= now:
+                next_run += interval
+            self.status["jobs"][name]["next_run"] = (datetime.now() + timedelta(seconds=next_run - now)).isoformat()
+            self.save_status()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=next_run - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def run_checks(self, names, paths):
+        """Run one watch-triggered pass in the worker thread and record per-check timings"""
+        started = time.perf_counter()
+        try:
+            results = check_runner("watch").run(names)
+        except Exception:
+            self.log(f"❌ Check pass crashed:\n{traceback.format_exc()}", "ERROR")
+            results = []
+        for result in results:
+            check_status = self.status.setdefault("watch", {}).setdefault(result.name, {"runs": 0})
+            check_status["runs"] += 1
+            check_status["last_result"] = result.passed
+            check_status["last_seconds"] = round(result.seconds, 3)
+            check_status["last_run"] = datetime.now().isoformat()
+            check_status["triggered_by"] = sorted(paths)[:10]
+        return results, time.perf_counter() - started
+
+    async def watch(self, watcher):
+        """Run the affected checks for every coalesced batch of file changes"""
+        loop = asyncio.get_running_loop()
+        watcher.start()
+        self.log(f"👀 Watching {', '.join(watcher.watched)} ({watcher.mode})")
+        batches = watcher.batches()
+        try:
+            while not self.stopping.is_set():
+                next_batch = asyncio.ensure_future(batches.__anext__())
+                stop = asyncio.ensure_future(self.stopping.wait())
+                done, _ = await asyncio.wait({next_batch, stop}, return_when=asyncio.FIRST_COMPLETED)
+                if next_batch not in done:
+                    next_batch.cancel()
+                    break
+                stop.cancel()
+
+                paths = next_batch.result()
+                names = checks_reading(paths)
+                self.log(f"📝 {len(paths)} changed: {', '.join(sorted(paths)[:3])}"
+                         + (f" (+{len(paths) - 3})" if len(paths) > 3 else "")
+                         + (f" → {', '.join(names)}" if names else " → no checks affected"))
+                if names:
+                    results, seconds = await loop.run_in_executor(self.executor, self.run_checks, names, paths)
+                    passed = sum(1 for result in results if result.passed)
+                    self.log(f"{'✅' if passed == len(names) else '⚠️ '} {passed}/{len(names)} passed in {seconds:.2f}s")
+                    self.save_status()
+        finally:
+            watcher.stop()
+
+    async def run(self, once=False, watcher=None):
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        if watcher:
+            self.log(f"🚀 Monitor daemon started in watch mode (pid {os.getpid()})")
+            try:
+                await self.watch(watcher)
+            finally:
+                self.executor.shutdown(wait=True)
+                self.log("🛑 Monitor daemon stopped")
+            return
+
+        self.log(f"🚀 Monitor daemon started (pid {os.getpid()}): "
+                 + ', '.join(f"{name} every {minutes} min" for name, minutes in self.intervals.items()))
+        try:
+            if once:
+                for name in self.intervals:
+                    await self.run_once(name)
+            else:
+                await asyncio.gather(*(self.schedule(name) for name in self.intervals))
+        finally:
+            self.executor.shutdown(wait=True)
+            self.log("🛑 Monitor daemon stopped")
+
+def print_status():
+    try:
+        with open(STATUS_FILE, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        print("❌ No daemon status yet")
+        return
+
+    print(f"📊 Monitor daemon (pid {status['pid']}, started {status['started_at']})")
+    for name, job in status["jobs"].items():
+        result = "✅" if job.get("last_result") else "❌"
+        print(f"{result} {name}: {job['runs']} runs, last {job.get('last_seconds', 0):.2f}s, "
+              f"avg {job.get('avg_seconds', 0):.2f}s, next {job.get('next_run', '-')}")
+    for name, check in status.get("watch", {}).items():
+        result = "✅" if check.get("last_result") else "❌"
+        print(f"{result} {name} (watch): {check['runs']} runs, last {check['last_seconds']:.2f}s "
+              f"← {', '.join(check['triggered_by'][:3])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the website monitors in one resident process")
+    parser.add_argument('jobs', nargs='*', help=f"jobs to run (default: all of {', '.join(JOBS)})")
+    parser.add_argument('--once', action='store_true', help="run every job once and exit")
+    parser.add_argument('--watch', action='store_true', help="run checks when the site files change instead of on an interval")
+    parser.add_argument('--poll', action='store_true', help="with --watch, poll file stats even if watchdog is installed")
+    parser.add_argument('--status', action='store_true', help="print the timings of the running daemon")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+
+    # The monitors write their logs and status files relative to the site, as under cron
+    os.chdir(WEBSITE_DIR)
+    sys.path.insert(0, WEBSITE_DIR)
+    daemon = MonitorDaemon(args.jobs)
+    watcher = SiteWatcher(WEBSITE_DIR, use_watchdog=not args.poll) if args.watch else None
+    asyncio.run(daemon.run(once=args.once, watcher=watcher))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+EXIF-aware normalization for travel website photos
+Browsers and our optimizers ignored part of what the camera wrote: the
+optimizers re-encoded without the EXIF Orientation tag (photos came out
+rotated) and without the ICC profile (wide-gamut photos lost their colors),
+while files that were "already optimized" kept all their metadata. This
+stage bakes the orientation into the pixels, converts non-sRGB images to
+sRGB and strips nonessential metadata (EXIF, XMP, IPTC, ICC, comments).
+
+When nothing needs re-rendering, JPEG metadata segments are cut out of the
+file without re-encoding. Each file's report (what was removed, bytes saved)
+is kept in the image optimization manifest, so unchanged files are skipped
+on the next run. Every stage that derives images from the originals
+(optimize_image.py, responsive_images.py, image_placeholders.py and the
+remote mirror) uses the same orientation and color helpers when it decodes.
+
+Usage: python3 normalize_images.py [--workers N] [--force] [--dry-run]
+"""
+
+import io
+import os
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageCms
+from optimization_manifest import OptimizationManifest
+from responsive_images import find_sources
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+JPEG_QUALITY = 85
+SETTINGS = {'orientation': True, 'srgb': True, 'strip': True, 'jpeg_quality': JPEG_QUALITY, 'version': 1}
+
+ORIENTATION_TAG = 0x0112
+# EXIF Orientation value → transpose that makes the pixels upright (same table as ImageOps.exif_transpose)
+TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+SRGB = ImageCms.createProfile('sRGB')
+# Colors compared after a profile → sRGB transform to decide whether a profile is sRGB in all but name
+PROBE_COLORS = [(0, 0, 0), (255, 255, 255), (255, 0, 0), (0, 255, 0), (0, 0, 255), (128, 128, 128)]
+
+# JPEG markers
+SOI, SOS, EOI, COM = 0xD8, 0xDA, 0xD9, 0xFE
+APP0, APP14 = 0xE0, 0xEE
+STANDALONE = set(range(0xD0, 0xD8)) | {0x01}
+
+def orientation(img):
+    value = img.getexif().get(ORIENTATION_TAG, 1)
+    return value if value in TRANSPOSE else 1
+
+def apply_orientation(img, value=None):
+    """Rotate/flip the pixels as the EXIF Orientation tag asks; upright images are returned as they are"""
+    value = orientation(img) if value is None else value
+    return img.transpose(TRANSPOSE[value]) if value in TRANSPOSE else img
+
+def profile_name(icc):
+    try:
+        return ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(icc))).strip() or 'unnamed'
+    except (ImageCms.PyCMSError, OSError):
+        return 'unreadable'
+
+def is_srgb(profile):
+    """True if the profile maps colors (almost) exactly like sRGB, whatever it is called"""
+    probe = Image.new('RGB', (len(PROBE_COLORS), 1))
+    for x, color in enumerate(PROBE_COLORS):
+        probe.putpixel((x, 0), color)
+    converted = ImageCms.profileToProfile(probe, profile, SRGB, outputMode='RGB')
+    return max(abs(a - b) for a, b in zip(probe.tobytes(), converted.tobytes())) <= 2
+
+def to_srgb(img):
+    """
+    Convert an image with an embedded color profile to sRGB.
+    Returns (image, note): note describes what happened to the profile, None if there was none.
+    """
+    icc = img.info.get('icc_profile')
+    if not icc:
+        return img, None
+    name = profile_name(icc)
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+        if img.mode in ('RGB', 'RGBA') and is_srgb(profile):
+            return img, f"ICC profile ({name}, already sRGB)"
+        output_mode = 'RGBA' if img.mode in ('RGBA', 'LA', 'PA') else 'RGB'
+        source = img if img.mode in ('RGB', 'RGBA', 'CMYK', 'L') else img.convert(output_mode)
+        converted = ImageCms.profileToProfile(source, profile, SRGB, outputMode=output_mode)
+        converted.info = {key: value for key, value in img.info.items() if key != 'icc_profile'}
+        return converted, f"ICC profile ({name}, converted to sRGB)"
+    except (ImageCms.PyCMSError, OSError, ValueError) as e:
+        return img, f"ICC profile ({name}, not convertible: {e})"
+
+def needs_srgb_conversion(img):
+    icc = img.info.get('icc_profile')
+    if not icc or img.mode not in ('RGB', 'RGBA'):
+        return bool(icc)
+    try:
+        return not is_srgb(ImageCms.ImageCmsProfile(io.BytesIO(icc)))
+    except (ImageCms.PyCMSError, OSError):
+        return True
+
+def segment_name(marker, segment):
+    """Name of a removable JPEG segment, None for the ones decoding needs (JFIF APP0, Adobe APP14, tables, frames)"""
+    payload = segment[4:]
+    if marker == COM:
+        return 'comment'
+    if marker == 0xE1:
+        if payload.startswith(b'Exif\x00'):
+            return 'EXIF'
+        if payload.startswith((b'http://ns.adobe.com/xap/', b'http://ns.adobe.com/xmp/')):
+            return 'XMP'
+        return 'APP1'
+    if marker == 0xE2 and payload.startswith(b'ICC_PROFILE\x00'):
+        return 'ICC profile'
+    if marker == 0xED:
+        return 'IPTC'
+    if 0xE0 <= marker <= 0xEF and marker not in (APP0, APP14):
+        return f'APP{marker - 0xE0}'
+    return None
+
+def strip_jpeg_metadata(data):
+    """
+    Cut the metadata segments out of a JPEG without touching the compressed image.
+    Returns (stripped bytes, {segment name: bytes removed})
+    """
+    if data[:2] != bytes((0xFF, SOI)):
+        raise ValueError("not a JPEG file")
+    parts, removed = [data[:2]], defaultdict(int)
+    i = 2
+    while i < len(data):
+        if data[i] != 0xFF:
+            raise ValueError(f"corrupt JPEG marker at byte {i}")
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (SOS, EOI):
+            # Entropy-coded data follows; everything from here on is kept as it is
+            parts.append(data[i:])
+            break
+        if marker in STANDALONE:
+            parts.append(data[i:i + 2])
+            i += 2
+            continue
+        length = int.from_bytes(data[i + 2:i + 4], 'big')
+        segment = data[i:i + 2 + length]
+        name = segment_name(marker, segment)
+        if name:
+            removed[name] += len(segment)
+        else:
+            parts.append(segment)
+        i += 2 + length
+    return b''.join(parts), dict(removed)
+
+def metadata_sizes(img):
+    """{name: bytes} of the metadata Pillow exposes for non-JPEG formats"""
+    sizes = {}
+    for key, name in (('exif', 'EXIF'), ('icc_profile', 'ICC profile'), ('xmp', 'XMP'),
+                      ('XML:com.adobe.xmp', 'XMP'), ('comment', 'comment')):
+        if img.info.get(key):
+            sizes[name] = sizes.get(name, 0) + len(img.info[key])
+    for key, value in getattr(img, 'text', {}).items():
+        if key != 'XML:com.adobe.xmp':
+            sizes['text chunks'] = sizes.get('text chunks', 0) + len(key) + len(value)
+    return sizes
+
+def encode(img, fmt):
+    """Re-encode without any metadata"""
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        img.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        img.save(buffer, 'PNG', optimize=True)
+    else:
+        img.save(buffer, fmt, quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+def normalize_file(source_path, dry_run=False):
+    """
+    Normalize one image in place (runs inside a pool worker).
+    Returns (source path, report, error); the report lists the changes and bytes saved.
+    """
+    path = os.path.join(WEBSITE_DIR, source_path)
+    try:
+        with open(path, 'rb') as f:
+            original = f.read()
+        with Image.open(io.BytesIO(original)) as img:
+            fmt = img.format
+            value = orientation(img)
+            convert = needs_srgb_conversion(img)
+            changes = []
+
+            if value != 1 or convert:
+                # The pixels themselves change: decode, fix and re-encode
+                removed = strip_jpeg_metadata(original)[1] if fmt == 'JPEG' else metadata_sizes(img)
+                fixed = apply_orientation(img, value)
+                if value != 1:
+                    changes.append(f"applied EXIF orientation {value}")
+                fixed, note = to_srgb(fixed)
+                if note:
+                    changes.append(note)
+                output = encode(fixed, fmt)
+            elif fmt == 'JPEG':
+                output, removed = strip_jpeg_metadata(original)
+            else:
+                removed = metadata_sizes(img)
+                output = encode(img, fmt) if removed else original
+
+        if not changes and not removed:
+            output = original
+        # A lossless re-save that grows the file is not worth it
+        elif not changes and len(output) >= len(original):
+            output, removed = original, {}
+
+        report = {
+            'format': fmt,
+            'changes': changes,
+            'removed': removed,
+            'original_bytes': len(original),
+            'bytes_saved': len(original) - len(output),
+        }
+        if output != original and not dry_run:
+            temp_path = path + '.normalized'
+            with open(temp_path, 'wb') as f:
+                f.write(output)
+            os.replace(temp_path, path)
+        return source_path, report, None
+
+    except Exception as e:
+        return source_path, None, f"{e.__class__.__name__}: {e}"
+
+def run_jobs(sources, workers=1, dry_run=False):
+    if workers <= 1:
+        for path in sources:
+            yield normalize_file(path, dry_run)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(normalize_file, path, dry_run) for path in sources]
+        for future in as_completed(futures):
+            yield future.result()
+
+def describe(report):
+    parts = list(report['changes'])
+    parts += [f"removed {name} ({size / 1024:.1f} KB)" for name, size in sorted(report['removed'].items())]
+    return ', '.join(parts) or "clean"
+
+def build(workers=1, force=False, dry_run=False):
+    """Normalize every source image that changed since its last normalization"""
+    cache = OptimizationManifest()
+    sources = find_sources()
+    todo = [path for path in sources
+            if force or not cache.lookup(os.path.join(WEBSITE_DIR, path), SETTINGS, stage="normalize")]
+    print(f"📊 {len(sources)} source images, {len(todo)} to check")
+
+    totals, changed, failed = defaultdict(int), 0, 0
+    saved = 0
+    for source_path, report, error in run_jobs(todo, workers, dry_run):
+        if error:
+            print(f"   ❌ {source_path}: {error}")
+            failed += 1
+            continue
+        if report['changes'] or report['bytes_saved']:
+            changed += 1
+            saved += report['bytes_saved']
+            for name, size in report['removed'].items():
+                totals[name] += size
+            print(f"   ✅ {source_path}: {describe(report)} → saved {report['bytes_saved']:,} bytes")
+        if not dry_run:
+            cache.record(os.path.join(WEBSITE_DIR, source_path), SETTINGS, stage="normalize", normalized=report)
+
+    if not dry_run:
+        cache.save()
+    verb = "would change" if dry_run else "changed"
+    print(f"\n📈 {changed} files {verb}, {saved:,} bytes saved, {failed} failed")
+    for name, size in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"   {name}: {size:,} bytes")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply EXIF orientation, convert to sRGB and strip photo metadata")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument('--force', action='store_true', help="check files the manifest says are normalized")
+    parser.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    args = parser.parse_args()
+
+    print("🧭 IMAGE NORMALIZATION")
+    print("=" * 50)
+    build(workers=args.workers, force=args.force, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Persistent manifest of already optimized images.
+Each entry is keyed by the image path and records the content hash, size and
+mtime of the file as it was left by the optimizer, together with the settings
+it was produced with. Files that have not changed since are skipped without
+being decoded again.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = os.path.join(WEBSITE_DIR, "image_optimization_manifest.json")
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file's content without decoding it"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class OptimizationManifest:
+    def __init__(self, manifest_path=MANIFEST_FILE):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it is missing or broken."""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("images", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically if anything changed."""
+        if not self.dirty:
+            return
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"images": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+        self.dirty = False
+
+    def key(self, image_path):
+        """Manifest key: the image path relative to the website directory."""
+        return os.path.relpath(os.path.abspath(image_path), WEBSITE_DIR)
+
+    def lookup(self, image_path, settings, stage="optimize"):
+        """
+        Return the recorded entry if the file is unchanged since it was
+        produced with the same settings, otherwise None.
+
+        Size and mtime are compared first so unchanged files are not even
+        read. When only the mtime moved (copy, checkout) the content hash
+        decides.
+        """
+        entry = self.entries.get(self.key(image_path), {}).get(stage)
+        if not entry or entry.get("settings") != settings:
+            return None
+
+        try:
+            stat = os.stat(image_path)
+        except FileNotFoundError:
+            return None
+
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return entry
+
+        if file_sha256(image_path) != entry["sha256"]:
+            return None
+
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self.dirty = True
+        return entry
+
+    def record(self, image_path, settings, stage="optimize", **extra):
+        """Record the current state of a file produced with the given settings."""
+        stat = os.stat(image_path)
+        entry = {
+            "sha256": file_sha256(image_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": settings,
+            "recorded_at": datetime.now().isoformat()
+        }
+        entry.update(extra)
+        self.entries.setdefault(self.key(image_path), {})[stage] = entry
+        self.dirty = True
+        return entry
@@ -1,83 +1,70 @@
 #!/usr/bin/env python3
 """
 Batch image optimization script for travel website
-Optimizes all images listed in the database as pending tasks
+Optimizes all images listed in the task store (Postgres or travel.db) as pending tasks
+
+Each worker decodes at reduced size where --max-width allows (JPEG draft
+mode), refuses images that would not fit its --memory-limit and reports the
+peak RSS of every image.
+
+Usage: python3 optimize_all_images.py [--workers N] [--quality Q] [--max-width N] [--memory-limit MB] [--fresh] [--force]
+                                      [--backend auto|postgres|sqlite] [--sqlite PATH]
 """
 
 import os
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import Image
-import subprocess
 import json
 from datetime import datetime
+from optimization_manifest import OptimizationManifest
+from task_store import get_store, parse_image_idea, normalize_path, IMAGE_TASK, BACKEND, SQLITE_PATH
+from optimize_image import (jpeg_settings, load_rgb, limit_memory, reset_peak_rss, peak_rss,
+                            MB, DEFAULT_MEMORY_LIMIT_MB)
+
+# Checkpoint journal: one JSON line per finished task, removed after the database update
+JOURNAL_FILE = "optimize_all_images.journal"
 
-def get_pending_image_tasks():
-    """Get all pending image optimization tasks from database"""
+def get_pending_image_tasks(store):
+    """Get all pending image optimization tasks from the task store"""
     try:
-        # Query database for pending image optimization tasks
-        cmd = [
-            'psql', '-d', 'travel_website', '-U', 'fudongli', '-h', 'localhost',
-            '-c', "SELECT id, idea FROM travel.travel_development_ideas WHERE is_fixed = false AND idea LIKE 'Optimize image%' ORDER BY id;",
-            '-t', '-A', '-F', '|'
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"Error querying database: {result.stderr}")
-            return []
-        
         tasks = []
-        for line in result.stdout.strip().split('\n'):
-            if line:
-                parts = line.split('|')
-                if len(parts) >= 2:
-                    task_id = parts[0].strip()
-                    idea = parts[1].strip()
-                    
-                    # Extract image path from idea
-                    # Format: "Optimize image ../images/user_photos/filename.jpg for city Cityname"
-                    if 'Optimize image ' in idea and ' for city ' in idea:
-                        image_path = idea.replace('Optimize image ', '').split(' for city ')[0].strip()
-                        city = idea.split(' for city ')[1].strip()
-                        
-                        # Fix path if it starts with ../
-                        if image_path.startswith('../'):
-                            image_path = image_path[3:]  # Remove ../
-                        
-                        tasks.append({
-                            'id': task_id,
-                            'image_path': image_path,
-                            'city': city,
-                            'idea': idea
-                        })
-        
+        for row in store.pending(IMAGE_TASK):
+            # Format: "Optimize image ../images/user_photos/filename.jpg for city Cityname"
+            parsed = parse_image_idea(row['idea'])
+            if not parsed and not row['target_path']:
+                continue
+            tasks.append({
+                'id': row['id'],
+                'image_path': row['target_path'] or normalize_path(parsed[0]),
+                'city': parsed[1] if parsed else 'Unknown',
+                'idea': row['idea']
+            })
         return tasks
-        
+
     except Exception as e:
         print(f"Error getting tasks from database: {e}")
         return []
 
-def optimize_image(image_path, quality=85):
+def optimize_image(image_path, quality=85, max_width=None, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
     """Optimize a single image"""
     if not os.path.exists(image_path):
         print(f"  ❌ File not found: {image_path}")
         return None
     
     original_size = os.path.getsize(image_path)
+    temp_path = image_path + '.optimized'
+    reset_peak_rss()
     
     try:
         with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
             # Get image info
-            width, height = img.size
             format_info = img.format
-            
-            # Create temp path
-            temp_path = image_path + '.optimized'
+
+            # Decode at reduced size where possible and convert to RGB if necessary
+            img = load_rgb(img, max_width, memory_limit_mb)
+            width, height = img.size
             
             # Save with optimization
             img.save(
@@ -103,6 +90,7 @@ def optimize_image(image_path, quality=85):
                     'savings_percent': savings_percent,
                     'dimensions': f"{width}x{height}",
                     'format': format_info,
+                    'peak_rss': peak_rss(),
                     'message': f"Reduced by {savings_percent:.1f}%"
                 }
             else:
@@ -115,6 +103,7 @@ def optimize_image(image_path, quality=85):
                     'savings_percent': 0,
                     'dimensions': f"{width}x{height}",
                     'format': format_info,
+                    'peak_rss': peak_rss(),
                     'message': "Already optimized"
                 }
                 
@@ -125,92 +114,223 @@ def optimize_image(image_path, quality=85):
             os.remove(temp_path)
         return {
             'success': False,
-            'error': str(e)
+            'error': f"{e.__class__.__name__}: {e}" if isinstance(e, MemoryError) else str(e),
+            'peak_rss': peak_rss()
         }
 
-def mark_task_completed(task_id):
-    """Mark a task as completed in the database"""
+def mark_tasks_completed(store, task_ids):
+    """Mark a batch of tasks as completed in a single database transaction"""
     try:
-        cmd = [
-            'psql', '-d', 'travel_website', '-U', 'fudongli', '-h', 'localhost',
-            '-c', f"UPDATE travel.travel_development_ideas SET is_fixed = true, fixed_at = NOW() WHERE id = {task_id};"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return True
-        else:
-            print(f"  ❌ Database update failed: {result.stderr}")
-            return False
-            
+        store.mark_fixed(task_ids)
+        return True
     except Exception as e:
         print(f"  ❌ Error updating database: {e}")
         return False
 
+def load_journal(journal_path=JOURNAL_FILE):
+    """Load finished tasks from the checkpoint journal of an interrupted run"""
+    finished = {}
+    if not os.path.exists(journal_path):
+        return finished
+
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            finished[int(entry['id'])] = entry
+
+    return finished
+
+def append_journal(journal, task, result):
+    """Append one finished task to the checkpoint journal and flush it to disk"""
+    entry = {
+        'id': task['id'],
+        'image_path': task['image_path'],
+        'result': result,
+        'finished_at': datetime.now().isoformat()
+    }
+    journal.write(json.dumps(entry) + '\n')
+    journal.flush()
+    os.fsync(journal.fileno())
+
+def optimize_task(task, quality=85, max_width=None, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """Optimize the image of one task (runs inside a pool worker)"""
+    if not os.path.exists(task['image_path']):
+        return task, None
+    return task, optimize_image(task['image_path'], quality, max_width, memory_limit_mb)
+
+def cached_result(image_path):
+    """Result for an image the manifest says is already optimized"""
+    size = os.path.getsize(image_path)
+    return {
+        'success': True,
+        'cached': True,
+        'original_size': size,
+        'optimized_size': size,
+        'savings': 0,
+        'savings_percent': 0,
+        'dimensions': 'unchanged',
+        'format': 'JPEG',
+        'message': "Already optimized (cached)"
+    }
+
+def report_result(task, result, index, total):
+    """Print the outcome of one task"""
+    print(f"🔹 Task {index}/{total}: {os.path.basename(task['image_path'])} ({task['city']})")
+    print(f"   ID: {task['id']}, Path: {task['image_path']}")
+
+    if result is None:
+        print(f"   ❌ File not found, skipping...")
+    elif result['success']:
+        print(f"   ✅ {result['message']}")
+        print(f"   📏 {result['dimensions']}, {result['format']}")
+        print(f"   📊 {result['original_size']:,} → {result['optimized_size']:,} bytes")
+        if result['savings'] > 0:
+            print(f"   💾 Saved: {result['savings']:,} bytes ({result['savings_percent']:.1f}%)")
+        if result.get('peak_rss'):
+            print(f"   🧠 Peak RSS: {result['peak_rss'] / MB:.0f} MB")
+    else:
+        print(f"   ❌ Optimization failed")
+        if 'error' in result:
+            print(f"   Error: {result['error']}")
+
+    print()
+
+def run_tasks(tasks, workers=1, quality=85, max_width=None, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """
+    Optimize tasks serially or across a process pool, yielding (task, result)
+    as they finish. Pool workers also get their address space capped at
+    memory_limit_mb.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield optimize_task(task, quality, max_width, memory_limit_mb)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_memory, initargs=(memory_limit_mb,)) as pool:
+        futures = [pool.submit(optimize_task, task, quality, max_width, memory_limit_mb) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimize all images with pending optimization tasks")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes for decode/encode (default: 1)")
+    parser.add_argument('--quality', type=int, default=85, help="JPEG quality (default: 85)")
+    parser.add_argument('--max-width', type=int,
+                        help="downscale wider images to this width, decoding JPEGs at reduced size")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"memory ceiling per worker in MB (default: {DEFAULT_MEMORY_LIMIT_MB})")
+    parser.add_argument('--journal', default=JOURNAL_FILE, help="checkpoint journal path")
+    parser.add_argument('--fresh', action='store_true',
+                        help="ignore an existing checkpoint journal and start over")
+    parser.add_argument('--force', action='store_true',
+                        help="re-encode images even if the manifest says they are optimized")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND,
+                        help="task store backend (default: $TASK_STORE or auto)")
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite task store file (default: travel.db)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     print("🖼️  BATCH IMAGE OPTIMIZATION")
     print("=" * 50)
     
     # Get pending tasks
     print("📋 Fetching pending image optimization tasks...")
-    tasks = get_pending_image_tasks()
+    store = get_store(args.backend, args.sqlite)
+    tasks = get_pending_image_tasks(store)
     
     if not tasks:
         print("✅ No pending image optimization tasks found!")
         return
     
     print(f"📊 Found {len(tasks)} images to optimize")
+
+    # Resume from the checkpoint journal of an interrupted run
+    if args.fresh and os.path.exists(args.journal):
+        os.remove(args.journal)
+    finished = load_journal(args.journal)
+    pending_ids = {task['id'] for task in tasks}
+    resumed = [entry for task_id, entry in finished.items() if task_id in pending_ids]
+    remaining = [task for task in tasks if task['id'] not in finished]
+
+    # Skip images that are unchanged since they were optimized with these settings
+    manifest = OptimizationManifest()
+    settings = jpeg_settings(args.quality, max_width=args.max_width)
+    cached = []
+    if not args.force:
+        cached = [task for task in remaining
+                  if os.path.exists(task['image_path']) and manifest.lookup(task['image_path'], settings)]
+        cached_ids = {task['id'] for task in cached}
+        remaining = [task for task in remaining if task['id'] not in cached_ids]
+
+    if resumed:
+        print(f"♻️  Resuming: {len(resumed)} images already done in a previous run")
+    if cached:
+        print(f"⏭️  Skipping {len(cached)} images unchanged since their last optimization")
+    if args.workers > 1:
+        print(f"⚙️  Using {args.workers} worker processes, {args.memory_limit} MB each")
     print()
     
     # Process each task
     completed = 0
     failed = 0
-    total_savings = 0
     total_original = 0
     total_optimized = 0
-    
-    for i, task in enumerate(tasks, 1):
-        task_id = task['id']
-        image_path = task['image_path']
-        city = task['city']
-        
-        print(f"🔹 Task {i}/{len(tasks)}: {os.path.basename(image_path)} ({city})")
-        print(f"   ID: {task_id}, Path: {image_path}")
-        
-        # Check if file exists
-        if not os.path.exists(image_path):
-            print(f"   ❌ File not found, skipping...")
-            failed += 1
-            continue
-        
-        # Optimize image
-        result = optimize_image(image_path, quality=85)
-        
-        if result and result['success']:
-            # Update totals
-            total_original += result['original_size']
-            total_optimized += result['optimized_size']
-            total_savings += result['savings']
-            
-            # Mark task as completed
-            if mark_task_completed(task_id):
-                print(f"   ✅ {result['message']}")
-                print(f"   📏 {result['dimensions']}, {result['format']}")
-                print(f"   📊 {result['original_size']:,} → {result['optimized_size']:,} bytes")
-                if result['savings'] > 0:
-                    print(f"   💾 Saved: {result['savings']:,} bytes ({result['savings_percent']:.1f}%)")
+    completed_ids = []
+    peaks = []
+
+    for entry in resumed:
+        result = entry['result']
+        total_original += result['original_size']
+        total_optimized += result['optimized_size']
+        completed_ids.append(int(entry['id']))
+        completed += 1
+        if os.path.exists(entry['image_path']):
+            manifest.record(entry['image_path'], settings, original_size=result['original_size'])
+
+    for task in cached:
+        result = cached_result(task['image_path'])
+        total_original += result['original_size']
+        total_optimized += result['optimized_size']
+        completed_ids.append(task['id'])
+        completed += 1
+
+    with open(args.journal, 'a', encoding='utf-8') as journal:
+        tasks_run = run_tasks(remaining, args.workers, args.quality, args.max_width, args.memory_limit)
+        for i, (task, result) in enumerate(tasks_run, 1):
+            report_result(task, result, i, len(remaining))
+            if result and result.get('peak_rss'):
+                peaks.append((result['peak_rss'], task['image_path']))
+
+            if result and result['success']:
+                total_original += result['original_size']
+                total_optimized += result['optimized_size']
+                completed_ids.append(task['id'])
+                append_journal(journal, task, result)
+                manifest.record(task['image_path'], settings, original_size=result['original_size'])
                 completed += 1
             else:
-                print(f"   ⚠️  Optimized but database update failed")
                 failed += 1
-        else:
-            print(f"   ❌ Optimization failed")
-            if result and 'error' in result:
-                print(f"   Error: {result['error']}")
-            failed += 1
-        
-        print()
+
+    manifest.save()
+
+    # Apply all is_fixed updates in one transaction
+    print(f"💾 Marking {len(completed_ids)} tasks as completed...")
+    if mark_tasks_completed(store, completed_ids):
+        print("   ✅ Database updated")
+        os.remove(args.journal)
+    else:
+        print(f"   ⚠️  Optimized but database update failed, journal kept at {args.journal}")
+    print()
     
     # Print summary
     print("=" * 50)
@@ -224,20 +344,24 @@ def main():
         overall_savings = total_original - total_optimized
         overall_savings_percent = (overall_savings / total_original) * 100
         print(f"💾 Total savings: {overall_savings:,} bytes ({overall_savings_percent:.1f}%)")
+
+    if peaks:
+        peaks.sort(reverse=True)
+        print(f"🧠 Peak RSS per image (limit {args.memory_limit} MB per worker):")
+        for peak, image_path in peaks[:10]:
+            print(f"   {peak / MB:6.0f} MB  {image_path}")
+        if len(peaks) > 10:
+            print(f"   ... {len(peaks) - 10} more at most {peaks[10][0] / MB:.0f} MB")
     
     # Update overall database stats
     print()
     print("📊 DATABASE STATUS UPDATE")
     try:
-        cmd = [
-            'psql', '-d', 'travel_website', '-U', 'fudongli', '-h', 'localhost',
-            '-c', "SELECT COUNT(*) as total, COUNT(CASE WHEN is_fixed THEN 1 END) as completed, COUNT(CASE WHEN NOT is_fixed THEN 1 END) as pending FROM travel.travel_development_ideas;"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            print(result.stdout)
-    except:
-        pass
+        counts = store.counts()
+        print(f"   {sum(counts.values())} tasks: {counts['fixed']} completed, "
+              f"{counts['pending'] + counts['claimed'] + counts['exhausted']} pending")
+    except Exception as e:
+        print(f"   ⚠️  {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,13 +2,131 @@
 """
 Image optimization script for travel website
 Optimizes JPEG images while maintaining good quality
+
+Decoding is memory-bounded: with a maximum width, JPEGs are decoded at a
+reduced DCT scale (draft mode) and other formats are shrunk with reduce()
+before the final resize, and an image whose estimated peak memory exceeds
+the limit is refused instead of exhausting the machine. The EXIF orientation
+is applied and embedded color profiles are converted to sRGB, since the
+re-encoded file carries neither.
+
+Usage: python3 optimize_image.py <image_path> [quality] [--max-width N] [--memory-limit MB]
 """
 
 import os
+import argparse
 from PIL import Image
 import sys
+from optimization_manifest import OptimizationManifest
+from normalize_images import orientation, apply_orientation, to_srgb
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+DEFAULT_MEMORY_LIMIT_MB = 512
+# Bytes per pixel held by the progressive, optimized JPEG encoder (DCT
+# coefficients at 4:2:0 plus Huffman statistics; measured on a 6000x4000 photo)
+ENCODER_BYTES_PER_PIXEL = 5
+
+def jpeg_settings(quality=85, progressive=True, max_width=None):
+    """Encoder settings recorded in the optimization manifest"""
+    settings = {'format': 'JPEG', 'quality': quality, 'optimize': True, 'progressive': progressive}
+    if max_width:
+        settings['max_width'] = max_width
+    return settings
+
+def reset_peak_rss():
+    """Start a new peak RSS measurement (Linux); elsewhere the process-wide peak is reported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
 
-def optimize_jpeg(image_path, quality=85, progressive=True):
+def peak_rss():
+    """Peak resident memory in bytes since reset_peak_rss(), or None if unknown"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+def limit_memory(limit_mb):
+    """
+    Cap the address space of this process at its current size plus limit_mb
+    (pool worker initializer), so a runaway decode fails with MemoryError
+    instead of pushing the machine into swap.
+    """
+    if resource is None or not limit_mb:
+        return
+    try:
+        with open('/proc/self/status', 'r') as f:
+            current = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmSize:'))
+    except (OSError, StopIteration):
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = current + limit_mb * MB
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+def target_size(size, max_width=None):
+    width, height = size
+    if max_width and width > max_width:
+        return max_width, max(1, round(height * max_width / width))
+    return width, height
+
+def estimated_memory(decoded_size, mode, output_size):
+    """Rough peak bytes: decoded raster, RGB/resized copy and the encoder's coefficient buffer"""
+    decoded = decoded_size[0] * decoded_size[1] * Image.getmodebands(mode)
+    output_pixels = output_size[0] * output_size[1]
+    copy = output_pixels * 3 if mode != 'RGB' or decoded_size != output_size else 0
+    return decoded + copy + output_pixels * ENCODER_BYTES_PER_PIXEL
+
+def load_rgb(img, max_width=None, memory_limit_mb=None):
+    """
+    Decode an opened image to upright sRGB no wider than max_width while
+    keeping peak memory low. JPEGs are decoded straight at the smallest DCT
+    scale (1/2, 1/4, 1/8) that is still at least the target size; other
+    formats are shrunk by an integer factor with reduce() before the final
+    resize. Raises MemoryError if the estimated peak exceeds memory_limit_mb.
+    """
+    # Sizes are in stored pixels; EXIF orientations 5-8 swap width and height
+    value = orientation(img)
+    swapped = value in (5, 6, 7, 8)
+    upright = img.size[::-1] if swapped else img.size
+    output_size = target_size(upright, max_width)
+    decode_size = output_size[::-1] if swapped else output_size
+    if img.format == 'JPEG' and decode_size != img.size:
+        img.draft('RGB', decode_size)
+
+    needed = estimated_memory(img.size, img.mode, output_size)
+    if memory_limit_mb and needed > memory_limit_mb * MB:
+        raise MemoryError(f"{img.size[0]}x{img.size[1]} {img.mode} needs ~{needed // MB} MB, "
+                          f"over the {memory_limit_mb} MB limit (try --max-width)")
+
+    factor = min(img.size[0] // decode_size[0], img.size[1] // decode_size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    img = apply_orientation(img, value)
+    img, _ = to_srgb(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if img.size != output_size:
+        img = img.resize(output_size, Image.LANCZOS)
+    return img
+
+def optimize_jpeg(image_path, quality=85, progressive=True, manifest=None, max_width=None,
+                  memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
     """
     Optimize a JPEG image by reducing quality and using progressive encoding
     
@@ -16,6 +134,10 @@ def optimize_jpeg(image_path, quality=85, progressive=True):
         image_path: Path to the image file
         quality: JPEG quality (1-100, default 85)
         progressive: Use progressive encoding (default True)
+        manifest: OptimizationManifest used to skip files that were already
+            optimized with the same settings (default None, always encode)
+        max_width: Downscale wider images to this width (default None, keep size)
+        memory_limit_mb: Refuse images whose decode would need more (default 512)
     
     Returns:
         tuple: (original_size, optimized_size, savings_percent)
@@ -26,16 +148,21 @@ def optimize_jpeg(image_path, quality=85, progressive=True):
     
     # Get original file size
     original_size = os.path.getsize(image_path)
+    temp_path = image_path + '.optimized'
+    settings = jpeg_settings(quality, progressive, max_width)
+    
+    # Skip unchanged files without decoding them
+    if manifest is not None and manifest.lookup(image_path, settings):
+        print(f"✓ Already optimized: {os.path.basename(image_path)} (cached)")
+        print(f"  Size: {original_size:,} bytes (unchanged since last run)")
+        return (original_size, original_size, 0)
     
     # Open and optimize the image
+    reset_peak_rss()
     try:
         with Image.open(image_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Create a temporary output path
-            temp_path = image_path + '.optimized'
+            # Decode at reduced size where possible, converting to RGB (for PNG with transparency)
+            img = load_rgb(img, max_width, memory_limit_mb)
             
             # Save with optimization
             img.save(
@@ -53,6 +180,10 @@ def optimize_jpeg(image_path, quality=85, progressive=True):
             savings = original_size - optimized_size
             savings_percent = (savings / original_size) * 100 if original_size > 0 else 0
             
+            peak = peak_rss()
+            if peak:
+                print(f"  Peak memory: {peak / MB:.0f} MB")
+
             # Replace original with optimized if it's smaller
             if optimized_size < original_size:
                 os.replace(temp_path, image_path)
@@ -60,12 +191,16 @@ def optimize_jpeg(image_path, quality=85, progressive=True):
                 print(f"  Original: {original_size:,} bytes")
                 print(f"  Optimized: {optimized_size:,} bytes")
                 print(f"  Savings: {savings:,} bytes ({savings_percent:.1f}%)")
+                if manifest is not None:
+                    manifest.record(image_path, settings, original_size=original_size)
                 return (original_size, optimized_size, savings_percent)
             else:
                 # Delete temp file, keep original
                 os.remove(temp_path)
                 print(f"✓ Already optimized: {os.path.basename(image_path)}")
                 print(f"  Size: {original_size:,} bytes (no improvement)")
+                if manifest is not None:
+                    manifest.record(image_path, settings, original_size=original_size)
                 return (original_size, original_size, 0)
                 
     except Exception as e:
@@ -76,15 +211,20 @@ def optimize_jpeg(image_path, quality=85, progressive=True):
         return None
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 optimize_image.py <image_path> [quality]")
-        print("Example: python3 optimize_image.py images/user_photos/kaifeng_1.jpg 85")
-        sys.exit(1)
-    
-    image_path = sys.argv[1]
-    quality = int(sys.argv[2]) if len(sys.argv) > 2 else 85
+    parser = argparse.ArgumentParser(
+        description="Optimize a JPEG image",
+        epilog="Example: python3 optimize_image.py images/user_photos/kaifeng_1.jpg 85")
+    parser.add_argument('image_path')
+    parser.add_argument('quality', nargs='?', type=int, default=85, help="JPEG quality (default: 85)")
+    parser.add_argument('--max-width', type=int, help="downscale wider images to this width")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"refuse images needing more MB to decode (default: {DEFAULT_MEMORY_LIMIT_MB})")
+    args = parser.parse_args()
     
-    result = optimize_jpeg(image_path, quality)
+    manifest = OptimizationManifest()
+    result = optimize_jpeg(args.image_path, args.quality, manifest=manifest,
+                           max_width=args.max_width, memory_limit_mb=args.memory_limit)
+    manifest.save()
     
     if result:
         original_size, optimized_size, savings_percent = result
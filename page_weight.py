@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Page weight and critical-path analysis.
+For index.html and every page in cities/ and blog/ this adds up what a first
+visit transfers: the HTML itself, stylesheets, inline <style>/<script>,
+external scripts and images. Local files are measured on disk; remote ones
+through the link checker's cached HEAD probe. It also lists the
+render-blocking resources in document order and the largest images above the
+fold, and compares each page against the byte budgets in monitor_config.json.
+
+Usage: python3 page_weight.py [--offline]
+"""
+
+import os
+import json
+import argparse
+from urllib.parse import urlsplit
+from site_index import get_site_index
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(WEBSITE_DIR, "monitor_config.json")
+SITE_PREFIX = "/travel-website/"
+
+DEFAULT_BUDGETS = {
+    "total_bytes": 1500000,
+    "html_bytes": 100000,
+    "image_bytes": 1200000,
+    "render_blocking": 4
+}
+# Images within the first screen, counted in document order
+ABOVE_THE_FOLD = 3
+
+def load_budgets(config_file=CONFIG_FILE):
+    """Budgets per page: {"default": {...}, "<page path>": {...overrides}}"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            budgets = json.load(f).get("performance", {}).get("budgets", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        budgets = {}
+    budgets["default"] = dict(DEFAULT_BUDGETS, **budgets.get("default", {}))
+    return budgets
+
+def is_remote(url):
+    return url.startswith(('http://', 'https://', '//'))
+
+def resolve_local(page_path, url):
+    """Site-relative path of a local reference, or None for remote/data/template URLs"""
+    if is_remote(url) or url.startswith(('data:', '#', 'mailto:', 'javascript:')) or '${' in url:
+        return None
+    path = urlsplit(url).path
+    if not path:
+        return None
+    if path.startswith(SITE_PREFIX):
+        return path[len(SITE_PREFIX):]
+    if path.startswith('/'):
+        return path.lstrip('/')
+    return os.path.normpath(os.path.join(os.path.dirname(page_path), path))
+
+class PageWeightAnalyzer:
+    def __init__(self, website_dir=WEBSITE_DIR, budgets=None, checker=None):
+        self.website_dir = website_dir
+        self.budgets = budgets or load_budgets()
+        self.checker = checker
+        self.remote = {}
+        self._local = {}
+
+    def local_size(self, rel_path):
+        if rel_path not in self._local:
+            try:
+                self._local[rel_path] = os.path.getsize(os.path.join(self.website_dir, rel_path))
+            except OSError:
+                self._local[rel_path] = None
+        return self._local[rel_path]
+
+    def size(self, page_path, url):
+        """(bytes or None, where) of a referenced resource"""
+        rel_path = resolve_local(page_path, url)
+        if rel_path is not None:
+            return self.local_size(rel_path), "local"
+        if is_remote(url):
+            return self.remote.get(url), "remote"
+        return None, "unresolved"
+
+    def probe_remote(self, pages):
+        """Sizes of every remote resource across all pages in one concurrent, cached pass"""
+        if self.checker is None:
+            return
+        urls = {url for page in pages for url in page.images + page.scripts + page.stylesheets
+                if url.startswith(('http://', 'https://'))}
+        results = self.checker.check(urls)
+        self.remote = {url: result.get("bytes") for url, result in results.items()}
+
+    def page_budget(self, path):
+        return dict(self.budgets["default"], **self.budgets.get(path, {}))
+
+    def analyze_page(self, page):
+        resources = {"stylesheets": page.stylesheets, "scripts": page.scripts, "images": page.images}
+        weights = {"html": page.size,
+                   "inline_css": page.inline_bytes['style'],
+                   "inline_js": page.inline_bytes['script']}
+        unknown, missing = [], []
+
+        for kind, urls in resources.items():
+            total = 0
+            for url in dict.fromkeys(urls):
+                size, where = self.size(page.path, url)
+                if size is None:
+                    (missing if where == "local" else unknown).append(url)
+                else:
+                    total += size
+            weights[kind] = total
+
+        above_fold = []
+        for url, lazy in page.image_order[:ABOVE_THE_FOLD]:
+            size, _ = self.size(page.path, url)
+            above_fold.append({"url": url, "bytes": size, "lazy": lazy})
+        above_fold.sort(key=lambda image: -(image["bytes"] or 0))
+
+        report = {
+            "total_bytes": sum(weights.values()),
+            "weights": weights,
+            "render_blocking": [{"url": url, "bytes": self.size(page.path, url)[0]} for url in page.render_blocking],
+            "above_the_fold_images": above_fold,
+            "unknown_size": unknown,
+            "missing": missing
+        }
+
+        budget = self.page_budget(page.path)
+        measured = {"total_bytes": report["total_bytes"], "html_bytes": page.size,
+                    "image_bytes": weights["images"], "render_blocking": len(page.render_blocking)}
+        report["over_budget"] = {name: {"value": measured[name], "budget": limit}
+                                 for name, limit in budget.items() if measured.get(name, 0) > limit}
+        report["budget"] = budget
+        return report
+
+    def analyze(self, index=None):
+        index = index or get_site_index(self.website_dir)
+        pages = ([index.main_page] if index.main_page else []) + index.city_pages() + index.blog_pages()
+        self.probe_remote(pages)
+        return {page.path: self.analyze_page(page) for page in pages}
+
+def format_bytes(value):
+    return f"{value / 1024:.1f} KB" if value is not None else "?"
+
+def main():
+    parser = argparse.ArgumentParser(description="Page weight and render-blocking resources per page")
+    parser.add_argument('--offline', action='store_true', help="skip the HEAD size probe of remote resources")
+    args = parser.parse_args()
+
+    checker = None
+    if not args.offline:
+        from link_checker import LinkChecker
+        checker = LinkChecker()
+
+    print("⚖️  PAGE WEIGHT")
+    print("=" * 50)
+    reports = PageWeightAnalyzer(checker=checker).analyze()
+    if checker:
+        checker.close()
+
+    for path, report in reports.items():
+        status = "❌" if report["over_budget"] else "✅"
+        weights = report["weights"]
+        print(f"{status} {path}: {format_bytes(report['total_bytes'])} "
+              f"(html {format_bytes(weights['html'])}, css {format_bytes(weights['stylesheets'] + weights['inline_css'])}, "
+              f"js {format_bytes(weights['scripts'] + weights['inline_js'])}, images {format_bytes(weights['images'])})")
+        print(f"   🚧 {len(report['render_blocking'])} render-blocking: "
+              + ', '.join(os.path.basename(urlsplit(item['url']).path) for item in report['render_blocking']))
+        if report["above_the_fold_images"]:
+            largest = report["above_the_fold_images"][0]
+            print(f"   🖼️  largest above the fold: {largest['url'][:70]} ({format_bytes(largest['bytes'])})")
+        for name, over in report["over_budget"].items():
+            print(f"   ⚠️  {name} {over['value']} > budget {over['budget']}")
+        if report["unknown_size"]:
+            print(f"   ❔ {len(report['unknown_size'])} remote resources of unknown size")
+
+    over = sum(1 for report in reports.values() if report["over_budget"])
+    print(f"\n📊 {len(reports) - over}/{len(reports)} pages within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Publish the static site into _site/.
+Every file the site serves is copied into _site/ with HTML, CSS, JS and JSON
+minified on the way, and each text asset gets .gz and .br siblings written at
+maximum compression so a server can send them as-is instead of compressing
+on every request. Files are processed on a worker pool; a file whose content
+hash is unchanged since the last publish (and whose outputs still exist) is
+skipped. Before minifying, css_optimizer removes the rules no page uses from
+the stylesheets and inline <style> blocks, and inlines each page's critical
+CSS while the full stylesheet loads asynchronously; fingerprint_assets then
+gives referenced assets content-hashed names with immutable cache headers.
+Brotli output needs the optional `brotli` package.
+
+Usage: python3 publish_site.py [--workers N] [--force] [--no-minify] [--keep-css] [--no-fingerprint]
+"""
+
+import os
+import re
+import json
+import gzip
+import hashlib
+import shutil
+import argparse
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from optimization_manifest import file_sha256
+from css_optimizer import stylesheet_usage, prune_stylesheet, optimize_page
+from fingerprint_assets import plan, rewrite_references, write_manifest, write_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(WEBSITE_DIR, "_site")
+STATE_FILE = os.path.join(WEBSITE_DIR, "publish_state.json")
+# Bump when the minifiers change so every file is re-published
+VERSION = 1
+
+# What the site serves, relative to the website directory
+PUBLISH_PATTERNS = ["*.html", "*.css", "robots.txt", "sitemap.xml",
+                    "cities/*.html", "cities/*.js", "blog/*.html", "data/*.json",
+                    "images/**/*", "mindfulness/*.html", "mindfulness/*.js", "mindfulness/assets/**/*",
+                    "docs/*.html"]
+COMPRESSIBLE = {'.html', '.css', '.js', '.json', '.xml', '.svg', '.txt'}
+# Below this a compressed sibling is not worth a second file
+MIN_COMPRESS_BYTES = 256
+
+CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.DOTALL)
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+HTML_RAW = re.compile(r'(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)', re.DOTALL | re.IGNORECASE)
+HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+SCRIPT_TYPE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+# After these, a "/" starts a regular expression rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void',
+                  'yield', 'await', 'delete', 'instanceof', 'new', 'throw'}
+
+def minify_css(css):
+    """Drop comments and redundant whitespace; strings are left untouched"""
+    def token(match):
+        string, comment, space = match.groups()
+        if string:
+            return string
+        return '' if comment else ' '
+
+    parts = []
+    for piece in re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', CSS_TOKEN.sub(token, css)):
+        if piece.startswith(('"', "'")):
+            parts.append(piece)
+        else:
+            piece = CSS_PUNCTUATION.sub(r'\1', piece)
+            parts.append(re.sub(r':\s+', ':', piece))
+    return ''.join(parts).replace(';}', '}').strip()
+
+def _skip_quoted(source, i, quote):
+    """Index just past the string literal starting at source[i]"""
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote or (source[i] == '\n' and quote != '`'):
+            return i + 1
+        i += 1
+    return i
+
+def _skip_template(source, i):
+    """From inside a template literal, the index past its closing backtick or its next `${`"""
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == '`':
+            return i + 1, False
+        if source.startswith('${', i):
+            return i + 2, True
+        i += 1
+    return i, False
+
+def _skip_regex(source, i):
+    """Index past the regex literal at source[i], or None if it is not one on this line"""
+    in_class = False
+    i += 1
+    while i < len(source) and source[i] != '\n':
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return None
+
+def _starts_regex(out):
+    code = ''.join(out[-3:]).rstrip() if out else ''
+    if not code:
+        return True
+    if code[-1] in REGEX_PRECEDERS:
+        return True
+    word = re.search(r'([A-Za-z_$]+)$', ''.join(out[-8:]).rstrip())
+    return bool(word and word.group(1) in REGEX_KEYWORDS)
+
+def minify_js(source):
+    """
+    Conservative JS minifier: removes comments, indentation, trailing spaces
+    and blank lines. Line breaks are kept so automatic semicolon insertion
+    behaves exactly as before; strings, template literals and regex literals
+    are copied verbatim.
+    """
+    out = []
+    templates = []  # brace depth at which each open `${` expression ends
+    depth = 0
+    i, n = 0, len(source)
+
+    def emit_space(newline):
+        while out and out[-1] in (' ', '\t'):
+            out.pop()
+        if not out or out[-1] == '\n':
+            return
+        out.append('\n' if newline else ' ')
+
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            end = _skip_quoted(source, i, c)
+            out.append(source[i:end])
+            i = end
+        elif c == '`' or (c == '}' and templates and templates[-1] == depth):
+            if c == '}':
+                templates.pop()
+            start = i
+            i, opened = _skip_template(source, i + 1)
+            out.append(source[start:i])
+            if opened:
+                templates.append(depth)
+        elif source.startswith('//', i):
+            while i < n and source[i] != '\n':
+                i += 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            emit_space('\n' in source[i:end])
+            i = end
+        elif c == '/' and _starts_regex(out):
+            end = _skip_regex(source, i)
+            if end is None:
+                out.append(c)
+                i += 1
+            else:
+                out.append(source[i:end])
+                i = end
+        elif c.isspace():
+            end = i
+            while end < n and source[end].isspace():
+                end += 1
+            emit_space('\n' in source[i:end])
+            i = end
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            out.append(c)
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+def minify_html(html):
+    """
+    Drop comments (except conditional ones) and collapse whitespace runs;
+    <pre>/<textarea> are kept as written, inline <style> and <script> are
+    minified as CSS / JS.
+    """
+    def collapse(text):
+        text = HTML_COMMENT.sub('', text)
+        return WHITESPACE.sub(lambda m: '\n' if '\n' in m.group(0) else ' ', text)
+
+    parts, last = [], 0
+    for match in HTML_RAW.finditer(html):
+        parts.append(collapse(html[last:match.start()]))
+        open_tag, tag, body, close_tag = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+        if tag == 'style':
+            body = minify_css(body)
+        elif tag == 'script' and body.strip():
+            script_type = SCRIPT_TYPE.search(open_tag)
+            script_type = script_type.group(1).lower() if script_type else 'text/javascript'
+            if script_type in ('text/javascript', 'application/javascript', 'module'):
+                body = minify_js(body).rstrip('\n')
+            elif script_type.endswith('json'):
+                body = minify_json(body)
+        parts.append(collapse(open_tag) + body + close_tag)
+        last = match.end()
+    parts.append(collapse(html[last:]))
+    return ''.join(parts).strip() + '\n'
+
+def minify_json(text):
+    try:
+        return json.dumps(json.loads(text), ensure_ascii=False, separators=(',', ':'))
+    except json.JSONDecodeError:
+        return text
+
+MINIFIERS = {'.html': minify_html, '.css': minify_css, '.js': minify_js, '.json': minify_json}
+
+def compress(target, data):
+    """Write .gz/.br siblings that are smaller than the file itself. Returns their sizes"""
+    sizes = {"gzip": None, "brotli": None}
+    compressed = {"gzip": ('.gz', gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        compressed["brotli"] = ('.br', brotli.compress(data, quality=11))
+    for name, (suffix, payload) in compressed.items():
+        if len(payload) < len(data):
+            with open(target + suffix, 'wb') as f:
+                f.write(payload)
+            sizes[name] = len(payload)
+    return sizes
+
+def publish_file(rel_path, output_dir=OUTPUT_DIR, minify=True, stylesheets=None, assets=None):
+    """
+    Write one file into the output directory, plus its .gz/.br. Returns the
+    byte counts. stylesheets maps local stylesheet paths to their pruned CSS;
+    when given, CSS is optimized as well. assets is the fingerprint plan:
+    references are rewritten to the hashed names and a fingerprinted file is
+    also written under its hashed name.
+    """
+    source = os.path.join(WEBSITE_DIR, rel_path)
+    targets = [os.path.join(output_dir, rel_path)]
+    if assets and rel_path in assets:
+        targets.append(os.path.join(output_dir, assets[rel_path]))
+    os.makedirs(os.path.dirname(targets[0]), exist_ok=True)
+    extension = os.path.splitext(rel_path)[1].lower()
+
+    original = os.path.getsize(source)
+    minifier = MINIFIERS.get(extension) if minify else None
+    if extension in MINIFIERS and (minifier or assets):
+        with open(source, 'r', encoding='utf-8') as f:
+            text = source_text = f.read()
+        if stylesheets is not None and extension == '.css' and rel_path in stylesheets:
+            text = stylesheets[rel_path]
+        elif stylesheets is not None and extension == '.html':
+            text = optimize_page(text, rel_path, stylesheets.get, WEBSITE_DIR)
+        if minifier:
+            text = minifier(text)
+            if len(text.encode('utf-8')) >= original:
+                text = source_text
+        if assets:
+            text = rewrite_references(text, rel_path, assets)
+        data = text.encode('utf-8')
+        for target in targets:
+            with open(target, 'wb') as f:
+                f.write(data)
+    else:
+        for target in targets:
+            shutil.copy2(source, target)
+        data = None
+
+    result = {"path": rel_path, "original": original, "minified": len(data) if data is not None else original,
+              "gzip": None, "brotli": None, "fingerprint": assets.get(rel_path) if assets else None}
+    for target in targets:
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+    if extension not in COMPRESSIBLE or result["minified"] < MIN_COMPRESS_BYTES:
+        return result
+
+    if data is None:
+        with open(targets[0], 'rb') as f:
+            data = f.read()
+    for target in targets:
+        result.update(compress(target, data))
+    return result
+
+def collect_files(website_dir=WEBSITE_DIR):
+    files = set()
+    for pattern in PUBLISH_PATTERNS:
+        for path in glob(os.path.join(website_dir, pattern), recursive=True):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, website_dir))
+    return sorted(files)
+
+def load_state(state_file=STATE_FILE):
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"files": {}}
+
+def save_state(state, state_file=STATE_FILE):
+    temp_path = state_file + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temp_path, state_file)
+
+def settings(minify, stylesheets=None, assets=None):
+    current = {"version": VERSION, "minify": minify, "brotli": brotli is not None}
+    # Pruned CSS depends on every page linking it and rewritten references on
+    # every fingerprinted asset, so a change there re-publishes the text files
+    if stylesheets is not None:
+        current["css"] = hashlib.sha256(json.dumps(stylesheets, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    if assets is not None:
+        current["assets"] = hashlib.sha256(json.dumps(assets, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return current
+
+def remove_output(rel_path, output_dir=OUTPUT_DIR):
+    for suffix in ('', '.gz', '.br'):
+        path = os.path.join(output_dir, rel_path + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+def pruned_stylesheets(website_dir=WEBSITE_DIR):
+    """Each local stylesheet with the rules none of the pages linking it can use removed"""
+    stylesheets = {}
+    for rel_path, usage in stylesheet_usage(website_dir).items():
+        with open(os.path.join(website_dir, rel_path), 'r', encoding='utf-8') as f:
+            stylesheets[rel_path] = prune_stylesheet(f.read(), usage)
+    return stylesheets
+
+def publish(workers=None, force=False, minify=True, optimize_css=True, fingerprint=True,
+            output_dir=OUTPUT_DIR, state_file=STATE_FILE):
+    """Publish changed files in parallel. Returns (results of published files, skipped count, removed paths)"""
+    state = load_state(state_file) if not force else {"files": {}}
+    recorded = state.get("files", {})
+    files = collect_files()
+    stylesheets = pruned_stylesheets() if minify and optimize_css else None
+    base = settings(minify)
+    assets = plan(files, WEBSITE_DIR, stylesheets, salt=json.dumps(base, sort_keys=True)) if fingerprint else None
+    text_settings = settings(minify, stylesheets, assets)
+
+    pending, hashes, current = [], {}, {}
+    for rel_path in files:
+        hashes[rel_path] = file_sha256(os.path.join(WEBSITE_DIR, rel_path))
+        current[rel_path] = text_settings if os.path.splitext(rel_path)[1].lower() in MINIFIERS else base
+        fingerprinted = assets.get(rel_path) if assets else None
+        entry = recorded.get(rel_path)
+        if (entry and entry.get("sha256") == hashes[rel_path] and entry.get("settings") == current[rel_path]
+                and entry.get("fingerprint") == fingerprinted
+                and all(os.path.exists(os.path.join(output_dir, path)) for path in (rel_path, fingerprinted) if path)):
+            continue
+        pending.append(rel_path)
+
+    removed = [rel_path for rel_path in recorded if rel_path not in hashes]
+    for rel_path in removed:
+        remove_output(rel_path, output_dir)
+    for rel_path in removed + pending:
+        previous = recorded.get(rel_path, {}).get("fingerprint")
+        if previous and previous != (assets or {}).get(rel_path):
+            remove_output(previous, output_dir)
+    for rel_path in removed:
+        del recorded[rel_path]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(publish_file, rel_path, output_dir, minify, stylesheets, assets): rel_path
+                   for rel_path in pending}
+        for future in as_completed(futures):
+            rel_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  ❌ {rel_path}: {e}")
+                continue
+            recorded[rel_path] = {"sha256": hashes[rel_path], "settings": current[rel_path],
+                                  **{key: result[key] for key in ("minified", "gzip", "brotli", "fingerprint")}}
+            results.append(result)
+
+    if assets is not None:
+        write_manifest(assets, output_dir)
+        write_headers(assets, [rel_path for rel_path in files if rel_path.endswith('.html')], output_dir)
+
+    state["files"] = recorded
+    save_state(state, state_file)
+    return results, len(files) - len(pending), removed
+
+def format_kb(value):
+    return f"{value / 1024:.1f} KB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify and pre-compress the site into _site/")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="re-publish files even if unchanged")
+    parser.add_argument('--no-minify', action='store_true', help="copy files as-is, only pre-compress")
+    parser.add_argument('--keep-css', action='store_true', help="skip unused-CSS removal and critical-CSS inlining")
+    parser.add_argument('--no-fingerprint', action='store_true', help="keep asset names as they are")
+    args = parser.parse_args()
+
+    print("📦 PUBLISH SITE")
+    print("=" * 50)
+    if brotli is None:
+        print("⚠️  brotli not installed (pip install brotli): writing .gz only")
+
+    results, skipped, removed = publish(args.workers, args.force, not args.no_minify, not args.keep_css,
+                                        not args.no_fingerprint)
+    text = [result for result in results if os.path.splitext(result["path"])[1].lower() in COMPRESSIBLE]
+    for result in sorted(text, key=lambda result: -result["original"])[:10]:
+        line = f"✅ {result['path']}: {format_kb(result['original'])} → {format_kb(result['minified'])}"
+        if result["gzip"]:
+            line += f", gzip {format_kb(result['gzip'])}"
+        if result["brotli"]:
+            line += f", br {format_kb(result['brotli'])}"
+        print(line)
+
+    original = sum(result["original"] for result in text)
+    minified = sum(result["minified"] for result in text)
+    gzipped = sum(result["gzip"] or result["minified"] for result in text)
+    print(f"\n📊 {len(results)} published, {skipped} unchanged, {len(removed)} removed")
+    if text:
+        print(f"   Text assets: {format_kb(original)} → {format_kb(minified)} minified, {format_kb(gzipped)} gzip")
+    print(f"   Output: {OUTPUT_DIR}")
+
+if __name__ == "__main__":
+    main()
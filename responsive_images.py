@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Responsive image derivative pipeline for travel website
+Generates width-bucketed AVIF/WebP/JPEG variants of images/user_photos and a
+manifest mapping each source image to its variants. The page generators use
+the manifest to emit srcset/<picture> markup so small screens stop
+downloading desktop-sized photos.
+
+Usage:
+    python3 responsive_images.py [--workers N] [--force]      build derivatives
+    python3 responsive_images.py --update-data                also write srcsets into data/<city>.json
+    python3 responsive_images.py --rewrite index.html ...     rewrite <img>/background markup in pages
+"""
+
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, features
+from optimization_manifest import OptimizationManifest
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join("images", "user_photos")
+OUTPUT_DIR = os.path.join("images", "responsive")
+MANIFEST_FILE = os.path.join(WEBSITE_DIR, OUTPUT_DIR, "manifest.json")
+
+WIDTHS = [400, 800, 1350, 2000]
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+EXTENSIONS = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg'}
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Gallery images are laid out three to a row on desktop, full width on phones
+DEFAULT_SIZES = "(max-width: 768px) 100vw, 33vw"
+# Largest width used for CSS backgrounds, which cannot pick a width by viewport
+BACKGROUND_WIDTH = 1350
+
+def available_formats():
+    """AVIF needs a Pillow build with libavif, WebP and JPEG are always there"""
+    formats = ['webp', 'jpeg']
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+    return formats
+
+def target_widths(source_width, widths=WIDTHS):
+    """Width buckets below the source width, plus the source width itself"""
+    targets = [w for w in widths if w < source_width]
+    if source_width <= widths[-1]:
+        targets.append(source_width)
+    return targets or [source_width]
+
+def variant_path(source_path, width, fmt):
+    """
+    Site-relative path of one derivative. The source's directory and
+    extension are kept, so images/a/x.jpg, images/b/x.jpg and x.png do not
+    overwrite each other's variants.
+    """
+    directory, name = os.path.split(os.path.relpath(source_path, "images"))
+    stem, extension = os.path.splitext(name)
+    return os.path.join(OUTPUT_DIR, directory, f"{stem}-{extension.lstrip('.').lower()}-{width}{EXTENSIONS[fmt]}"
+                        ).replace(os.sep, '/')
+
+def generate_variants(source_path, formats, widths=WIDTHS):
+    """Encode every width/format derivative of one source image (runs inside a pool worker)"""
+    # normalize_images imports this module for find_sources()
+    from normalize_images import apply_orientation, to_srgb
+    variants = {fmt: [] for fmt in formats}
+
+    try:
+        with Image.open(os.path.join(WEBSITE_DIR, source_path)) as source:
+            # The variants carry neither EXIF nor ICC: bake orientation and color into the pixels
+            img, _ = to_srgb(apply_orientation(source))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            width, height = img.size
+            os.makedirs(os.path.join(WEBSITE_DIR, os.path.dirname(variant_path(source_path, width, 'jpeg'))), exist_ok=True)
+
+            for target_width in target_widths(width, widths):
+                target_height = round(height * target_width / width)
+                resized = img if target_width == width else img.resize(
+                    (target_width, target_height), Image.LANCZOS)
+
+                for fmt in formats:
+                    out_path = variant_path(source_path, target_width, fmt)
+                    save_kwargs = {'quality': QUALITY[fmt]}
+                    if fmt == 'jpeg':
+                        save_kwargs.update(optimize=True, progressive=True)
+                    elif fmt == 'webp':
+                        save_kwargs.update(method=6)
+                    resized.save(os.path.join(WEBSITE_DIR, out_path), fmt.upper(), **save_kwargs)
+                    variants[fmt].append({
+                        'width': target_width,
+                        'height': target_height,
+                        'path': out_path,
+                        'bytes': os.path.getsize(os.path.join(WEBSITE_DIR, out_path))
+                    })
+
+        return source_path, {'width': width, 'height': height, 'variants': variants}, None
+
+    except Exception as e:
+        return source_path, None, str(e)
+
+def load_responsive_manifest(manifest_path=MANIFEST_FILE):
+    """Load the source → variants manifest (empty if not built yet)"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("images", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_responsive_manifest(images, manifest_path=MANIFEST_FILE):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"widths": WIDTHS, "images": images}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+# ---------------------------------------------------------------------------
+# Markup helpers used by the page generators
+# ---------------------------------------------------------------------------
+
+def split_reference(url):
+    """Split a page reference like '../images/user_photos/x.jpg?v=1' into ('../', 'images/user_photos/x.jpg')"""
+    path = url.split('?')[0].split('#')[0]
+    prefix = ''
+    while path.startswith('../'):
+        prefix += '../'
+        path = path[3:]
+    if path.startswith('./'):
+        path = path[2:]
+    if path.startswith('/travel-website/'):
+        prefix, path = '/travel-website/', path[len('/travel-website/'):]
+    return prefix, path
+
+def lookup(url, manifest):
+    """Manifest entry for a page reference, or (prefix, None) for remote/unknown images"""
+    if url.startswith(('http://', 'https://', 'data:')):
+        return '', None
+    prefix, path = split_reference(url)
+    return prefix, manifest.get(path)
+
+def srcset(variants, prefix=''):
+    return ', '.join(f"{prefix}{v['path']} {v['width']}w" for v in variants)
+
+def fallback_variant(variants, max_width=800):
+    """Largest variant not wider than max_width (the smallest one if all are wider)"""
+    fitting = [v for v in variants if v['width'] <= max_width]
+    return fitting[-1] if fitting else variants[0]
+
+def responsive_srcsets(url, manifest, sizes=DEFAULT_SIZES):
+    """Srcset strings per format for a reference, as stored in data/<city>.json for the JS renderer"""
+    prefix, entry = lookup(url, manifest)
+    if not entry:
+        return None
+    result = {fmt: srcset(variants, prefix) for fmt, variants in entry['variants'].items()}
+    result['src'] = prefix + fallback_variant(entry['variants']['jpeg'])['path']
+    result['background'] = background_url(url, manifest)
+    result['sizes'] = sizes
+    result['width'] = entry['width']
+    result['height'] = entry['height']
+    return result
+
+def picture_tag(img_tag, manifest, sizes=DEFAULT_SIZES):
+    """Wrap an <img> tag in <picture> with AVIF/WebP sources; unknown images are returned unchanged"""
+    if 'srcset=' in img_tag:
+        return img_tag
+    match = re.search(r'\ssrc="([^"]+)"', img_tag)
+    if not match:
+        return img_tag
+    prefix, entry = lookup(match.group(1), manifest)
+    if not entry:
+        return img_tag
+
+    variants = entry['variants']
+    fallback = prefix + fallback_variant(variants['jpeg'])['path']
+    img = img_tag[:match.start()] + f' src="{fallback}" srcset="{srcset(variants["jpeg"], prefix)}" sizes="{sizes}"' + img_tag[match.end():]
+
+    sources = ''.join(
+        f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset(variants[fmt], prefix)}" sizes="{sizes}">'
+        for fmt in ('avif', 'webp') if variants.get(fmt)
+    )
+    return f'<picture>{sources}{img}</picture>'
+
+def background_url(url, manifest, max_width=BACKGROUND_WIDTH):
+    """JPEG derivative to use for a CSS background (url() cannot choose by viewport width)"""
+    prefix, entry = lookup(url, manifest)
+    if not entry:
+        return url
+    return prefix + fallback_variant(entry['variants']['jpeg'], max_width)['path']
+
+def background_image_style(url, manifest, max_width=BACKGROUND_WIDTH):
+    """
+    Inline background-image declarations: a plain JPEG url() first, then an
+    image-set() with AVIF/WebP that browsers without type() support ignore.
+    """
+    prefix, entry = lookup(url, manifest)
+    if not entry:
+        return f"background-image: url('{url}');"
+
+    candidates = []
+    for fmt in ('avif', 'webp', 'jpeg'):
+        if entry['variants'].get(fmt):
+            path = prefix + fallback_variant(entry['variants'][fmt], max_width)['path']
+            candidates.append(f"url('{path}') type('{MIME_TYPES[fmt]}')")
+    return (f"background-image: url('{background_url(url, manifest, max_width)}'); "
+            f"background-image: image-set({', '.join(candidates)});")
+
+def apply_responsive_markup(html, manifest, sizes=DEFAULT_SIZES):
+    """Rewrite a page: <img> → <picture>, background-image and --hero-image → resized derivatives"""
+    if not manifest:
+        return html
+
+    html = re.sub(r'<img\s[^>]*>', lambda m: picture_tag(m.group(0), manifest, sizes), html)
+
+    html = re.sub(
+        r"background-image:\s*url\('([^']+)'\);(?!\s*background-image: image-set)",
+        lambda m: background_image_style(m.group(1), manifest),
+        html
+    )
+    html = re.sub(
+        r"(--hero-image:\s*url\(')([^']+)('\))",
+        lambda m: m.group(1) + background_url(m.group(2), manifest) + m.group(3),
+        html
+    )
+    return html
+
+# ---------------------------------------------------------------------------
+# Build stage
+# ---------------------------------------------------------------------------
+
+def find_sources():
+    source_dir = os.path.join(WEBSITE_DIR, SOURCE_DIR)
+    return sorted(
+        os.path.join(SOURCE_DIR, name).replace(os.sep, '/')
+        for name in os.listdir(source_dir)
+        if name.lower().endswith(SOURCE_EXTENSIONS)
+    )
+
+def variants_exist(entry):
+    return all(
+        os.path.exists(os.path.join(WEBSITE_DIR, v['path']))
+        for variants in entry['variants'].values() for v in variants
+    )
+
+def remove_stale_variants(old_entry, new_entry=None):
+    """Delete the derivatives of an earlier build that the new entry no longer lists"""
+    if not old_entry:
+        return
+    keep = {v['path'] for variants in (new_entry or {}).get('variants', {}).values() for v in variants}
+    for variants in old_entry['variants'].values():
+        for v in variants:
+            if v['path'] not in keep:
+                try:
+                    os.remove(os.path.join(WEBSITE_DIR, v['path']))
+                except FileNotFoundError:
+                    pass
+
+def run_jobs(sources, formats, workers=1):
+    """Generate derivatives serially or across a process pool, yielding results as they finish"""
+    if workers <= 1:
+        for path in sources:
+            yield generate_variants(path, formats)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate_variants, path, formats) for path in sources]
+        for future in as_completed(futures):
+            yield future.result()
+
+def build(workers=1, force=False):
+    """Generate derivatives for every source image whose content or settings changed"""
+    formats = available_formats()
+    # version 2: upright sRGB pixels, derivative names keep the source directory and extension
+    settings = {'widths': WIDTHS, 'formats': formats, 'quality': {f: QUALITY[f] for f in formats}, 'version': 2}
+
+    os.makedirs(os.path.join(WEBSITE_DIR, OUTPUT_DIR), exist_ok=True)
+    images = load_responsive_manifest()
+    cache = OptimizationManifest()
+
+    sources = find_sources()
+    todo = [
+        path for path in sources
+        if force or path not in images or not variants_exist(images[path])
+        or not cache.lookup(os.path.join(WEBSITE_DIR, path), settings, stage="responsive")
+    ]
+
+    print(f"📊 {len(sources)} source images, {len(todo)} need derivatives ({', '.join(formats)})")
+
+    failed = 0
+    for source_path, entry, error in run_jobs(todo, formats, workers):
+        if error:
+            print(f"   ❌ {source_path}: {error}")
+            failed += 1
+            continue
+        remove_stale_variants(images.get(source_path), entry)
+        images[source_path] = entry
+        cache.record(os.path.join(WEBSITE_DIR, source_path), settings, stage="responsive")
+        total = sum(v['bytes'] for variants in entry['variants'].values() for v in variants)
+        print(f"   ✅ {source_path}: {entry['width']}x{entry['height']} → "
+              f"{sum(len(v) for v in entry['variants'].values())} variants ({total:,} bytes)")
+
+    # Drop sources that were deleted
+    for path in list(images):
+        if path not in sources:
+            remove_stale_variants(images.pop(path))
+
+    save_responsive_manifest(images)
+    cache.save()
+    print(f"📁 Manifest: {os.path.relpath(MANIFEST_FILE, WEBSITE_DIR)} ({len(images)} images, {failed} failed)")
+    return images
+
+def update_city_data(manifest):
+    """Store srcsets for heroImage and gallery in each data/<city>.json for cities/city-template.js"""
+    data_dir = os.path.join(WEBSITE_DIR, "data")
+    for filename in sorted(os.listdir(data_dir)):
+        file_path = os.path.join(data_dir, filename)
+        if not filename.endswith('.json'):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            city_data = json.load(f)
+        if 'gallery' not in city_data:
+            continue
+
+        responsive = {}
+        for url in [city_data.get('heroImage')] + city_data['gallery']:
+            if url:
+                entry = responsive_srcsets(url, manifest)
+                if entry:
+                    responsive[url] = entry
+
+        if city_data.get('responsive') == responsive:
+            continue
+        city_data['responsive'] = responsive
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(city_data, f, indent=2, ensure_ascii=False)
+        print(f"   ✅ Updated {filename} ({len(responsive)} images)")
+
+def rewrite_pages(paths, manifest):
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        updated = apply_responsive_markup(html, manifest)
+        if updated != html:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(updated)
+            print(f"   ✅ Rewrote {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate responsive image derivatives")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument('--force', action='store_true', help="regenerate all derivatives")
+    parser.add_argument('--update-data', action='store_true', help="write srcsets into data/<city>.json")
+    parser.add_argument('--rewrite', nargs='+', metavar='HTML', help="rewrite image markup in these pages")
+    args = parser.parse_args()
+
+    print("🖼️  RESPONSIVE IMAGE DERIVATIVES")
+    print("=" * 50)
+    manifest = build(workers=args.workers, force=args.force)
+
+    if args.update_data:
+        print("\n📝 Updating city data...")
+        update_city_data(manifest)
+
+    if args.rewrite:
+        print("\n📝 Rewriting pages...")
+        rewrite_pages(args.rewrite, manifest)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,10 @@
 # Navigate to the project directory
 cd /Users/fudongli/travel-website
 
+# The queue lives in Postgres; never fall back to travel.db, which
+# git reset --hard would wipe
+export TASK_STORE=postgres
+
 while true; do
     echo "$(date): Starting automated workflow..."
     
@@ -16,11 +20,14 @@ while true; do
     source .venv/bin/activate
     
     echo "$(date): Running task check..."
-    python3 check_tasks.py
+    python3 check_tasks.py --once
     
     echo "$(date): Checking for optimization needs..."
     python3 check_optimizations.py
     
+    echo "$(date): Working through queued tasks..."
+    python3 task_worker.py --workers 4 --drain
+    
     echo "$(date): Verifying completed tasks from last 30 minutes..."
     python3 verify_completed_tasks.py
     
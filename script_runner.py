@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Run the site's fix-up scripts in a resident worker process.
+The monitors used to start a fresh interpreter for fix_city_page_images.py,
+create_missing_city_pages.py, fix_all_issues.py and friends. run_script()
+hands the script to one long-lived worker process, which imports it once,
+calls its main() from the requested directory with stdout captured and
+returns a subprocess.CompletedProcess, so callers keep checking
+returncode/stdout as before. A script is re-imported only when its file
+changes.
+
+The working directory and redirected streams belong to the worker, so the
+calling process's other threads are unaffected. A call that overruns its
+timeout kills the worker and raises subprocess.TimeoutExpired, as
+subprocess.run() did; the next call starts a fresh worker.
+"""
+
+import os
+import io
+import sys
+import atexit
+import signal
+import threading
+import traceback
+import importlib.util
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The timeout the monitors gave each script under subprocess.run
+DEFAULT_TIMEOUT = 30
+
+_modules = {}
+# One script at a time: the worker runs them in order
+_lock = threading.Lock()
+# (process, connection) of the running worker
+_worker = None
+
+def load_script(script, website_dir=WEBSITE_DIR):
+    """Import a top-level script as a module, reusing it while the file is unchanged"""
+    path = os.path.join(website_dir, script)
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _modules.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    name = "_script_" + os.path.splitext(script)[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _modules[path] = (mtime_ns, module)
+    return module
+
+def call_main(script, cwd):
+    """(returncode, stdout, stderr) of script.main(), as `python3 script` would give from cwd"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            load_script(script, cwd).main()
+    except SystemExit as e:
+        returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        returncode = 1
+        stderr.write(traceback.format_exc())
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+def serve(conn):
+    """Worker process: run each (script, cwd) received and send back the outcome"""
+    # Ctrl-C is for the parent, which stops the worker itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            script, cwd = conn.recv()
+        except EOFError:
+            return
+        conn.send(call_main(script, cwd))
+
+def start_worker():
+    # Not a daemon process: fix-up scripts may start processes of their own
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    process = context.Process(target=serve, args=(child,), name="script-runner")
+    process.start()
+    child.close()
+    # multiprocessing's exit hook joins the worker, which would block in recv() forever;
+    # registering after it has been installed makes stop_worker run first
+    atexit.unregister(stop_worker)
+    atexit.register(stop_worker)
+    return process, parent
+
+def stop_worker():
+    """Kill the worker, mid-script or idle"""
+    global _worker
+    if _worker is not None:
+        process, conn = _worker
+        _worker = None
+        conn.close()
+        process.kill()
+        process.join()
+
+def run_script(script, cwd=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Run script.main() in the worker process. Like subprocess.run, raises
+    subprocess.TimeoutExpired once `timeout` seconds pass, after killing it.
+    """
+    global _worker
+    cwd = cwd or WEBSITE_DIR
+    args = [sys.executable, script]
+    with _lock:
+        if _worker is None or not _worker[0].is_alive():
+            stop_worker()
+            _worker = start_worker()
+        _, conn = _worker
+        conn.send((script, cwd))
+        if not conn.poll(timeout):
+            stop_worker()
+            raise subprocess.TimeoutExpired(args, timeout)
+        try:
+            returncode, stdout, stderr = conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-script, e.g. os._exit() or a crash in an extension
+            stop_worker()
+            return subprocess.CompletedProcess(args, 1, '', f"script runner exited while running {script}\n")
+    return subprocess.CompletedProcess(args, returncode, stdout, stderr)
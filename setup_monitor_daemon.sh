@@ -0,0 +1,39 @@
+#!/bin/bash
+# Replace the per-monitor cron jobs with the resident monitor daemon
+# The daemon runs every registered check (monitor_checks.py) in one process
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+DAEMON_SCRIPT="$SCRIPT_DIR/monitor_daemon.py"
+PYTHON_EXEC="/usr/bin/python3"
+START_COMMAND="cd \"$SCRIPT_DIR\" && nohup \"$PYTHON_EXEC\" \"$DAEMON_SCRIPT\" >> \"$SCRIPT_DIR/monitor_daemon_cron.log\" 2>&1 &"
+CRON_ENTRY="@reboot $START_COMMAND"
+
+echo "🔧 Setting up the resident monitor daemon..."
+echo ""
+
+# Remove the old 10-minute entries that each started a fresh interpreter
+for monitor in website_monitor.py enhanced_monitor.py telegram_monitor.py simple_telegram_monitor.py final_telegram_monitor.py clawdbot_integrated_monitor.py; do
+    if crontab -l 2>/dev/null | grep -q "$monitor"; then
+        crontab -l 2>/dev/null | grep -v "$monitor" | crontab -
+        echo "🧹 Removed cron job for $monitor"
+    fi
+done
+
+if crontab -l 2>/dev/null | grep -q "monitor_daemon.py"; then
+    echo "⚠️  Daemon cron entry already exists. Skipping."
+else
+    (crontab -l 2>/dev/null; echo "$CRON_ENTRY") | crontab -
+    echo "✅ Daemon will start at boot"
+fi
+
+if pgrep -f "$DAEMON_SCRIPT" > /dev/null; then
+    echo "✅ Daemon already running"
+else
+    eval "$START_COMMAND"
+    echo "🚀 Daemon started"
+fi
+
+echo ""
+echo "👀 Event-driven checks instead of the interval: python3 monitor_daemon.py --watch"
+echo "📊 Job timings: python3 monitor_daemon.py --status"
+echo "📝 Logs: tail -f $SCRIPT_DIR/monitor_daemon.log"
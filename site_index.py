@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Shared in-process index of the site's HTML pages.
+Every page (index.html, cities/*.html, blog/*.html) is tokenized once and its
+links, classes, ids, colors and image references are collected in the same
+pass. The monitors query the index instead of re-reading and regex-scanning
+the same files for every check. Pages are re-parsed only when their size or
+mtime changes, so a long-running process keeps the index warm.
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from collections import Counter
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_DIRS = ["", "cities", "blog"]
+
+HEX_COLOR = re.compile(r'#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b')
+VAR_COLOR = re.compile(r'var\(--([^)]+)\)')
+RGB_COLOR = re.compile(r'rgba?\([^)]+\)')
+CSS_URL = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+
+LAYOUT_KEYWORDS = ['container', 'row', 'col', 'hero', 'section', 'card',
+                   'navbar', 'footer', 'header', 'main', 'aside', 'article']
+
+def extract_colors(text):
+    """Hex colors (normalized to lower-case #rrggbb), CSS variables and rgb()/rgba() values"""
+    colors = set()
+    for match in HEX_COLOR.findall(text):
+        if len(match) == 3:
+            match = ''.join(c * 2 for c in match)
+        colors.add(f"#{match}".lower())
+    colors.update(VAR_COLOR.findall(text))
+    colors.update(RGB_COLOR.findall(text))
+    return colors
+
+class PageParser(HTMLParser):
+    """Collects everything the monitors look for in a single tokenizer pass"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.images = []
+        self.srcset_candidates = []
+        self.scripts = []
+        self.stylesheets = []
+        self.classes = Counter()
+        self.ids = set()
+        self.tags = Counter()
+        self.colors = set()
+        self.inline_bytes = Counter()
+        self.render_blocking = []
+        self.image_order = []
+        self._raw_text = None
+        self._in_head = False
+
+    def handle_starttag(self, tag, attrs):
+        self.tags[tag] += 1
+        attrs = dict(attrs)
+        if tag == 'head':
+            self._in_head = True
+        elif tag == 'body':
+            self._in_head = False
+
+        for name in (attrs.get('class') or '').split():
+            self.classes[name] += 1
+        if attrs.get('id'):
+            self.ids.add(attrs['id'])
+
+        if tag == 'a' and attrs.get('href'):
+            self.links.append(attrs['href'])
+        elif tag == 'link' and attrs.get('href'):
+            if 'stylesheet' in (attrs.get('rel') or ''):
+                self.stylesheets.append(attrs['href'])
+                if attrs.get('media') in (None, 'all', 'screen'):
+                    self.render_blocking.append(attrs['href'])
+        elif tag == 'script' and attrs.get('src'):
+            self.scripts.append(attrs['src'])
+            if self._in_head and 'async' not in attrs and 'defer' not in attrs and attrs.get('type') != 'module':
+                self.render_blocking.append(attrs['src'])
+        elif tag in ('img', 'source'):
+            candidates = [part.strip().split(' ')[0] for part in (attrs.get('srcset') or '').split(',') if part.strip()]
+            self.srcset_candidates.extend(candidates)
+            # A browser downloads one candidate per <img>/<picture>: count the src fallback, else the last (widest)
+            if tag == 'img' and (attrs.get('src') or candidates):
+                image = attrs.get('src') or candidates[-1]
+                self.images.append(image)
+                self.image_order.append((image, attrs.get('loading') == 'lazy'))
+
+        style = attrs.get('style')
+        if style:
+            self.colors.update(extract_colors(style))
+            urls = CSS_URL.findall(style)
+            self.images.extend(urls)
+            self.image_order.extend((url, False) for url in urls)
+
+        if tag in ('style', 'script'):
+            self._raw_text = tag
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self._raw_text = None
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self._in_head = False
+        if tag == self._raw_text:
+            self._raw_text = None
+
+    def handle_data(self, data):
+        if self._raw_text:
+            self.inline_bytes[self._raw_text] += len(data.encode('utf-8'))
+            self.colors.update(extract_colors(data))
+            if self._raw_text == 'style':
+                self.images.extend(CSS_URL.findall(data))
+
+class Page:
+    def __init__(self, path, content, stat):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.content = content
+        self.lower = content.lower()
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+        parser = PageParser()
+        parser.feed(content)
+        parser.close()
+        self.links = parser.links
+        # One resource per <img>/<picture> and CSS url(); the srcset alternatives are kept apart
+        self.images = parser.images
+        self.srcset_candidates = parser.srcset_candidates
+        self.scripts = parser.scripts
+        self.stylesheets = parser.stylesheets
+        self.classes = parser.classes
+        self.ids = parser.ids
+        self.tags = parser.tags
+        self.colors = parser.colors
+        self.inline_bytes = parser.inline_bytes
+        self.render_blocking = parser.render_blocking
+        # (url, loading="lazy") of <img> and inline background images in document order
+        self.image_order = parser.image_order
+
+    def layout_elements(self):
+        """Classes, ids and generic layout keywords present on the page"""
+        elements = set(self.classes) | self.ids
+        elements.update(keyword for keyword in LAYOUT_KEYWORDS if keyword in self.lower)
+        return elements
+
+    def home_links(self):
+        return [link for link in self.links if 'index.html' in link]
+
+class SiteIndex:
+    def __init__(self, website_dir=WEBSITE_DIR):
+        self.website_dir = website_dir
+        self.pages = {}
+        self.parsed = 0
+
+    def discover(self):
+        """Relative paths of every HTML page the monitors look at"""
+        paths = []
+        for directory in PAGE_DIRS:
+            full_dir = os.path.join(self.website_dir, directory)
+            if not os.path.isdir(full_dir):
+                continue
+            paths.extend(os.path.join(directory, name) if directory else name
+                         for name in sorted(os.listdir(full_dir)) if name.endswith('.html'))
+        return paths
+
+    def refresh(self):
+        """Re-parse pages whose size or mtime changed and drop deleted ones. Returns the changed paths"""
+        changed = []
+        current = set()
+        for path in self.discover():
+            current.add(path)
+            try:
+                stat = os.stat(os.path.join(self.website_dir, path))
+            except FileNotFoundError:
+                continue
+            page = self.pages.get(path)
+            if page and page.size == stat.st_size and page.mtime_ns == stat.st_mtime_ns:
+                continue
+            with open(os.path.join(self.website_dir, path), 'r', encoding='utf-8', errors='replace') as f:
+                self.pages[path] = Page(path, f.read(), stat)
+            self.parsed += 1
+            changed.append(path)
+        for path in set(self.pages) - current:
+            del self.pages[path]
+            changed.append(path)
+        return changed
+
+    def page(self, path):
+        return self.pages.get(path)
+
+    @property
+    def main_page(self):
+        return self.pages.get("index.html")
+
+    def city_pages(self, include_templates=False):
+        """City pages in name order; template files are skipped unless asked for"""
+        return [page for path, page in sorted(self.pages.items())
+                if path.startswith("cities" + os.sep)
+                and (include_templates or 'template' not in page.name)]
+
+    def blog_pages(self):
+        return [page for path, page in sorted(self.pages.items()) if path.startswith("blog" + os.sep)]
+
+_shared = {}
+
+def get_site_index(website_dir=WEBSITE_DIR):
+    """The process-wide index for a website directory, brought up to date with a stat per page"""
+    index = _shared.get(website_dir)
+    if index is None:
+        index = _shared[website_dir] = SiteIndex(website_dir)
+    index.refresh()
+    return index
+
+def main():
+    index = get_site_index()
+    print("🗂️  SITE INDEX")
+    print("=" * 50)
+    for path, page in sorted(index.pages.items()):
+        print(f"📄 {path}: {len(page.links)} links, {len(page.images)} images, "
+              f"{len(page.classes)} classes, {len(page.colors)} colors")
+    print(f"\n📊 Indexed {len(index.pages)} pages")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Filesystem watcher for the site sources.
+Uses watchdog (inotify/FSEvents) when it is installed and falls back to
+polling stat() snapshots otherwise. Change bursts (an editor save, a script
+rewriting every city page) are debounced and coalesced into one batch of
+paths relative to the website directory.
+"""
+
+import os
+import asyncio
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+WATCHED_PATHS = ["index.html", "cities", "data", "images", "baidu_image_replacements.json"]
+# inotify also reports opens and reads; the checks themselves would retrigger them
+CHANGE_EVENTS = {"created", "modified", "moved", "deleted"}
+
+def is_ignored(path):
+    """Temp files written by atomic saves and editors"""
+    name = os.path.basename(path)
+    return name.startswith('.') or name.endswith(('.tmp', '~', '.swp'))
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, 'dest_path', None)):
+            if path:
+                self.watcher.notify_threadsafe(path)
+
+class SiteWatcher:
+    def __init__(self, website_dir=WEBSITE_DIR, watched=WATCHED_PATHS,
+                 debounce=0.3, max_delay=2.0, poll_interval=1.0, use_watchdog=True):
+        self.website_dir = website_dir
+        self.watched = watched
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_watchdog = use_watchdog and Observer is not None
+        self.queue = None
+        self.loop = None
+        self.observer = None
+        self.poller = None
+
+    @property
+    def mode(self):
+        return "watchdog" if self.use_watchdog else "polling"
+
+    def relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.website_dir)
+
+    def is_watched(self, rel_path):
+        return not is_ignored(rel_path) and any(
+            rel_path == watched or rel_path.startswith(watched + os.sep) for watched in self.watched)
+
+    def notify(self, path):
+        rel_path = self.relative(path)
+        if self.is_watched(rel_path):
+            self.queue.put_nowait(rel_path)
+
+    def notify_threadsafe(self, path):
+        self.loop.call_soon_threadsafe(self.notify, path)
+
+    def snapshot(self):
+        """(mtime, size) of every watched file"""
+        files = {}
+        for watched in self.watched:
+            root = os.path.join(self.website_dir, watched)
+            if os.path.isfile(root):
+                stat = os.stat(root)
+                files[watched] = (stat.st_mtime_ns, stat.st_size)
+                continue
+            stack = [root]
+            while stack:
+                try:
+                    entries = list(os.scandir(stack.pop()))
+                except FileNotFoundError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif not is_ignored(entry.name):
+                        stat = entry.stat()
+                        files[self.relative(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    async def poll(self):
+        previous = await self.loop.run_in_executor(None, self.snapshot)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await self.loop.run_in_executor(None, self.snapshot)
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.queue.put_nowait(path)
+            previous = current
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        if self.use_watchdog:
+            self.observer = Observer()
+            handler = _EventHandler(self)
+            for watched in self.watched:
+                path = os.path.join(self.website_dir, watched)
+                if os.path.isdir(path):
+                    self.observer.schedule(handler, path, recursive=True)
+            # Single files are watched through their directory
+            self.observer.schedule(handler, self.website_dir, recursive=False)
+            self.observer.start()
+        else:
+            self.poller = asyncio.ensure_future(self.poll())
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        if self.poller:
+            self.poller.cancel()
+            self.poller = None
+
+    async def batches(self):
+        """
+        Yield sets of changed paths. A batch closes once no new change has
+        arrived for `debounce` seconds, or `max_delay` seconds after its first
+        change so a steady stream of writes cannot starve the checks.
+        """
+        while True:
+            paths = {await self.queue.get()}
+            deadline = self.loop.time() + self.max_delay
+            while True:
+                timeout = min(self.debounce, deadline - self.loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    paths.add(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            yield paths
@@ -0,0 +1,853 @@
+#!/usr/bin/env python3
+"""
+Task store for travel.travel_development_ideas
+One module for every script that reads or writes the task table, with two
+backends: Postgres (the travel_website database) and the bundled travel.db
+SQLite file, opened in WAL mode so readers never block the writer. Each
+process keeps one store per backend (get_store): Postgres connections come
+from a pool and every query runs as a prepared statement, SQLite keeps one
+connection per thread and its statement cache. Opening a store brings the
+schema up to date, including the migration of travel.db's legacy
+travel_development_idea(id, idea, status) table.
+
+The table doubles as a job queue. Workers claim pending rows with
+SELECT ... FOR UPDATE SKIP LOCKED on Postgres (BEGIN IMMEDIATE on SQLite),
+keep their claim alive with heartbeats and mark them fixed or failed. A
+claim whose heartbeat is older than the lease is handed to the next worker,
+up to max_attempts.
+
+Consumers do not poll for new tasks: store.listen() returns a listener whose
+wait() blocks until a task is inserted. On Postgres an insert trigger sends
+NOTIFY travel_tasks (so rows added with psql wake them too); on SQLite every
+listener binds a datagram socket in travel.db.notify/ and enqueue() writes a
+byte to each of them after committing.
+
+The backend defaults to $TASK_STORE (auto, postgres or sqlite; auto uses
+Postgres when it is reachable and warns when it falls back) and the SQLite
+file to $TASK_STORE_SQLITE. Scheduled scripts set TASK_STORE=postgres so an
+outage fails the run instead of splitting the queue.
+
+Usage: python3 task_store.py [--backend auto|postgres|sqlite] [--sqlite PATH] [--copy-to postgres|sqlite]
+"""
+
+import os
+import re
+import sys
+import json
+import select
+import socket
+import sqlite3
+import argparse
+import threading
+import itertools
+from contextlib import contextmanager
+
+try:
+    import psycopg2
+    from psycopg2 import errors
+    from psycopg2.pool import ThreadedConnectionPool
+    # Errors meaning Postgres cannot be used at all, as opposed to a failing query
+    POSTGRES_UNAVAILABLE = (RuntimeError, psycopg2.OperationalError)
+except ImportError:  # SQLite-only environments
+    psycopg2 = None
+    POSTGRES_UNAVAILABLE = (RuntimeError,)
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_PATH = os.environ.get("TASK_STORE_SQLITE", os.path.join(WEBSITE_DIR, "travel.db"))
+BACKEND = os.environ.get("TASK_STORE", "auto")
+POSTGRES = {
+    'dbname': "travel_website",
+    'user': "fudongli",
+    'password': "",
+    'host': "localhost",
+    'port': "5432",
+    'options': "-c search_path=travel",
+}
+POOL_SIZE = 8
+NOTIFY_CHANNEL = "travel_tasks"
+
+TABLE = "travel_development_ideas"
+TASK_KEY_INDEX = f"{TABLE}_task_key"
+# Postgres counterpart of SQLite's PRAGMA user_version
+SCHEMA_TABLE = f"{TABLE}_schema"
+TASK_COLUMNS = "id, idea, task_type, target_path, attempts"
+COPY_COLUMNS = ("id", "idea", "created_at", "is_fixed", "fixed_at", "task_type", "target_path", "city",
+                "attempts", "last_error")
+
+IMAGE_TASK = "optimize_image"
+# Ideas look like "Optimize image ../images/user_photos/x.jpg for city Beijing"
+IMAGE_IDEA = "^Optimize image (.+) for city (.*)$"
+
+# travel.db before the task store: travel_development_idea(id, idea, status)
+LEGACY_TABLE = "travel_development_idea"
+LEGACY_FIXED = ('done', 'fixed', 'completed', 'complete')
+SCHEMA_VERSION = 3
+
+def normalize_path(image):
+    """Target path as stored in the task key: relative to the site root"""
+    return re.sub(r'^(\.\./|\./)+', '', image.split('?')[0])
+
+def parse_image_idea(idea):
+    """(image path as written, city) of an "Optimize image" idea, None for any other idea"""
+    match = re.match(IMAGE_IDEA, idea)
+    return (match.group(1).strip(), match.group(2).strip()) if match else None
+
+def task_row(task):
+    """(idea, task_type, target_path, city) of a task tuple whose city may be left out"""
+    return tuple(task) + (None,) * (4 - len(task))
+
+class TaskStore:
+    """Operations shared by both backends; subclasses provide connections and the SQL dialect"""
+    backend = None
+    STATEMENTS = {}
+    # Whether the unique (task_type, target_path) index exists, set by open_store()
+    task_keys = False
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """A cursor inside one transaction, committed on success and rolled back on error"""
+        raise NotImplementedError
+
+    def run(self, cur, name, params=()):
+        """Execute the named statement of STATEMENTS"""
+        raise NotImplementedError
+
+    def array(self, values):
+        """Bind a list as a single statement parameter"""
+        raise NotImplementedError
+
+    def release(self):
+        """Close the calling thread's connection, if it holds one; call it before a short-lived thread exits"""
+
+    def listen(self):
+        """
+        A listener whose wait() returns once tasks are inserted. Create it
+        before looking at the queue, so an insert in between is not missed.
+        """
+        raise NotImplementedError
+
+    def _rows(self, cursor):
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def fetch(self, name, params=(), immediate=False):
+        with self.transaction(immediate) as cur:
+            self.run(cur, name, params)
+            return self._rows(cur)
+
+    def modify(self, name, params=()):
+        """Run a statement that changes rows; returns how many it changed"""
+        with self.transaction() as cur:
+            self.run(cur, name, params)
+            return cur.rowcount
+
+    def pending(self, task_type=None, after_id=0):
+        """Unfixed tasks in id order, optionally of one type, with ids above after_id"""
+        if task_type:
+            return self.fetch('pending_of_type', (task_type, after_id))
+        return self.fetch('pending', (after_id,))
+
+    def fixed_since(self, seconds):
+        """Tasks marked fixed in the last `seconds` seconds"""
+        return self.fetch('fixed_since', (seconds,))
+
+    def fixed_targets(self, seconds, task_type):
+        """(id, target_path, city) of tasks of one type fixed in the last `seconds` seconds, read from the covering index"""
+        return self.fetch('fixed_targets', (seconds, task_type))
+
+    def mark_fixed(self, task_ids):
+        """Mark tasks fixed in one transaction. Returns the number of rows changed"""
+        if not task_ids:
+            return 0
+        return self.modify('mark_fixed', (self.array([int(task_id) for task_id in task_ids]),))
+
+    def claim(self, worker_id, task_types, limit=1, lease_seconds=300, max_attempts=3):
+        """Claim up to `limit` pending tasks of the given types. Returns a list of task dicts"""
+        return self.fetch('claim', (worker_id, self.array(list(task_types)), max_attempts, lease_seconds, limit),
+                          immediate=True)
+
+    def heartbeat(self, task_id, worker_id):
+        """Extend a claim. False if the task is no longer ours (the lease expired and it was re-claimed)"""
+        return self.modify('heartbeat', (task_id, worker_id)) > 0
+
+    def complete(self, task_id, worker_id):
+        return self.modify('complete', (task_id, worker_id)) > 0
+
+    def fail(self, task_id, worker_id, error):
+        """Release a claim after an error; the task is retried until it runs out of attempts"""
+        return self.modify('fail', (str(error)[:2000], task_id, worker_id)) > 0
+
+    def counts(self, lease_seconds=300, max_attempts=3):
+        """
+        {'pending', 'claimed', 'exhausted', 'fixed'} counts of queued tasks.
+        Rows without a task_type (free-form ideas) are not counted: no worker can claim them.
+        """
+        return self.fetch('counts', (lease_seconds, max_attempts))[0]
+
+    def dump(self):
+        """Every row in the columns copy_tasks() carries over"""
+        with self.transaction() as cur:
+            cur.execute(f"SELECT {', '.join(COPY_COLUMNS)} FROM {TABLE} ORDER BY id")
+            return cur.fetchall()
+
+class PostgresTaskStore(TaskStore):
+    backend = "postgres"
+    STATEMENTS = {
+        'pending': f"""
+            SELECT id, idea, created_at, task_type, target_path FROM {TABLE}
+            WHERE NOT is_fixed AND id > $1::int ORDER BY id
+        """,
+        'pending_of_type': f"""
+            SELECT id, idea, created_at, task_type, target_path FROM {TABLE}
+            WHERE NOT is_fixed AND task_type = $1::text AND id > $2::int ORDER BY id
+        """,
+        'fixed_since': f"""
+            SELECT id, idea, fixed_at, task_type, target_path FROM {TABLE}
+            WHERE is_fixed AND fixed_at >= now() - $1::int * interval '1 second'
+            ORDER BY id
+        """,
+        'fixed_targets': f"""
+            SELECT id, target_path, city FROM {TABLE}
+            WHERE is_fixed = true AND fixed_at >= now() - $1::int * interval '1 second' AND task_type = $2::text
+        """,
+        'mark_fixed': f"UPDATE {TABLE} SET is_fixed = true, fixed_at = now() WHERE id = ANY($1::int[]) AND NOT is_fixed",
+        'enqueue': f"""
+            INSERT INTO {TABLE} (idea, task_type, target_path, city, is_fixed)
+            SELECT idea, task_type, target_path, city, false
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::text[]) AS new(idea, task_type, target_path, city)
+            ON CONFLICT (task_type, target_path) DO NOTHING
+            RETURNING id
+        """,
+        # Until compact_duplicates() lets the unique index be created, known keys are skipped by lookup
+        'enqueue_unkeyed': f"""
+            INSERT INTO {TABLE} (idea, task_type, target_path, city, is_fixed)
+            SELECT DISTINCT ON (new.task_type, new.target_path) new.idea, new.task_type, new.target_path, new.city, false
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::text[]) AS new(idea, task_type, target_path, city)
+            WHERE NOT EXISTS (SELECT 1 FROM {TABLE} t WHERE t.task_type = new.task_type AND t.target_path = new.target_path)
+            RETURNING id
+        """,
+        'claim': f"""
+            UPDATE {TABLE} t
+            SET claimed_by = $1::text, claimed_at = now(), heartbeat_at = now(), attempts = t.attempts + 1
+            FROM (
+                SELECT id FROM {TABLE}
+                WHERE NOT is_fixed AND task_type = ANY($2::text[]) AND attempts < $3::int
+                  AND (claimed_by IS NULL OR heartbeat_at < now() - $4::int * interval '1 second')
+                ORDER BY id
+                LIMIT $5::int
+                FOR UPDATE SKIP LOCKED
+            ) pending
+            WHERE t.id = pending.id
+            RETURNING {', '.join('t.' + column for column in TASK_COLUMNS.split(', '))}
+        """,
+        'heartbeat': f"UPDATE {TABLE} SET heartbeat_at = now() WHERE id = $1::int AND claimed_by = $2::text",
+        'complete': f"""
+            UPDATE {TABLE}
+            SET is_fixed = true, fixed_at = now(), claimed_by = NULL, heartbeat_at = NULL, last_error = NULL
+            WHERE id = $1::int AND claimed_by = $2::text
+        """,
+        'fail': f"""
+            UPDATE {TABLE}
+            SET claimed_by = NULL, claimed_at = NULL, heartbeat_at = NULL, last_error = $1::text
+            WHERE id = $2::int AND claimed_by = $3::text
+        """,
+        'counts': f"""
+            SELECT count(*) FILTER (WHERE NOT is_fixed AND claimed_by IS NULL AND attempts < $2::int) AS pending,
+                   count(*) FILTER (WHERE NOT is_fixed AND claimed_by IS NOT NULL
+                                    AND heartbeat_at >= now() - $1::int * interval '1 second') AS claimed,
+                   count(*) FILTER (WHERE NOT is_fixed AND claimed_by IS NULL AND attempts >= $2::int) AS exhausted,
+                   count(*) FILTER (WHERE is_fixed) AS fixed
+            FROM {TABLE}
+            WHERE task_type IS NOT NULL
+        """,
+    }
+
+    def __init__(self, pool_size=POOL_SIZE, **params):
+        if psycopg2 is None:
+            raise RuntimeError("psycopg2 is not installed")
+        self.params = dict(POSTGRES, **params)
+        self.pool = ThreadedConnectionPool(1, pool_size, **self.params)
+        # Statements prepared on each pooled connection
+        self.prepared = {}
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        conn = self.pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                yield cur
+            conn.commit()
+        except Exception as e:
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if broken:
+                self.prepared.pop(conn, None)
+            self.pool.putconn(conn, close=broken)
+
+    def run(self, cur, name, params=()):
+        prepared = self.prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {self.STATEMENTS[name]}")
+            prepared.add(name)
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def array(self, values):
+        return list(values)
+
+    def ensure_schema(self):
+        """
+        Add the structured task and queue columns, backfill them for existing
+        "Optimize image" rows and create the indexes, once per schema version
+        (recorded in travel_development_ideas_schema, like SQLite's
+        user_version) so opening an up-to-date store takes no table locks.
+        Returns False if duplicates still block the unique index (run
+        compact_duplicates()).
+        """
+        with self.transaction() as cur:
+            if self.schema_version(cur) < SCHEMA_VERSION:
+                # One process migrates; the others wait here, then find it done
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (SCHEMA_TABLE,))
+                if self.schema_version(cur) < SCHEMA_VERSION:
+                    self.migrate(cur)
+
+            cur.execute("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = %s",
+                        (TASK_KEY_INDEX,))
+            if cur.fetchone():
+                return True
+
+        try:
+            with self.transaction() as cur:
+                cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {TASK_KEY_INDEX} ON {TABLE} (task_type, target_path)")
+            return True
+        except errors.UniqueViolation:
+            return False
+
+    def schema_version(self, cur):
+        """The version recorded by the last migration, 0 before the first"""
+        cur.execute("SELECT to_regclass(%s)", (SCHEMA_TABLE,))
+        if cur.fetchone()[0] is None:
+            return 0
+        cur.execute(f"SELECT coalesce(max(version), 0) FROM {SCHEMA_TABLE}")
+        return cur.fetchone()[0]
+
+    def migrate(self, cur):
+        """Bring the table, its indexes and the insert trigger up to SCHEMA_VERSION, then record it"""
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE} (
+                id SERIAL PRIMARY KEY,
+                idea TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute(f"""
+            ALTER TABLE {TABLE}
+                ADD COLUMN IF NOT EXISTS is_fixed BOOLEAN NOT NULL DEFAULT false,
+                ADD COLUMN IF NOT EXISTS fixed_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS task_type TEXT,
+                ADD COLUMN IF NOT EXISTS target_path TEXT,
+                ADD COLUMN IF NOT EXISTS city TEXT,
+                ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+                ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS last_error TEXT
+        """)
+        # Same normalization as normalize_path()
+        cur.execute(
+            rf"""
+            UPDATE {TABLE}
+            SET task_type = %s,
+                target_path = regexp_replace(split_part(trim(substring(idea FROM %s)), '?', 1), '^(\.\./|\./)+', ''),
+                city = trim(substring(idea FROM %s))
+            WHERE (task_type IS NULL OR (task_type = %s AND city IS NULL)) AND idea ~ %s
+            """,
+            (IMAGE_TASK, "^Optimize image (.+) for city ", " for city (.*)$", IMAGE_TASK, IMAGE_IDEA)
+        )
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_queue ON {TABLE} (task_type, id) WHERE NOT is_fixed")
+        # Covers fixed_targets(): the verification window is answered from the index alone
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_fixed ON {TABLE} (is_fixed, fixed_at) "
+                    "INCLUDE (task_type, target_path, city)")
+
+        # One NOTIFY per inserting statement wakes every listener, whoever inserted.
+        # The transition table holds only the rows actually added, so an enqueue
+        # whose rows all hit ON CONFLICT DO NOTHING wakes no one
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION {NOTIFY_CHANNEL}_notify() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM inserted) THEN
+                    PERFORM pg_notify('{NOTIFY_CHANNEL}', '');
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        cur.execute(f"DROP TRIGGER IF EXISTS {TABLE}_notify ON {TABLE}")
+        cur.execute(f"CREATE TRIGGER {TABLE}_notify AFTER INSERT ON {TABLE} REFERENCING NEW TABLE AS inserted "
+                    f"FOR EACH STATEMENT EXECUTE PROCEDURE {NOTIFY_CHANNEL}_notify()")
+
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (version INTEGER NOT NULL)")
+        cur.execute(f"DELETE FROM {SCHEMA_TABLE}")
+        cur.execute(f"INSERT INTO {SCHEMA_TABLE} (version) VALUES (%s)", (SCHEMA_VERSION,))
+
+    def listen(self):
+        return PostgresListener(self.params)
+
+    def compact_duplicates(self):
+        """
+        Collapse rows sharing a task key into the oldest one, which stays fixed
+        if any of its duplicates was. Returns the number of rows deleted.
+        """
+        with self.transaction() as cur:
+            cur.execute(f"""
+                CREATE TEMP TABLE task_duplicates ON COMMIT DROP AS
+                SELECT id,
+                       min(id) OVER task AS keep_id,
+                       bool_or(is_fixed) OVER task AS any_fixed,
+                       max(fixed_at) OVER task AS last_fixed_at
+                FROM {TABLE}
+                WHERE task_type IS NOT NULL AND target_path IS NOT NULL
+                WINDOW task AS (PARTITION BY task_type, target_path)
+            """)
+            cur.execute(f"""
+                UPDATE {TABLE} t
+                SET is_fixed = d.any_fixed,
+                    fixed_at = COALESCE(t.fixed_at, d.last_fixed_at)
+                FROM task_duplicates d
+                WHERE t.id = d.id AND d.id = d.keep_id AND t.is_fixed IS DISTINCT FROM d.any_fixed
+            """)
+            cur.execute(f"DELETE FROM {TABLE} t USING task_duplicates d WHERE t.id = d.id AND d.id <> d.keep_id")
+            return cur.rowcount
+
+    def enqueue(self, tasks):
+        """
+        Insert (idea, task_type, target_path[, city]) tuples in one statement,
+        skipping known task keys. Returns the number added.
+        """
+        if not tasks:
+            return 0
+        columns = [list(column) for column in zip(*(task_row(task) for task in tasks))]
+        return len(self.fetch('enqueue' if self.task_keys else 'enqueue_unkeyed', columns))
+
+    def load(self, rows):
+        """Insert dumped rows keeping their ids; rows whose id exists are skipped"""
+        fixed = COPY_COLUMNS.index("is_fixed")
+        with self.transaction() as cur:
+            cur.executemany(
+                f"INSERT INTO {TABLE} ({', '.join(COPY_COLUMNS)}) VALUES ({', '.join(['%s'] * len(COPY_COLUMNS))}) "
+                "ON CONFLICT (id) DO NOTHING",
+                # SQLite dumps is_fixed as 0/1, which Postgres will not assign to a boolean
+                [row[:fixed] + (bool(row[fixed]),) + row[fixed + 1:] for row in rows]
+            )
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+                        f"GREATEST((SELECT max(id) FROM {TABLE}), 1))")
+
+    def close(self):
+        self.pool.closeall()
+
+class SQLiteTaskStore(TaskStore):
+    backend = "sqlite"
+    # sqlite3 prepares each statement text once per connection and keeps it in this cache
+    STATEMENT_CACHE = 64
+    STATEMENTS = {
+        'pending': f"""
+            SELECT id, idea, created_at, task_type, target_path FROM {TABLE}
+            WHERE NOT is_fixed AND id > ? ORDER BY id
+        """,
+        'pending_of_type': f"""
+            SELECT id, idea, created_at, task_type, target_path FROM {TABLE}
+            WHERE NOT is_fixed AND task_type = ? AND id > ? ORDER BY id
+        """,
+        'fixed_since': f"""
+            SELECT id, idea, fixed_at, task_type, target_path FROM {TABLE}
+            WHERE is_fixed AND fixed_at >= datetime('now', '-' || ? || ' seconds')
+            ORDER BY id
+        """,
+        'fixed_targets': f"""
+            SELECT id, target_path, city FROM {TABLE}
+            WHERE is_fixed = 1 AND fixed_at >= datetime('now', '-' || ? || ' seconds') AND task_type = ?
+        """,
+        'mark_fixed': f"""
+            UPDATE {TABLE} SET is_fixed = 1, fixed_at = CURRENT_TIMESTAMP
+            WHERE id IN (SELECT value FROM json_each(?)) AND NOT is_fixed
+        """,
+        'enqueue': f"""
+            INSERT INTO {TABLE} (idea, task_type, target_path, city, is_fixed) VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT (task_type, target_path) DO NOTHING
+        """,
+        # Until compact_duplicates() lets the unique index be created, known keys are skipped by lookup
+        'enqueue_unkeyed': f"""
+            INSERT INTO {TABLE} (idea, task_type, target_path, city, is_fixed)
+            SELECT ?1, ?2, ?3, ?4, 0
+            WHERE NOT EXISTS (SELECT 1 FROM {TABLE} WHERE task_type = ?2 AND target_path = ?3)
+        """,
+        'claim': f"""
+            UPDATE {TABLE}
+            SET claimed_by = ?, claimed_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP,
+                attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM {TABLE}
+                WHERE NOT is_fixed AND task_type IN (SELECT value FROM json_each(?)) AND attempts < ?
+                  AND (claimed_by IS NULL OR heartbeat_at < datetime('now', '-' || ? || ' seconds'))
+                ORDER BY id
+                LIMIT ?
+            )
+            RETURNING {TASK_COLUMNS}
+        """,
+        'heartbeat': f"UPDATE {TABLE} SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = ? AND claimed_by = ?",
+        'complete': f"""
+            UPDATE {TABLE}
+            SET is_fixed = 1, fixed_at = CURRENT_TIMESTAMP, claimed_by = NULL, heartbeat_at = NULL, last_error = NULL
+            WHERE id = ? AND claimed_by = ?
+        """,
+        'fail': f"""
+            UPDATE {TABLE}
+            SET claimed_by = NULL, claimed_at = NULL, heartbeat_at = NULL, last_error = ?
+            WHERE id = ? AND claimed_by = ?
+        """,
+        'counts': f"""
+            SELECT coalesce(sum(NOT is_fixed AND claimed_by IS NULL AND attempts < ?2), 0) AS pending,
+                   coalesce(sum(NOT is_fixed AND claimed_by IS NOT NULL
+                                AND heartbeat_at >= datetime('now', '-' || ?1 || ' seconds')), 0) AS claimed,
+                   coalesce(sum(NOT is_fixed AND claimed_by IS NULL AND attempts >= ?2), 0) AS exhausted,
+                   coalesce(sum(is_fixed), 0) AS fixed
+            FROM {TABLE}
+            WHERE task_type IS NOT NULL
+        """,
+    }
+
+    def __init__(self, path=SQLITE_PATH, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.notify_dir = path + ".notify"
+
+    def connection(self):
+        """This thread's connection; autocommit mode, transactions are begun explicitly"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False, cached_statements=self.STATEMENT_CACHE)
+            # Durable at every checkpoint rather than every commit, which is safe in WAL mode
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def release(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            del self.local.conn
+            with self.lock:
+                self.connections.remove(conn)
+            conn.close()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        # BEGIN IMMEDIATE takes the write lock up front, so claimers queue up instead of racing
+        conn = self.connection()
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield cur
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+
+    def run(self, cur, name, params=()):
+        cur.execute(self.STATEMENTS[name], params)
+
+    def array(self, values):
+        return json.dumps(values)
+
+    def migrate_legacy(self, cur):
+        """Move rows of the legacy travel_development_idea(id, idea, status) table into the current one"""
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LEGACY_TABLE,))
+        if not cur.fetchone():
+            return 0
+        fixed = ', '.join('?' * len(LEGACY_FIXED))
+        # The legacy table has no timestamps: fixed_at stays NULL rather than making old fixes look recent
+        cur.execute(f"""
+            INSERT INTO {TABLE} (id, idea, is_fixed)
+            SELECT id, idea, lower(status) IN ({fixed})
+            FROM {LEGACY_TABLE}
+        """, LEGACY_FIXED)
+        migrated = cur.rowcount
+        cur.execute(f"DROP TABLE {LEGACY_TABLE}")
+        return migrated
+
+    def ensure_schema(self):
+        """
+        Create or upgrade the table (migrating the legacy one and backfilling
+        the structured columns of existing "Optimize image" rows) and create
+        the unique index. Returns False if duplicates still block the index
+        (run compact_duplicates()).
+        """
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        with self.transaction(immediate=True) as cur:
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {TABLE} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        idea TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        is_fixed BOOLEAN NOT NULL DEFAULT 0,
+                        fixed_at TIMESTAMP,
+                        task_type TEXT,
+                        target_path TEXT,
+                        city TEXT,
+                        claimed_by TEXT,
+                        claimed_at TIMESTAMP,
+                        heartbeat_at TIMESTAMP,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        last_error TEXT
+                    )
+                """)
+                self.migrate_legacy(cur)
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_queue ON {TABLE} (task_type, id) WHERE NOT is_fixed")
+
+            if version < 2:
+                if 'city' not in [row[1] for row in cur.execute(f"PRAGMA table_info({TABLE})")]:
+                    cur.execute(f"ALTER TABLE {TABLE} ADD COLUMN city TEXT")
+                # SQLite has no regexp; parse the ideas of rows written before the structured columns
+                cur.execute(f"""
+                    SELECT id, idea FROM {TABLE}
+                    WHERE (task_type IS NULL OR city IS NULL) AND idea LIKE 'Optimize image % for city %'
+                """)
+                keys = [(IMAGE_TASK, normalize_path(parsed[0]), parsed[1], task_id)
+                        for task_id, idea in cur.fetchall() if (parsed := parse_image_idea(idea))]
+                cur.executemany(f"UPDATE {TABLE} SET task_type = ?, target_path = ?, city = ? WHERE id = ?", keys)
+                # Covers fixed_targets(): the verification window is answered from the index alone
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_fixed "
+                            f"ON {TABLE} (is_fixed, fixed_at, task_type, target_path, city)")
+
+            # Version 3 only changed the Postgres insert trigger
+            if version < SCHEMA_VERSION:
+                cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        try:
+            with self.transaction() as cur:
+                cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {TASK_KEY_INDEX} ON {TABLE} (task_type, target_path)")
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def compact_duplicates(self):
+        """
+        Collapse rows sharing a task key into the oldest one, which stays fixed
+        if any of its duplicates was. Returns the number of rows deleted.
+        """
+        with self.transaction(immediate=True) as cur:
+            cur.execute(f"""
+                CREATE TEMP TABLE task_duplicates AS
+                SELECT id,
+                       min(id) OVER task AS keep_id,
+                       max(is_fixed) OVER task AS any_fixed,
+                       max(fixed_at) OVER task AS last_fixed_at
+                FROM {TABLE}
+                WHERE task_type IS NOT NULL AND target_path IS NOT NULL
+                WINDOW task AS (PARTITION BY task_type, target_path)
+            """)
+            cur.execute(f"""
+                UPDATE {TABLE}
+                SET is_fixed = d.any_fixed,
+                    fixed_at = coalesce({TABLE}.fixed_at, d.last_fixed_at)
+                FROM task_duplicates d
+                WHERE {TABLE}.id = d.id AND d.id = d.keep_id AND {TABLE}.is_fixed IS NOT d.any_fixed
+            """)
+            cur.execute(f"DELETE FROM {TABLE} WHERE id IN (SELECT id FROM task_duplicates WHERE id <> keep_id)")
+            deleted = cur.rowcount
+            cur.execute("DROP TABLE task_duplicates")
+            return deleted
+
+    def enqueue(self, tasks):
+        """
+        Insert (idea, task_type, target_path[, city]) tuples in one transaction,
+        skipping known task keys. Returns the number added.
+        """
+        if not tasks:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(self.STATEMENTS['enqueue' if self.task_keys else 'enqueue_unkeyed'],
+                            (task_row(task) for task in tasks))
+            added = cur.rowcount
+        if added:
+            self.notify()
+        return added
+
+    def listen(self):
+        return SocketListener(self.notify_dir)
+
+    def notify(self):
+        """Wake every listener; sockets left behind by dead listeners are removed"""
+        try:
+            names = [name for name in os.listdir(self.notify_dir) if name.endswith('.sock')]
+        except FileNotFoundError:
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.setblocking(False)
+            for name in names:
+                path = os.path.join(self.notify_dir, name)
+                try:
+                    sender.sendto(b'.', path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    # Its buffer is full of wake-ups it has not read yet
+                    pass
+
+    def load(self, rows):
+        """Insert dumped rows keeping their ids; rows whose id exists are skipped"""
+        with self.transaction(immediate=True) as cur:
+            cur.executemany(
+                f"INSERT INTO {TABLE} ({', '.join(COPY_COLUMNS)}) VALUES ({', '.join('?' * len(COPY_COLUMNS))}) "
+                "ON CONFLICT (id) DO NOTHING",
+                [tuple(value.isoformat(' ') if hasattr(value, 'isoformat') else value for value in row) for row in rows]
+            )
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+class PostgresListener:
+    """LISTEN travel_tasks on a connection of its own, outside the pool"""
+
+    def __init__(self, params):
+        self.params = params
+        self.connect()
+
+    def connect(self):
+        self.conn = psycopg2.connect(**self.params)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+    def wait(self, timeout=None):
+        """
+        Block until tasks were inserted or `timeout` seconds passed. Returns the
+        number of notifications (after a reconnect, 1: something may have been missed).
+        """
+        try:
+            if not self.conn.notifies:
+                select.select([self.conn], [], [], timeout)
+            self.conn.poll()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.conn.close()
+            self.connect()
+            return 1
+        count = len(self.conn.notifies)
+        self.conn.notifies.clear()
+        return count
+
+    def close(self):
+        self.conn.close()
+
+class SocketListener:
+    """A datagram socket in the SQLite store's notify directory; each byte received is one wake-up"""
+    _ids = itertools.count()
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{os.getpid()}-{next(self._ids)}.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+
+    def wait(self, timeout=None):
+        """Block until tasks were inserted or `timeout` seconds passed. Returns the number of wake-ups"""
+        select.select([self.sock], [], [], timeout)
+        count = 0
+        while True:
+            try:
+                count += len(self.sock.recv(4096))
+            except BlockingIOError:
+                return count
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def open_store(backend=BACKEND, sqlite_path=SQLITE_PATH, **postgres):
+    """
+    Open a new store with its schema up to date: Postgres when asked for or
+    reachable ('auto'), otherwise the SQLite file.
+    """
+    if backend in ("auto", "postgres"):
+        try:
+            store = PostgresTaskStore(**postgres)
+        except POSTGRES_UNAVAILABLE as e:
+            if backend == "postgres":
+                raise
+            # Tasks written now land in a different store than the Postgres queue
+            print(f"⚠️  Postgres unavailable ({str(e).strip()}); using {sqlite_path}", file=sys.stderr)
+        else:
+            store.task_keys = store.ensure_schema()
+            return store
+    store = SQLiteTaskStore(sqlite_path)
+    store.task_keys = store.ensure_schema()
+    return store
+
+_shared = {}
+
+def get_store(backend=BACKEND, sqlite_path=SQLITE_PATH):
+    """The process-wide store for a backend; forked children open their own"""
+    key = (os.getpid(), backend, sqlite_path)
+    store = _shared.get(key)
+    if store is None:
+        store = _shared[key] = open_store(backend, sqlite_path)
+    return store
+
+def copy_tasks(source, target):
+    """
+    Copy every task row from one store to another, keeping ids; rows whose id
+    exists are skipped. Compact a source with duplicate task keys first.
+    Returns the number of rows read.
+    """
+    rows = source.dump()
+    target.load(rows)
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the state of the task store, or copy it to the other backend")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND)
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite database file (default: travel.db)")
+    parser.add_argument('--copy-to', choices=['postgres', 'sqlite'],
+                        help="copy all tasks into the other backend (same ids, existing rows kept)")
+    args = parser.parse_args()
+
+    store = get_store(args.backend, args.sqlite)
+    print(f"📋 Task store ({store.backend})")
+    for name, count in store.counts().items():
+        print(f"   {name}: {count}")
+
+    if args.copy_to:
+        if args.copy_to == store.backend:
+            parser.error(f"the tasks are already in {store.backend}")
+        target = get_store(args.copy_to, args.sqlite)
+        print(f"✅ Copied {copy_tasks(store, target)} tasks to {target.backend}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Worker pool for the travel_development_ideas task queue
+Runs N worker processes that claim pending tasks from task_store (SKIP
+LOCKED on Postgres, travel.db as the fallback) and dispatch them by
+task_type:
+  optimize_image  re-encode the image at target_path
+  create_page     pre-render cities/<id>.html from data/<id>.json
+  fix_link        re-check every reference of the page at target_path
+optimize_image tasks come from the image scans; create_page and fix_link
+tasks are queued with --enqueue TYPE TARGET ... (e.g. --enqueue create_page
+cities/hangzhou.html after adding data/hangzhou.json), and link_checker.py
+--enqueue queues fix_link for every page with a broken link. Rows without a
+task_type are free-form ideas, not tasks: no worker claims them.
+While a task runs, a heartbeat thread keeps the claim alive; a worker that
+dies stops heartbeating and its task is claimed again once the lease runs
+out. Failed tasks are retried until they have used --max-attempts. Idle
+workers sleep on the store's insert notifications and wake as soon as a
+task is queued; --poll only bounds how long expired claims can wait.
+
+Usage: python3 task_worker.py [--workers N] [--types T ...] [--drain] [--backend auto|postgres|sqlite]
+       python3 task_worker.py --enqueue TYPE TARGET [TARGET ...]
+"""
+
+import os
+import socket
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from task_store import get_store, parse_image_idea, normalize_path, SQLITE_PATH, BACKEND
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# task_type → function(task); a handler raises to fail the task
+HANDLERS = {}
+
+# Idea text of the tasks queue_tasks() adds
+IDEAS = {
+    'optimize_image': "Optimize image {}",
+    'create_page': "Create page {}",
+    'fix_link': "Fix links on {}",
+}
+
+def handler(task_type):
+    def register(func):
+        HANDLERS[task_type] = func
+        return func
+    return register
+
+def site_path(path):
+    return os.path.join(WEBSITE_DIR, normalize_path(path))
+
+@handler("optimize_image")
+def optimize_image_task(task):
+    from optimize_all_images import optimize_image
+    target = task['target_path']
+    if not target:
+        parsed = parse_image_idea(task['idea'])
+        if not parsed:
+            raise ValueError(f"no image path in task: {task['idea']}")
+        target = parsed[0]
+    result = optimize_image(site_path(target))
+    if result is None:
+        raise FileNotFoundError(target)
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    return result['message']
+
+@handler("create_page")
+def create_page_task(task):
+    import build_city_pages
+    city_id = os.path.splitext(os.path.basename(task['target_path'] or ''))[0]
+    cities = build_city_pages.load_cities()
+    if city_id not in cities:
+        raise ValueError(f"No data/<city>.json for: {city_id or task['idea']}")
+    # Render in this process; build() would start a pool of its own
+    build_city_pages.init_worker(build_city_pages.compile_template(), cities,
+                                 build_city_pages.load_responsive_manifest())
+    _, path, changed, size, _ = build_city_pages.build_page(city_id, build_city_pages.OUTPUT_DIR)
+    return f"{os.path.relpath(path, WEBSITE_DIR)} {'written' if changed else 'unchanged'} ({size:,} bytes)"
+
+@handler("fix_link")
+def fix_link_task(task):
+    """Links cannot be repaired automatically; the task is done once every reference on the page resolves"""
+    from site_index import get_site_index
+    from page_weight import resolve_local, is_remote
+    from link_checker import LinkChecker
+
+    page = get_site_index(WEBSITE_DIR).page(os.path.normpath(task['target_path'] or ''))
+    if page is None:
+        raise FileNotFoundError(f"page not found: {task['target_path']}")
+
+    references = page.links + page.images + page.srcset_candidates + page.scripts + page.stylesheets
+    broken = []
+    for url in references:
+        local = resolve_local(page.path, url)
+        if local and not os.path.exists(os.path.join(WEBSITE_DIR, local)):
+            broken.append(url)
+    remote = [url if not url.startswith('//') else 'https:' + url for url in references if is_remote(url)]
+    if remote:
+        checker = LinkChecker()
+        try:
+            broken += [url for url, result in checker.check(remote).items() if not result["ok"]]
+        finally:
+            checker.close()
+    if broken:
+        raise RuntimeError(f"{len(broken)} broken references: {', '.join(sorted(set(broken)))}")
+    return f"{len(set(references))} references resolve"
+
+def queue_tasks(store, task_type, targets):
+    """Queue one task per target path; targets already queued are skipped. Returns the number added"""
+    idea = IDEAS.get(task_type, task_type + " {}")
+    return store.enqueue([(idea.format(target), task_type, normalize_path(target)) for target in targets])
+
+class Heartbeat(threading.Thread):
+    """Refreshes heartbeat_at every `interval` seconds on a connection of its own while a task runs"""
+
+    def __init__(self, store_config, task_id, worker_id, interval):
+        super().__init__(daemon=True)
+        self.store_config = store_config
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        store = get_store(**self.store_config)
+        try:
+            while not self.stopped.wait(self.interval):
+                if not store.heartbeat(self.task_id, self.worker_id):
+                    self.lost = True
+                    return
+        finally:
+            # One heartbeat thread per task; its connection must not outlive it
+            store.release()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def worker_loop(index, store_config, task_types, lease=300, heartbeat=30, max_attempts=3, drain=False, poll=60):
+    """Claim and run tasks until the queue is empty (drain) or forever. Returns Counter of outcomes"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    store = get_store(**store_config)
+    listener = None if drain else store.listen()
+    stats = Counter()
+    while True:
+        tasks = store.claim(worker_id, task_types, limit=1, lease_seconds=lease, max_attempts=max_attempts)
+        if not tasks:
+            if drain:
+                return stats
+            # Wake on the next insert; the timeout re-checks for claims whose lease ran out
+            listener.wait(poll)
+            continue
+
+        task = tasks[0]
+        beat = Heartbeat(store_config, task['id'], worker_id, heartbeat)
+        beat.start()
+        try:
+            message = HANDLERS[task['task_type']](task)
+            error = None
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+        finally:
+            beat.stop()
+
+        if beat.lost:
+            # The lease expired and another worker owns the task now
+            print(f"   ⚠️  [{index}] #{task['id']} lost its claim")
+            stats['lost'] += 1
+        elif error:
+            store.fail(task['id'], worker_id, error)
+            print(f"   ❌ [{index}] #{task['id']} {task['task_type']} (attempt {task['attempts']}): {error}")
+            stats['failed'] += 1
+        elif store.complete(task['id'], worker_id):
+            print(f"   ✅ [{index}] #{task['id']} {task['task_type']}: {message}")
+            stats['completed'] += 1
+        else:
+            stats['lost'] += 1
+
+def run_workers(workers, store_config, task_types, **options):
+    """Run `workers` worker processes; returns their combined Counter"""
+    totals = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(worker_loop, index, store_config, task_types, **options)
+                   for index in range(workers)]
+        for future in as_completed(futures):
+            totals.update(future.result())
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Run workers over the travel_development_ideas task queue")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument('--types', nargs='+', choices=sorted(HANDLERS), default=sorted(HANDLERS),
+                        help="task types to run (default: all)")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND)
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite database file (default: travel.db)")
+    parser.add_argument('--lease', type=int, default=300, help="seconds without a heartbeat before a claim is retried")
+    parser.add_argument('--heartbeat', type=float, default=30, help="seconds between heartbeats (default: 30)")
+    parser.add_argument('--max-attempts', type=int, default=3, help="attempts before a task is given up (default: 3)")
+    parser.add_argument('--poll', type=float, default=60,
+                        help="longest idle wait between checks for expired claims (default: 60)")
+    parser.add_argument('--drain', action='store_true', help="exit once no task can be claimed")
+    parser.add_argument('--enqueue', nargs='+', metavar=('TYPE', 'TARGET'),
+                        help="queue a TYPE task for each TARGET path and exit")
+    args = parser.parse_args()
+
+    store = get_store(args.backend, args.sqlite)
+    if args.enqueue:
+        task_type, targets = args.enqueue[0], args.enqueue[1:]
+        if task_type not in HANDLERS or not targets:
+            parser.error(f"--enqueue takes a task type ({', '.join(sorted(HANDLERS))}) and at least one target")
+        added = queue_tasks(store, task_type, targets)
+        print(f"📥 Queued {added} {task_type} tasks ({len(targets) - added} already queued)")
+        return
+
+    backend = store.backend
+    # Workers must use the backend picked here, not fall back on their own
+    store_config = {'backend': backend, 'sqlite_path': args.sqlite}
+
+    print(f"🛠️  TASK WORKERS ({backend}, {args.workers} workers: {', '.join(args.types)})")
+    print("=" * 50)
+    totals = run_workers(args.workers, store_config, args.types, lease=args.lease, heartbeat=args.heartbeat,
+                         max_attempts=args.max_attempts, drain=args.drain, poll=args.poll)
+
+    counts = get_store(**store_config).counts(args.lease, args.max_attempts)
+    print(f"\n📈 {totals['completed']} completed, {totals['failed']} failed, {totals['lost']} lost claims")
+    print(f"📋 Queue: {', '.join(f'{name} {count}' for name, count in counts.items())}")
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,11 @@ Enhanced Website Monitor with Telegram Gateway Integration
 
 import os
 import json
-import re
 import time
-import subprocess
-import sys
 from datetime import datetime
 from collections import defaultdict
+from site_index import get_site_index
+from script_runner import run_script
 
 class TelegramMonitor:
     def __init__(self):
@@ -170,13 +169,7 @@ class TelegramMonitor:
             # Try to fix by running image search
             try:
                 self.log("Attempting to fix missing images...")
-                result = subprocess.run(
-                    [sys.executable, "search_city_images.py"],
-                    cwd=self.website_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
+                result = run_script("search_city_images.py", cwd=self.website_dir, timeout=60)
                 
                 if result.returncode == 0:
                     fixes.append("Ran image search for missing cities")
@@ -226,13 +219,7 @@ class TelegramMonitor:
             # Try to fix by creating missing pages
             try:
                 self.log("Creating missing city pages...")
-                result = subprocess.run(
-                    [sys.executable, "create_missing_city_pages.py"],
-                    cwd=self.website_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                result = run_script("create_missing_city_pages.py", cwd=self.website_dir)
                 
                 if result.returncode == 0:
                     fixes.append("Created missing city pages")
@@ -249,30 +236,17 @@ class TelegramMonitor:
         issues = []
         fixes = []
         
-        # Check main page
-        main_page = os.path.join(self.website_dir, "index.html")
-        if not os.path.exists(main_page):
+        index = get_site_index(self.website_dir)
+        if index.main_page is None:
             issues.append("Main page not found")
             return False, issues, fixes
         
-        with open(main_page, 'r', encoding='utf-8') as f:
-            main_content = f.read()
-        
-        # Check a few city pages
-        cities_dir = os.path.join(self.website_dir, "cities")
-        city_files = [f for f in os.listdir(cities_dir) if f.endswith('.html') and f != 'template.html']
-        
         color_issues = []
-        for city_file in city_files[:3]:  # Check first 3
-            file_path = os.path.join(cities_dir, city_file)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
+        for page in index.city_pages():
             # Check for expected colors
             for color_name, color_value in self.expected_colors.items():
-                if color_value not in content:
-                    color_issues.append(f"{city_file}: Missing {color_name} ({color_value})")
+                if color_value not in page.colors:
+                    color_issues.append(f"{page.name}: Missing {color_name} ({color_value})")
         
         if color_issues:
             issues.append(f"Color inconsistencies in {len(color_issues)} pages")
@@ -283,13 +257,7 @@ class TelegramMonitor:
             # Try to fix color consistency
             try:
                 self.log("Fixing color consistency...")
-                result = subprocess.run(
-                    [sys.executable, "fix_all_issues.py"],
-                    cwd=self.website_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                result = run_script("fix_all_issues.py", cwd=self.website_dir)
                 
                 if result.returncode == 0:
                     fixes.append("Applied color consistency fixes")
@@ -306,32 +274,17 @@ class TelegramMonitor:
         issues = []
         fixes = []
         
-        # Check city pages
-        cities_dir = os.path.join(self.website_dir, "cities")
-        city_files = [f for f in os.listdir(cities_dir) if f.endswith('.html') and f != 'template.html']
-        
         link_issues = []
-        for city_file in city_files[:3]:  # Check first 3
-            file_path = os.path.join(cities_dir, city_file)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Check back to home link
-            home_links = re.findall(r'href="([^"]*index\.html[^"]*)"', content)
+        for page in get_site_index(self.website_dir).city_pages():
+            home_links = page.home_links()
             
             # Should have at least one link back to home
-            if not any('index.html' in link for link in home_links):
-                link_issues.append(f"{city_file}: No link back to home page")
+            if not home_links:
+                link_issues.append(f"{page.name}: No link back to home page")
             
             # Check link consistency
-            inconsistent_links = []
-            for link in home_links:
-                if not link.startswith('/travel-website/') and 'index.html' in link:
-                    inconsistent_links.append(link)
-            
-            if inconsistent_links:
-                link_issues.append(f"{city_file}: Inconsistent home links")
+            if any(not link.startswith('/travel-website/') for link in home_links):
+                link_issues.append(f"{page.name}: Inconsistent home links")
         
         if link_issues:
             issues.append(f"Navigation issues in {len(link_issues)} pages")
@@ -342,13 +295,7 @@ class TelegramMonitor:
             # Try to fix navigation links
             try:
                 self.log("Fixing navigation links...")
-                result = subprocess.run(
-                    [sys.executable, "fix_all_issues.py"],
-                    cwd=self.website_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                result = run_script("fix_all_issues.py", cwd=self.website_dir)
                 
                 if result.returncode == 0:
                     fixes.append("Fixed navigation links")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the external link checker against a local stand-in HTTP server
+"""
+
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from link_checker import LinkChecker
+
+ETAG = '"v1"'
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def handle_request(self):
+        StandInHandler.connections.add(self.client_address)
+        StandInHandler.requests.append((self.command, self.path))
+        path = urlsplit(self.path).path
+        if path == "/image.jpg":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.reply(304, {"ETag": ETAG})
+            else:
+                self.reply(200, {"ETag": ETAG, "Content-Type": "image/jpeg"}, b'jpeg')
+        elif path == "/no-head":
+            if self.command == "HEAD":
+                self.reply(405)
+            else:
+                self.reply(206, {"Content-Range": "bytes 0-0/1234"}, b'x')
+        elif path == "/moved":
+            self.reply(301, {"Location": "/image.jpg"})
+        else:
+            self.reply(404, body=b'missing')
+
+    do_HEAD = handle_request
+    do_GET = handle_request
+
+def start_server():
+    StandInHandler.connections = set()
+    StandInHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_statuses_and_head_fallback():
+    """HEAD first, GET only where HEAD is refused, redirects followed"""
+    print("🔍 Testing link statuses...")
+    server, base = start_server()
+    checker = LinkChecker(cache_file=None)
+    try:
+        results = checker.check([f"{base}/image.jpg", f"{base}/no-head", f"{base}/moved", f"{base}/gone.png"])
+    finally:
+        checker.close()
+        server.shutdown()
+
+    assert results[f"{base}/image.jpg"]["ok"] and results[f"{base}/image.jpg"]["method"] == "HEAD"
+    assert results[f"{base}/no-head"]["ok"] and results[f"{base}/no-head"]["method"] == "GET"
+    assert results[f"{base}/moved"]["final_url"] == f"{base}/image.jpg"
+    assert results[f"{base}/gone.png"]["status"] == 404 and not results[f"{base}/gone.png"]["ok"]
+    assert results[f"{base}/image.jpg"]["bytes"] == 4
+    assert results[f"{base}/no-head"]["bytes"] == 1234
+    assert ("GET", "/image.jpg") not in StandInHandler.requests
+    print("✅ Statuses, HEAD fallback and redirects OK")
+
+def test_connections_are_reused():
+    """Requests to one host share a few keep-alive connections"""
+    print("🔍 Testing connection pooling...")
+    server, base = start_server()
+    checker = LinkChecker(cache_file=None, per_host=2)
+    try:
+        results = checker.check([f"{base}/image.jpg?n={n}" for n in range(20)])
+    finally:
+        checker.close()
+        server.shutdown()
+
+    assert all(result["ok"] for result in results.values())
+    assert checker.stats["requests"] == 20
+    assert checker.stats["connections"] <= 2
+    assert len(StandInHandler.connections) <= 2
+    print(f"✅ 20 requests on {checker.stats['connections']} connections")
+
+def test_cache_ttl_and_revalidation():
+    """Fresh results are not re-requested; expired ones are revalidated with the ETag"""
+    print("🔍 Testing result cache...")
+    server, base = start_server()
+    url = f"{base}/image.jpg"
+    try:
+        checker = LinkChecker(cache_file=None)
+        checker.check([url])
+        checker.check([url])
+        assert checker.stats["cache_hits"] == 1
+        assert len(StandInHandler.requests) == 1
+
+        checker.cache[url]["checked_at"] -= checker.ttl + 1
+        result = checker.check([url])[url]
+        assert result["ok"] and result["status"] == 200 and result["bytes"] == 4
+        assert checker.stats["not_modified"] == 1
+
+        # An entry cached before sizes were recorded is re-probed in full, not revalidated
+        del checker.cache[url]["bytes"]
+        checker.cache[url]["checked_at"] -= checker.ttl + 1
+        result = checker.check([url])[url]
+        assert result["bytes"] == 4
+        assert checker.stats["not_modified"] == 1
+        checker.close()
+    finally:
+        server.shutdown()
+    print("✅ Cached results reused and revalidated")
+
+def main():
+    test_statuses_and_head_fallback()
+    test_connections_are_reused()
+    test_cache_ttl_and_revalidation()
+    print("\n🎉 All link checker tests passed")
+
+if __name__ == "__main__":
+    main()
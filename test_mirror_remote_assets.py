@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the remote asset mirror against a local stand-in HTTP server
+"""
+
+import io
+import os
+import json
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+from mirror_remote_assets import RemoteMirror, find_remote_urls, rewrite_files, MAX_WIDTH
+
+def encode(img, fmt):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+PHOTO = encode(Image.new('RGB', (2400, 1200), (200, 120, 40)), 'JPEG')
+ICON = encode(Image.new('RGBA', (64, 64), (0, 128, 0, 128)), 'PNG')
+FLAKY = encode(Image.effect_noise((600, 400), 60).convert('RGB'), 'JPEG')
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    truncate = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        StandInHandler.requests.append((self.path, dict(self.headers)))
+        files = {"/photo-1.jpg": (PHOTO, '"photo"'), "/img/cdn.example.com/icon.png": (ICON, '"icon"'),
+                 "/flaky.jpg": (FLAKY, '"flaky"')}
+        if self.path == "/moved.jpg":
+            return self.reply(302, {"Location": "/photo-1.jpg"})
+        if self.path not in files:
+            return self.reply(404)
+
+        body, etag = files[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304, {"ETag": etag})
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == etag:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            return self.reply(206, {"ETag": etag, "Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}"},
+                              body[start:])
+        if self.path == "/flaky.jpg" and StandInHandler.truncate:
+            # Drop the connection halfway through the body
+            StandInHandler.truncate = False
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.reply(200, {"ETag": etag}, body)
+
+def start_server():
+    StandInHandler.requests = []
+    StandInHandler.truncate = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def make_site(base):
+    website_dir = tempfile.mkdtemp(prefix="mirror-test-")
+    files = {
+        "index.html": f'<img src="{base}/photo-1.jpg"><img src="{base}/moved.jpg">'
+                      f'<a href="https://example.org/">x</a>',
+        "cities/beijing.html": f"<section style=\"--hero-image: url('{base}/photo-1.jpg')\"></section>",
+        "cities/city-template.js": f"const foodIcons = {{ beijing: '{base}/img/cdn.example.com/icon.png' }};\n"
+                                   f"const dynamic = `{base}/${{name}}.jpg`;",
+        "data/beijing.json": json.dumps({"food_icon": f"{base}/img/cdn.example.com/icon.png"}),
+    }
+    for rel_path, content in files.items():
+        os.makedirs(os.path.join(website_dir, os.path.dirname(rel_path)), exist_ok=True)
+        with open(os.path.join(website_dir, rel_path), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return website_dir, sorted(files)
+
+def test_mirror_and_rewrite():
+    """Remote images are downloaded, optimized into images/mirror and references point at them"""
+    print("🔍 Testing mirror and rewrite...")
+    server, base = start_server()
+    website_dir, files = make_site(base)
+    try:
+        hosts = {base.split('//')[1]}
+        urls = find_remote_urls(files, website_dir, hosts)
+        assert set(urls) == {f"{base}/photo-1.jpg", f"{base}/moved.jpg", f"{base}/img/cdn.example.com/icon.png"}
+
+        mirror = RemoteMirror(website_dir)
+        assert mirror.mirror(urls) == {}
+        mapping = mirror.mapping()
+        photo = mapping[f"{base}/photo-1.jpg"]
+        icon = mapping[f"{base}/img/cdn.example.com/icon.png"]
+        assert photo.startswith("images/mirror/photo-1-") and photo.endswith(".jpg")
+        assert icon.endswith(".png")
+        with Image.open(os.path.join(website_dir, photo)) as img:
+            assert img.width == MAX_WIDTH
+
+        changed = rewrite_files(files, mapping, website_dir)
+        assert sorted(changed) == files
+        with open(os.path.join(website_dir, "index.html"), encoding='utf-8') as f:
+            index = f.read()
+        with open(os.path.join(website_dir, "cities/beijing.html"), encoding='utf-8') as f:
+            city = f.read()
+        with open(os.path.join(website_dir, "cities/city-template.js"), encoding='utf-8') as f:
+            script = f.read()
+        with open(os.path.join(website_dir, "data/beijing.json"), encoding='utf-8') as f:
+            data = json.load(f)
+        assert f'src="{photo}"' in index and "https://example.org/" in index
+        assert f"url('../{photo}')" in city
+        assert f"'../{icon}'" in script and f"`{base}/${{name}}.jpg`" in script
+        assert data["food_icon"] == f"../{icon}"
+    finally:
+        server.shutdown()
+        shutil.rmtree(website_dir)
+    print("✅ Mirrored and rewritten")
+
+def test_revalidation():
+    """A second run sends the recorded ETag and transfers nothing"""
+    print("🔍 Testing ETag revalidation...")
+    server, base = start_server()
+    website_dir, files = make_site(base)
+    try:
+        urls = find_remote_urls(files, website_dir, {base.split('//')[1]})
+        RemoteMirror(website_dir).mirror(urls)
+        StandInHandler.requests = []
+
+        mirror = RemoteMirror(website_dir)
+        assert mirror.mirror(urls) == {}
+        assert mirror.stats["not_modified"] == 3 and mirror.stats["downloaded"] == 0
+        assert all("If-None-Match" in headers for path, headers in StandInHandler.requests if path != "/moved.jpg")
+    finally:
+        server.shutdown()
+        shutil.rmtree(website_dir)
+    print("✅ Unchanged images revalidated with 304")
+
+def test_resume():
+    """An interrupted download continues from where it stopped"""
+    print("🔍 Testing resumable downloads...")
+    server, base = start_server()
+    website_dir = tempfile.mkdtemp(prefix="mirror-test-")
+    url = f"{base}/flaky.jpg"
+    try:
+        first = RemoteMirror(website_dir)
+        assert url in first.mirror({url: {"index.html"}})
+
+        second = RemoteMirror(website_dir)
+        assert second.mirror({url: {"index.html"}}) == {}
+        assert second.stats["resumed"] == 1
+        path, headers = StandInHandler.requests[-1]
+        assert headers.get("Range") == f"bytes={len(FLAKY) // 2}-"
+        with open(os.path.join(website_dir, ".mirror_cache", os.path.basename(second.mapping()[url])[:-4]), 'rb') as f:
+            assert f.read() == FLAKY
+    finally:
+        server.shutdown()
+        shutil.rmtree(website_dir)
+    print("✅ Partial download resumed with Range")
+
+def main():
+    test_mirror_and_rewrite()
+    test_revalidation()
+    test_resume()
+    print("\n🎉 All mirror tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test the task store: legacy migration, task keys, copying between stores and backends, and insert notifications
+"""
+
+import os
+import shutil
+import sqlite3
+import time
+import tempfile
+import multiprocessing
+from task_store import open_store, copy_tasks, psycopg2, POSTGRES, LEGACY_TABLE
+
+def make_legacy_db():
+    """A travel.db in the shape the repo shipped before the task store"""
+    path = os.path.join(tempfile.mkdtemp(prefix="task-store-"), "travel.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE {LEGACY_TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, idea TEXT NOT NULL, status TEXT NOT NULL);
+        INSERT INTO {LEGACY_TABLE} (idea, status) VALUES
+            ('Fix carousel CSS', 'pending'),
+            ('Optimize image ../images/user_photos/a.jpg for city Beijing', 'done'),
+            ('Optimize image ./images/user_photos/a.jpg?w=800 for city Beijing', 'pending'),
+            ('Optimize image ../images/user_photos/b.jpg for city Xiamen', 'pending');
+    """)
+    conn.close()
+    return path
+
+def test_legacy_migration_and_task_keys():
+    print("🔍 Testing legacy travel.db migration...")
+    path = make_legacy_db()
+    try:
+        store = open_store("sqlite", path)
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (LEGACY_TABLE,)).fetchone()
+        conn.close()
+
+        # a.jpg is queued twice, so the unique task key cannot be created yet
+        assert not store.task_keys
+        assert [task['id'] for task in store.pending()] == [1, 3, 4]
+        assert store.pending("optimize_image")[0]['target_path'] == "images/user_photos/a.jpg"
+        assert [task['id'] for task in store.pending(after_id=3)] == [4]
+        assert [task['id'] for task in store.pending("optimize_image", after_id=1)] == [3, 4]
+
+        assert store.compact_duplicates() == 1
+        assert store.ensure_schema()
+        assert [task['id'] for task in store.pending("optimize_image")] == [4]
+        assert store.enqueue([("Optimize image b.jpg", "optimize_image", "images/user_photos/b.jpg"),
+                              ("Optimize image c.jpg", "optimize_image", "images/user_photos/c.jpg")]) == 1
+
+        assert store.mark_fixed([1, 4]) == 2
+        # a.jpg was fixed before the migration, at no recorded time
+        assert sorted(task['id'] for task in store.fixed_since(60)) == [1, 4]
+        assert {task['target_path']: task['city'] for task in store.fixed_targets(60, "optimize_image")} == {
+            "images/user_photos/b.jpg": "Xiamen"}
+        store.close()
+    finally:
+        shutil.rmtree(os.path.dirname(path))
+    print("✅ Legacy rows migrated, task keys backfilled and compacted")
+
+def test_copy_between_stores():
+    print("🔍 Testing copy between stores...")
+    source_path, target_path = make_legacy_db(), make_legacy_db()
+    os.remove(target_path)
+    try:
+        source, target = open_store("sqlite", source_path), open_store("sqlite", target_path)
+        try:
+            copy_tasks(source, target)
+            assert False, "duplicate task keys copied into a keyed store"
+        except sqlite3.IntegrityError:
+            pass
+
+        source.compact_duplicates()
+        assert copy_tasks(source, target) == 3
+        assert copy_tasks(source, target) == 3
+        assert target.dump() == source.dump()
+        source.close()
+        target.close()
+    finally:
+        shutil.rmtree(os.path.dirname(source_path))
+        shutil.rmtree(os.path.dirname(target_path))
+    print("✅ Tasks copied with their ids, re-copy is a no-op")
+
+def test_copy_sqlite_to_postgres():
+    """travel.db into Postgres, in a scratch schema of the travel_website database"""
+    print("🔍 Testing copy from SQLite to Postgres...")
+    if psycopg2 is None:
+        print("⏭️  psycopg2 not installed, skipped")
+        return
+    try:
+        admin = psycopg2.connect(**dict(POSTGRES, options=""))
+    except psycopg2.OperationalError as e:
+        print(f"⏭️  Postgres unavailable ({str(e).strip()}), skipped")
+        return
+    admin.autocommit = True
+    schema = f"task_store_test_{os.getpid()}"
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+    path = make_legacy_db()
+    try:
+        source = open_store("sqlite", path)
+        source.compact_duplicates()
+        target = open_store("postgres", options=f"-c search_path={schema}")
+        assert copy_tasks(source, target) == 3
+        # SQLite's 0/1 arrive as booleans
+        assert [(row[0], row[1], row[3]) for row in target.dump()] == \
+               [(row[0], row[1], bool(row[3])) for row in source.dump()]
+        assert [task['id'] for task in target.pending()] == [1, 4]
+        assert [task['id'] for task in target.pending(after_id=1)] == [4]
+        target.close()
+        source.close()
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+        shutil.rmtree(os.path.dirname(path))
+    print("✅ Tasks copied into Postgres with their ids and fixed flags")
+
+def enqueue_later(path, delay):
+    time.sleep(delay)
+    store = open_store("sqlite", path)
+    inserted = time.perf_counter()
+    store.enqueue([("Fix links on index.html", "fix_link", "index.html")])
+    # perf_counter is system-wide on Linux, so the listener can compare against it
+    with open(path + ".inserted", "w") as f:
+        f.write(repr(inserted))
+
+def test_insert_notification():
+    """A listener blocked in wait() wakes within milliseconds of an insert from another process"""
+    print("🔍 Testing insert notifications...")
+    path = os.path.join(tempfile.mkdtemp(prefix="task-store-"), "travel.db")
+    try:
+        store = open_store("sqlite", path)
+        listener = store.listen()
+        stale = store.listen()
+        stale.sock.close()  # a listener that died without cleaning up
+
+        started = time.perf_counter()
+        assert listener.wait(0.2) == 0
+        assert time.perf_counter() - started >= 0.2
+
+        inserter = multiprocessing.get_context("fork").Process(target=enqueue_later, args=(path, 0.3))
+        inserter.start()
+        assert listener.wait(10) == 1
+        woke = time.perf_counter()
+        inserter.join()
+        with open(path + ".inserted") as f:
+            latency = woke - float(f.read())
+        assert latency < 0.1, latency
+        assert not os.path.exists(stale.path)
+
+        # A batch that adds nothing wakes no one
+        store.enqueue([("Fix links on index.html", "fix_link", "index.html")])
+        assert listener.wait(0.1) == 0
+        listener.close()
+        store.close()
+    finally:
+        shutil.rmtree(os.path.dirname(path))
+    print(f"✅ Listener woke {latency * 1000:.1f} ms after the insert")
+
+def main():
+    test_legacy_migration_and_task_keys()
+    test_copy_between_stores()
+    test_copy_sqlite_to_postgres()
+    test_insert_notification()
+    print("\n🎉 All task store tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test the task queue worker pool against a throwaway SQLite queue
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from task_store import open_store, get_store, TABLE
+from task_worker import handler, run_workers, worker_loop, queue_tasks
+
+RUNS_DIR = tempfile.mkdtemp(prefix="task-runs-")
+
+@handler("test_sleep")
+def sleep_task(task):
+    # O_EXCL: running the same task twice raises
+    os.close(os.open(os.path.join(RUNS_DIR, task['target_path']), os.O_CREAT | os.O_EXCL))
+    time.sleep(float(task['idea']))
+    return "slept"
+
+@handler("test_fail")
+def fail_task(task):
+    raise RuntimeError("always fails")
+
+def make_queue(tasks):
+    path = os.path.join(tempfile.mkdtemp(prefix="task-queue-"), "travel.db")
+    store = open_store("sqlite", path)
+    store.enqueue(tasks)
+    store.close()
+    return path, {'backend': 'sqlite', 'sqlite_path': path}
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    result = {row['target_path']: dict(row) for row in conn.execute(f"SELECT * FROM {TABLE}")}
+    conn.close()
+    return result
+
+def cleanup(path):
+    shutil.rmtree(os.path.dirname(path))
+    for name in os.listdir(RUNS_DIR):
+        os.remove(os.path.join(RUNS_DIR, name))
+
+def test_exclusive_parallel_claims():
+    """Each task runs exactly once, spread over the workers"""
+    print("🔍 Testing exclusive claims across 4 workers...")
+    path, config = make_queue([("0.4", "test_sleep", f"task-{i}") for i in range(8)])
+    try:
+        started = time.perf_counter()
+        totals = run_workers(4, config, ["test_sleep"], heartbeat=0.2, drain=True)
+        elapsed = time.perf_counter() - started
+
+        assert totals['completed'] == 8 and not totals['failed'] and not totals['lost']
+        tasks = rows(path)
+        assert all(task['is_fixed'] and task['attempts'] == 1 and task['claimed_by'] is None
+                   for task in tasks.values())
+        assert sorted(os.listdir(RUNS_DIR)) == sorted(tasks)
+        # 8 x 0.4s run serially would take 3.2s
+        assert elapsed < 2.4, elapsed
+    finally:
+        cleanup(path)
+    print(f"✅ 8 tasks ran once each in {elapsed:.2f}s")
+
+def test_stale_claim_retried():
+    """A claim whose heartbeat stopped is picked up again once the lease expires"""
+    print("🔍 Testing stale claim recovery...")
+    path, config = make_queue([("0", "test_sleep", "crashed"), ("0", "test_sleep", "running")])
+    conn = sqlite3.connect(path)
+    conn.execute(f"""
+        UPDATE {TABLE} SET claimed_by = 'dead-worker', attempts = 1,
+            heartbeat_at = CASE target_path WHEN 'crashed' THEN datetime('now', '-60 seconds')
+                                            ELSE CURRENT_TIMESTAMP END
+    """)
+    conn.commit()
+    conn.close()
+    try:
+        totals = worker_loop(0, config, ["test_sleep"], lease=30, drain=True)
+        tasks = rows(path)
+        assert totals['completed'] == 1
+        assert tasks['crashed']['is_fixed'] and tasks['crashed']['attempts'] == 2
+        assert not tasks['running']['is_fixed'] and tasks['running']['claimed_by'] == 'dead-worker'
+    finally:
+        cleanup(path)
+    print("✅ Expired claim re-run, live claim left alone")
+
+def test_failures_exhaust_attempts():
+    print("🔍 Testing retries and max attempts...")
+    path, config = make_queue([("broken", "test_fail", "broken")])
+    try:
+        totals = worker_loop(0, config, ["test_fail"], max_attempts=3, drain=True)
+        task = rows(path)['broken']
+        assert totals['failed'] == 3
+        assert task['attempts'] == 3 and not task['is_fixed'] and task['claimed_by'] is None
+        assert task['last_error'] == "RuntimeError: always fails"
+
+        store = open_store(**config)
+        assert store.counts(max_attempts=3)['exhausted'] == 1
+        assert store.claim("another-worker", ["test_fail"], max_attempts=3) == []
+        store.close()
+    finally:
+        cleanup(path)
+    print("✅ Failed task retried 3 times, then left for inspection")
+
+def test_queue_tasks_and_counts():
+    """Queued pages count as pending; free-form ideas without a task_type do not"""
+    print("🔍 Testing queued tasks and queue counts...")
+    path, config = make_queue([])
+    conn = sqlite3.connect(path)
+    conn.execute(f"INSERT INTO {TABLE} (idea) VALUES ('Add a dark mode')")
+    conn.commit()
+    conn.close()
+    try:
+        store = open_store(**config)
+        assert queue_tasks(store, "create_page", ["cities/hangzhou.html", "./cities/hangzhou.html"]) == 1
+        assert queue_tasks(store, "fix_link", ["index.html"]) == 1
+        assert [(task['idea'], task['target_path']) for task in store.pending("create_page")] == [
+            ("Create page cities/hangzhou.html", "cities/hangzhou.html")]
+        assert store.counts() == {'pending': 2, 'claimed': 0, 'exhausted': 0, 'fixed': 0}
+        store.close()
+    finally:
+        cleanup(path)
+    print("✅ 2 tasks queued and counted, the free-form idea left out")
+
+def test_heartbeat_keeps_claim():
+    """A task running longer than the lease is not stolen while it heartbeats"""
+    print("🔍 Testing heartbeats on a long task...")
+    path, config = make_queue([("3.5", "test_sleep", "long")])
+    worker = threading.Thread(target=worker_loop, args=(0, config, ["test_sleep"]),
+                              kwargs={'lease': 2, 'heartbeat': 0.5, 'drain': True})
+    worker.start()
+    try:
+        while rows(path)['long']['claimed_by'] is None:
+            time.sleep(0.05)
+        store = open_store(**config)
+        while worker.is_alive():
+            assert store.claim("thief", ["test_sleep"], lease_seconds=2) == []
+            time.sleep(0.25)
+        store.close()
+        worker.join()
+        task = rows(path)['long']
+        assert task['is_fixed'] and task['attempts'] == 1
+    finally:
+        worker.join()
+        cleanup(path)
+    print("✅ Claim held past the lease by heartbeats")
+
+def test_heartbeat_connections_released():
+    """Heartbeat threads close their connections, so a long-running worker holds a fixed number"""
+    print("🔍 Testing heartbeat connection cleanup...")
+    path, config = make_queue([("0.15", "test_sleep", f"task-{i}") for i in range(20)])
+    try:
+        totals = worker_loop(0, config, ["test_sleep"], heartbeat=0.05, drain=True)
+        assert totals['completed'] == 20
+        store = get_store(**config)
+        # The worker thread's own connection, nothing left over from 20 heartbeat threads
+        assert len(store.connections) == 1, len(store.connections)
+        store.close()
+    finally:
+        cleanup(path)
+    print("✅ 20 heartbeat threads left no connections open")
+
+def main():
+    test_exclusive_parallel_claims()
+    test_stale_claim_retried()
+    test_failures_exhaust_attempts()
+    test_queue_tasks_and_counts()
+    test_heartbeat_keeps_claim()
+    test_heartbeat_connections_released()
+    print("\n🎉 All task worker tests passed")
+
+if __name__ == "__main__":
+    main()
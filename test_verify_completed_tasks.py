@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test verify_completed_tasks against a throwaway store and site directory
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from task_store import open_store, LEGACY_TABLE
+from verify_completed_tasks import verify_completed_tasks, FOLLOW_UP_TASK
+
+def make_site():
+    """A site directory with images/x/present.jpg and a legacy travel.db queueing missing.jpg twice"""
+    website_dir = tempfile.mkdtemp(prefix="verify-site-")
+    os.makedirs(os.path.join(website_dir, "images", "x"))
+    open(os.path.join(website_dir, "images", "x", "present.jpg"), 'wb').close()
+
+    path = os.path.join(website_dir, "travel.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE {LEGACY_TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, idea TEXT NOT NULL, status TEXT NOT NULL);
+        INSERT INTO {LEGACY_TABLE} (idea, status) VALUES
+            ('Optimize image ../images/x/missing.jpg for city Beijing', 'pending'),
+            ('Optimize image ../images/x/missing.jpg for city Beijing', 'pending'),
+            ('Optimize image ../images/x/present.jpg for city Beijing', 'pending'),
+            ('Optimize image ../images/x/old.jpg for city Beijing', 'done');
+    """)
+    conn.close()
+    return website_dir, path
+
+def test_follow_ups_without_task_keys():
+    """Missing images get one follow-up each, even before duplicates are compacted"""
+    print("🔍 Testing verification on an uncompacted store...")
+    website_dir, path = make_site()
+    try:
+        store = open_store("sqlite", path)
+        assert not store.task_keys
+        store.mark_fixed([task['id'] for task in store.pending()])
+
+        follow_ups, added = verify_completed_tasks(store, website_dir)
+        # Both missing.jpg rows report it, but only one follow-up can be queued for it.
+        # old.jpg is missing too, but was fixed before the migration, outside any window
+        assert [target for _, _, target, _ in follow_ups] == ["images/x/missing.jpg"] * 2
+        assert added == 1
+        queued = store.pending(FOLLOW_UP_TASK)
+        assert [(task['target_path'], task['idea']) for task in queued] == [
+            ("images/x/missing.jpg", "Image optimization failed for images/x/missing.jpg in Beijing")]
+
+        assert verify_completed_tasks(store, website_dir)[1] == 0
+        store.close()
+    finally:
+        shutil.rmtree(website_dir)
+    print("✅ One follow-up queued for the missing image, none on the second pass")
+
+def main():
+    test_follow_ups_without_task_keys()
+    print("\n🎉 All verification tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Update city cards in index.html with proper links and images.
 """
 
 import re
+from responsive_images import load_responsive_manifest, background_image_style
 
 # City data with image placeholders and links
 CITY_UPDATES = {
@@ -69,16 +70,19 @@ CITY_UPDATES = {
     }
 }
 
-def update_city_card(html, city_name, city_data):
+def update_city_card(html, city_name, city_data, image_manifest=None):
     """Update a single city card with link and image."""
     
     # Pattern to find the city card
-    pattern = rf'<div class="city-card">\s*(<a[^>]*>)?\s*<div class="city-image" style="background-image: url\(\'[^\']+\'\);">\s*<div class="city-overlay"></div>\s*<span class="city-name">{city_name}</span>\s*</div>\s*<div class="city-tag">[^<]+</div>\s*(</a>)?\s*</div>'
+    pattern = rf'<div class="city-card">\s*(<a[^>]*>)?\s*<div class="city-image" style="background-image: url\(\'[^\']+\'\);(?: background-image: image-set\([^"]*\);)?">\s*<div class="city-overlay"></div>\s*<span class="city-name">{city_name}</span>\s*</div>\s*<div class="city-tag">[^<]+</div>\s*(</a>)?\s*</div>'
+    
+    # Local photos get a resized derivative plus an AVIF/WebP image-set
+    image_style = background_image_style(city_data['image'], image_manifest or {})
     
     # Replacement template with link
     replacement = f'''<div class="city-card">
                                 <a href="{city_data['link']}" class="city-card-link">
-                                    <div class="city-image" style="background-image: url('{city_data['image']}');">
+                                    <div class="city-image" style="{image_style}">
                                         <div class="city-overlay"></div>
                                         <span class="city-name">{city_name}</span>
                                     </div>
@@ -102,8 +106,9 @@ def main():
     
     # Update each city card
     original_html = html_content
+    image_manifest = load_responsive_manifest()
     for city_name, city_data in CITY_UPDATES.items():
-        html_content = update_city_card(html_content, city_name, city_data)
+        html_content = update_city_card(html_content, city_name, city_data, image_manifest)
         print(f"✅ Updated: {city_name}")
     
     # Write back to file
@@ -1,54 +1,139 @@
+#!/usr/bin/env python3
+"""
+Verify image optimization tasks fixed in the last 30 minutes
+The window is read from the structured task columns (task_type,
+target_path, city) through the covering (is_fixed, fixed_at) index, so no
+idea text is parsed and older rows are never touched. The referenced images
+are checked in one batch, with one directory listing per directory instead
+of a stat per file, and a follow-up task for every missing image is queued
+in a single transaction.
+
+--benchmark seeds a throwaway SQLite store with N rows (1,000,000 by
+default) and times the verification pass against it.
+
+Usage: python3 verify_completed_tasks.py [--backend auto|postgres|sqlite] [--sqlite PATH] [--benchmark [N]]
+"""
 
 import os
-import json
-import psycopg2
-from psycopg2 import sql
-from datetime import datetime, timedelta
-
-def get_db_connection():
-    return psycopg2.connect(
-        dbname="travel_website",
-        user="fudongli",
-        password="",
-        host="localhost",
-        port="5432",
-        options="-c search_path=travel"
-    )
-
-def verify_completed_tasks():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Get tasks that were marked as fixed in the last 30 minutes
-    thirty_minutes_ago = datetime.now() - timedelta(minutes=30)
-    cur.execute(
-        sql.SQL("SELECT id, idea, fixed_at FROM travel_development_ideas WHERE is_fixed = true AND fixed_at >= %s"),
-        (thirty_minutes_ago,)
-    )
-    completed_tasks = cur.fetchall()
-
-    for task_id, idea, fixed_at in completed_tasks:
-        # Check if the task is related to image optimization
-        if "Optimize image" in idea:
-            # Extract image path from the idea
-            parts = idea.split(" for city ")
-            if len(parts) == 2:
-                image_path = parts[0].replace("Optimize image ", "").strip()
-                city_name = parts[1].strip()
-                
-                # Check if the optimized image exists
-                if not os.path.exists(image_path):
-                    # If the optimized image doesn't exist, create a new task
-                    new_task_description = f"Image optimization failed for {image_path} in {city_name}"
-                    cur.execute(
-                        sql.SQL("INSERT INTO travel_development_ideas (idea, is_fixed) VALUES (%s, %s)"),
-                        (new_task_description, False)
-                    )
-                    conn.commit()
-                    print(f"Created new task for failed optimization: {new_task_description}")
-
-    cur.close()
-    conn.close()
+import time
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+from task_store import get_store, open_store, IMAGE_TASK, TABLE, BACKEND, SQLITE_PATH
+
+WEBSITE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tasks marked as fixed within this window are verified
+VERIFY_WINDOW_SECONDS = 30 * 60
+FOLLOW_UP_TASK = "optimize_image_failed"
+
+def existing_files(paths, website_dir=WEBSITE_DIR):
+    """The site paths that exist as files, listing each directory once"""
+    names_by_dir = defaultdict(set)
+    for path in paths:
+        directory, name = os.path.split(path)
+        names_by_dir[directory].add(name)
+
+    found = set()
+    for directory, names in names_by_dir.items():
+        try:
+            with os.scandir(os.path.join(website_dir, directory)) as entries:
+                # is_file() comes from the directory entry itself, no stat per file
+                present = {entry.name for entry in entries if entry.is_file()}
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        found.update(os.path.join(directory, name) for name in names & present)
+    return found
+
+def verify_completed_tasks(store, website_dir=WEBSITE_DIR, window=VERIFY_WINDOW_SECONDS):
+    """
+    Queue a follow-up task for every recently fixed image task whose image is
+    missing. Returns (follow-ups, how many of them were new)
+    """
+    completed_tasks = store.fixed_targets(window, IMAGE_TASK)
+    present = existing_files({task['target_path'] for task in completed_tasks if task['target_path']}, website_dir)
+
+    follow_ups = []
+    for task in completed_tasks:
+        image_path, city_name = task['target_path'], task['city'] or 'Unknown'
+        if image_path and image_path not in present:
+            follow_ups.append((f"Image optimization failed for {image_path} in {city_name}",
+                               FOLLOW_UP_TASK, image_path, task['city']))
+
+    return follow_ups, store.enqueue(follow_ups)
+
+def seed(store, rows, recent):
+    """
+    Insert `rows` image tasks: the first `recent` fixed within the window,
+    every tenth still pending, the rest fixed up to a year ago.
+    """
+    with store.transaction(immediate=True) as cur:
+        cur.execute(f"""
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < ?)
+            INSERT INTO {TABLE} (idea, task_type, target_path, city, is_fixed, fixed_at)
+            SELECT 'Optimize image images/bench/' || (i % 100) || '/' || i || '.jpg for city Bench',
+                   ?, 'images/bench/' || (i % 100) || '/' || i || '.jpg', 'Bench',
+                   i % 10 <> 0,
+                   CASE WHEN i % 10 = 0 THEN NULL
+                        WHEN i <= ? THEN datetime('now', '-' || (i % ?) || ' seconds')
+                        ELSE datetime('now', '-' || (1 + i % 365) || ' days') END
+            FROM seq
+        """, (rows, IMAGE_TASK, recent, VERIFY_WINDOW_SECONDS // 2))
+
+def benchmark(rows, recent=2000):
+    """Time the verification pass over a seeded SQLite store of `rows` tasks"""
+    work_dir = tempfile.mkdtemp(prefix="verify-benchmark-")
+    try:
+        store = open_store("sqlite", os.path.join(work_dir, "travel.db"))
+        started = time.perf_counter()
+        seed(store, rows, recent)
+        print(f"🌱 Seeded {rows:,} tasks in {time.perf_counter() - started:.1f}s")
+
+        # Images of the recent tasks exist, except every seventh
+        recent_tasks = store.fixed_targets(VERIFY_WINDOW_SECONDS, IMAGE_TASK)
+        for task in recent_tasks:
+            if task['id'] % 7:
+                path = os.path.join(work_dir, task['target_path'])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                open(path, 'wb').close()
+        missing = sum(1 for task in recent_tasks if not task['id'] % 7)
+
+        conn, params = store.connection(), (VERIFY_WINDOW_SECONDS, IMAGE_TASK)
+        plan = conn.execute("EXPLAIN QUERY PLAN " + store.STATEMENTS['fixed_targets'], params).fetchall()
+        print(f"🔎 Query plan: {'; '.join(row[-1] for row in plan)}")
+        started = time.perf_counter()
+        conn.execute(store.STATEMENTS['fixed_targets'].replace(f"FROM {TABLE}", f"FROM {TABLE} NOT INDEXED"),
+                     params).fetchall()
+        print(f"📉 Same window query without the index: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        for run in ("first", "repeat"):
+            started = time.perf_counter()
+            follow_ups, added = verify_completed_tasks(store, work_dir)
+            elapsed = time.perf_counter() - started
+            print(f"⏱️  {run.capitalize()} pass: {len(recent_tasks):,} recent tasks verified, "
+                  f"{len(follow_ups)} missing images, {added} follow-ups queued in {elapsed * 1000:.0f} ms")
+        assert len(follow_ups) == missing
+        store.close()
+    finally:
+        shutil.rmtree(work_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue follow-ups for recently fixed image tasks whose image is missing")
+    parser.add_argument('--backend', choices=['auto', 'postgres', 'sqlite'], default=BACKEND)
+    parser.add_argument('--sqlite', default=SQLITE_PATH, help="SQLite database file (default: travel.db)")
+    parser.add_argument('--benchmark', type=int, nargs='?', const=1_000_000, metavar='N',
+                        help="time verification against N seeded rows in a throwaway SQLite store (default N: 1,000,000)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+
+    follow_ups, added = verify_completed_tasks(get_store(args.backend, args.sqlite))
+    for idea, *_ in follow_ups:
+        print(f"Missing optimized image: {idea}")
+    print(f"Created {added} new follow-up tasks ({len(follow_ups) - added} already queued)")
 
 if __name__ == "__main__":
-    verify_completed_tasks()
+    main()
@@ -7,10 +7,10 @@ Runs every 10 minutes to check website quality and make improvements.
 import os
 import json
 import time
-import subprocess
-import sys
 from datetime import datetime
 import hashlib
+from site_index import get_site_index
+from script_runner import run_script
 
 class WebsiteMonitor:
     def __init__(self):
@@ -97,31 +97,26 @@ class WebsiteMonitor:
             self.log("❌ Cities directory not found!", "ERROR")
             return False
         
-        city_files = [f for f in os.listdir(cities_dir) if f.endswith('.html')]
+        city_pages = get_site_index(self.website_dir).city_pages(include_templates=True)
         
-        if len(city_files) != 12:
-            self.log(f"❌ Expected 12 city pages, found {len(city_files)}", "ERROR")
+        if len(city_pages) != 12:
+            self.log(f"❌ Expected 12 city pages, found {len(city_pages)}", "ERROR")
             self.issues_found += 1
             return False
         
         issues = []
-        for city_file in city_files:
-            file_path = os.path.join(cities_dir, city_file)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
+        for page in city_pages:
             # Check for hero image
-            if '--hero-image:' not in content:
-                issues.append(f"{city_file}: No hero image CSS variable")
+            if '--hero-image:' not in page.content:
+                issues.append(f"{page.name}: No hero image CSS variable")
             
             # Check for gallery images
-            if '<img' not in content:
-                issues.append(f"{city_file}: No gallery images found")
+            if '<img' not in page.content:
+                issues.append(f"{page.name}: No gallery images found")
             
             # Check for back to home link
-            if '../index.html' not in content:
-                issues.append(f"{city_file}: Missing back to home link")
+            if not any('../index.html' in link for link in page.home_links()):
+                issues.append(f"{page.name}: Missing back to home link")
         
         if issues:
             self.log(f"Found {len(issues)} issues in city pages", "WARNING")
@@ -167,13 +162,7 @@ class WebsiteMonitor:
         # Always run image updates to ensure consistency
         try:
             self.log("Running image consistency check...")
-            result = subprocess.run(
-                [sys.executable, "verify_images.py"],
-                cwd=self.website_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = run_script("verify_images.py", cwd=self.website_dir)
             
             if result.returncode == 0:
                 if "✅" in result.stdout or "SUCCESS" in result.stdout:
@@ -182,13 +171,7 @@ class WebsiteMonitor:
                     self.log("⚠️ Image verification found issues", "WARNING")
                     # Run fix script
                     self.log("Running image fix script...")
-                    subprocess.run(
-                        [sys.executable, "fix_city_page_images.py"],
-                        cwd=self.website_dir,
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
+                    run_script("fix_city_page_images.py", cwd=self.website_dir)
                     improvements.append("Fixed image inconsistencies")
                     self.improvements_made += 1
             else:
@@ -204,13 +187,7 @@ class WebsiteMonitor:
         if len(city_files) < 12:
             self.log(f"Only {len(city_files)} city pages found, creating missing ones...")
             try:
-                subprocess.run(
-                    [sys.executable, "create_missing_city_pages.py"],
-                    cwd=self.website_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                run_script("create_missing_city_pages.py", cwd=self.website_dir)
                 improvements.append(f"Created {12 - len(city_files)} missing city pages")
                 self.improvements_made += 1
             except Exception as e: